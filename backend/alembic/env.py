@@ -12,7 +12,7 @@ import sys
 # Add the app directory to the Python path
 sys.path.append(os.path.dirname(os.path.dirname(__file__)))
 
-from app.core.database import Base
+from app.core.database import Base, get_async_database_url
 from app.core.config import settings
 
 # this is the Alembic Config object, which provides
@@ -35,7 +35,7 @@ target_metadata = Base.metadata
 
 def get_url():
     """Get database URL from environment or config."""
-    return os.getenv("DATABASE_URL", settings.DATABASE_URL)
+    return get_async_database_url(os.getenv("DATABASE_URL", settings.DATABASE_URL))
 
 def run_migrations_offline() -> None:
     """Run migrations in 'offline' mode.
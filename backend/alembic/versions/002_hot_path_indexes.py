@@ -0,0 +1,69 @@
+"""Hot-path indexes for marketplace, session and pool queries
+
+Revision ID: 002
+Revises: 001
+Create Date: 2024-06-01 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '002'
+down_revision = '001'
+branch_labels = None
+depends_on = None
+
+# Cards that are listed and still up for sale
+AVAILABLE_CARD = sa.text("status = 'ACTIVE' AND buyer_id IS NULL")
+
+# Unsold cards; IS NULL is never parameterised, so the predicate also
+# matches generic plans, and status leads the key for the same reason
+UNSOLD_CARD = sa.text("buyer_id IS NULL")
+
+# (name, table, columns, partial predicate)
+#
+# Partial indexes only match when the planner can see the literal status;
+# the composite twins keep generic (prepared, parameterised) plans indexed.
+INDEXES = [
+    # Marketplace listings: price range and ordering, with the id tie-breaker
+    # for keyset pages; backward scans serve the descending order
+    ('ix_virtual_cards_unsold_status_price_id', 'virtual_cards', ['status', 'current_price', 'id'], UNSOLD_CARD),
+    ('ix_virtual_cards_available_platform_account', 'virtual_cards', ['platform_account_id'], AVAILABLE_CARD),
+    # my-sales / user card lists and my-purchases
+    ('ix_virtual_cards_seller_id', 'virtual_cards', ['seller_id'], None),
+    ('ix_virtual_cards_buyer_id', 'virtual_cards', ['buyer_id'], sa.text("buyer_id IS NOT NULL")),
+    # Demand calculation and pricing trends
+    ('ix_usage_logs_platform_created_at', 'usage_logs', ['platform', 'created_at'], None),
+    ('ix_virtual_cards_created_at', 'virtual_cards', ['created_at'], None),
+    # Public pool browsing and my-pools
+    ('ix_credit_pools_public_active_platform', 'credit_pools', ['platform'],
+     sa.text("is_public AND status = 'ACTIVE'")),
+    ('ix_credit_pools_is_public_status_platform', 'credit_pools', ['is_public', 'status', 'platform'], None),
+    ('ix_credit_pools_owner_id', 'credit_pools', ['owner_id'], None),
+    # Session listings and pool stats
+    ('ix_sessions_buyer_id', 'sessions', ['buyer_id'], None),
+    ('ix_pool_sessions_credit_pool_id_status', 'pool_sessions', ['credit_pool_id', 'status'], None),
+    ('ix_credit_pool_contributions_credit_pool_id', 'credit_pool_contributions', ['credit_pool_id'], None),
+]
+
+
+def upgrade() -> None:
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction block
+    with op.get_context().autocommit_block():
+        for name, table, columns, where in INDEXES:
+            op.create_index(
+                name,
+                table,
+                columns,
+                unique=False,
+                postgresql_concurrently=True,
+                postgresql_where=where,
+                if_not_exists=True
+            )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        for name, table, _, _ in reversed(INDEXES):
+            op.drop_index(name, table_name=table, postgresql_concurrently=True, if_exists=True)
@@ -0,0 +1,48 @@
+"""Keyset pagination indexes for marketplace listings
+
+Revision ID: 003
+Revises: 002
+Create Date: 2024-07-01 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '003'
+down_revision = '002'
+branch_labels = None
+depends_on = None
+
+# Unsold cards; IS NULL is never parameterised, so the predicate also
+# matches generic plans, and status leads the key for the same reason
+UNSOLD_CARD = sa.text("buyer_id IS NULL")
+
+# (name, table, columns, partial predicate)
+INDEXES = [
+    # Listings ordered by balance or age with the id tie-breaker, like the
+    # price keyset index from 002; backward scans serve the descending orders
+    ('ix_virtual_cards_unsold_status_balance_id', 'virtual_cards', ['status', 'current_balance', 'id'], UNSOLD_CARD),
+    ('ix_virtual_cards_unsold_status_created_at_id', 'virtual_cards', ['status', 'created_at', 'id'], UNSOLD_CARD),
+]
+
+
+def upgrade() -> None:
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction block
+    with op.get_context().autocommit_block():
+        for name, table, columns, where in INDEXES:
+            op.create_index(
+                name,
+                table,
+                columns,
+                unique=False,
+                postgresql_concurrently=True,
+                postgresql_where=where,
+                if_not_exists=True
+            )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        for name, table, _, _ in reversed(INDEXES):
+            op.drop_index(name, table_name=table, postgresql_concurrently=True, if_exists=True)
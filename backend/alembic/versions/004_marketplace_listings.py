@@ -0,0 +1,98 @@
+"""Marketplace listings read model
+
+Revision ID: 004
+Revises: 003
+Create Date: 2024-07-15 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision = '004'
+down_revision = '003'
+branch_labels = None
+depends_on = None
+
+# (name, columns) on marketplace_listings; keyset orders with and without
+# a platform filter
+INDEXES = [
+    ('ix_marketplace_listings_price', ['current_price', 'card_id']),
+    ('ix_marketplace_listings_platform_price', ['platform', 'current_price', 'card_id']),
+    ('ix_marketplace_listings_balance', ['available_balance', 'card_id']),
+    ('ix_marketplace_listings_platform_balance', ['platform', 'available_balance', 'card_id']),
+    ('ix_marketplace_listings_created_at', ['created_at', 'card_id']),
+    ('ix_marketplace_listings_platform_created_at', ['platform', 'created_at', 'card_id']),
+]
+
+# Listing keysets on virtual_cards from 002 and 003; listings now read
+# marketplace_listings and purchases claim cards by id, so nothing scans
+# these and every card write would keep paying for them
+UNSOLD_CARD = sa.text("buyer_id IS NULL")
+CARD_KEYSET_INDEXES = [
+    ('ix_virtual_cards_unsold_status_price_id', ['status', 'current_price', 'id']),
+    ('ix_virtual_cards_unsold_status_balance_id', ['status', 'current_balance', 'id']),
+    ('ix_virtual_cards_unsold_status_created_at_id', ['status', 'created_at', 'id']),
+]
+
+BACKFILL_SQL = """
+    INSERT INTO marketplace_listings (card_id, platform, seller_id, seller_username, available_balance,
+                                      price_per_hour, current_price, demand_multiplier,
+                                      utilization_percentage, created_at, expires_at)
+    SELECT vc.id, pa.platform, u.id, u.username, vc.current_balance, vc.price_per_hour,
+           vc.current_price, vc.demand_multiplier,
+           CASE WHEN vc.initial_balance > 0
+                THEN COALESCE(vc.total_charged, 0) / vc.initial_balance * 100
+                ELSE 0 END,
+           COALESCE(vc.created_at, now()), vc.expires_at
+    FROM virtual_cards vc
+    JOIN platform_accounts pa ON pa.id = vc.platform_account_id
+    JOIN users u ON u.id = vc.seller_id
+    WHERE vc.status = 'ACTIVE' AND vc.buyer_id IS NULL
+"""
+
+
+def upgrade() -> None:
+    op.create_table('marketplace_listings',
+        sa.Column('card_id', postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column('platform', postgresql.ENUM('CHATGPT', 'CLAUDE', 'GEMINI', 'MIDJOURNEY', 'CANVA',
+                                              name='platformtype', create_type=False), nullable=False),
+        sa.Column('seller_id', postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column('seller_username', sa.String(length=50), nullable=False),
+        sa.Column('available_balance', sa.Float(), nullable=False),
+        sa.Column('price_per_hour', sa.Float(), nullable=False),
+        sa.Column('current_price', sa.Float(), nullable=False),
+        sa.Column('demand_multiplier', sa.Float(), nullable=True),
+        sa.Column('utilization_percentage', sa.Float(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.Column('expires_at', sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(['card_id'], ['virtual_cards.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('card_id')
+    )
+    op.execute(BACKFILL_SQL)
+    for name, columns in INDEXES:
+        op.create_index(name, 'marketplace_listings', columns, unique=False)
+
+    # CREATE/DROP INDEX CONCURRENTLY cannot run inside a transaction block
+    with op.get_context().autocommit_block():
+        for name, _ in reversed(CARD_KEYSET_INDEXES):
+            op.drop_index(name, table_name='virtual_cards', postgresql_concurrently=True, if_exists=True)
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        for name, columns in CARD_KEYSET_INDEXES:
+            op.create_index(
+                name,
+                'virtual_cards',
+                columns,
+                unique=False,
+                postgresql_concurrently=True,
+                postgresql_where=UNSOLD_CARD,
+                if_not_exists=True
+            )
+
+    for name, _ in reversed(INDEXES):
+        op.drop_index(name, table_name='marketplace_listings')
+    op.drop_table('marketplace_listings')
@@ -0,0 +1,45 @@
+"""Buy order journal
+
+Revision ID: 005
+Revises: 004
+Create Date: 2024-07-29 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision = '005'
+down_revision = '004'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table('order_events',
+        sa.Column('seq', sa.BigInteger(), autoincrement=True, nullable=False),
+        sa.Column('order_id', postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column('kind', sa.Enum('PLACED', 'CANCELLED', 'FILLED', 'FAILED', name='ordereventkind'), nullable=False),
+        sa.Column('buyer_id', postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column('platform', postgresql.ENUM('CHATGPT', 'CLAUDE', 'GEMINI', 'MIDJOURNEY', 'CANVA',
+                                              name='platformtype', create_type=False), nullable=True),
+        sa.Column('max_price', sa.Float(), nullable=True),
+        sa.Column('duration_hours', sa.Integer(), nullable=True),
+        sa.Column('min_balance', sa.Float(), nullable=True),
+        sa.Column('card_id', postgresql.UUID(as_uuid=True), nullable=True),
+        sa.Column('reason', sa.String(length=50), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint('seq')
+    )
+    op.create_index('ix_order_events_order_id', 'order_events', ['order_id'], unique=False)
+    # One terminal event per order
+    op.create_index('uq_order_events_terminal', 'order_events', ['order_id'], unique=True,
+                    postgresql_where=sa.text("kind <> 'PLACED'"))
+
+
+def downgrade() -> None:
+    op.drop_index('uq_order_events_terminal', table_name='order_events')
+    op.drop_index('ix_order_events_order_id', table_name='order_events')
+    op.drop_table('order_events')
+    sa.Enum(name='ordereventkind').drop(op.get_bind(), checkfirst=True)
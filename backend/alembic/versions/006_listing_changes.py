@@ -0,0 +1,32 @@
+"""Marketplace listing change log
+
+Revision ID: 006
+Revises: 005
+Create Date: 2024-08-12 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision = '006'
+down_revision = '005'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table('marketplace_listing_changes',
+        sa.Column('seq', sa.BigInteger(), autoincrement=True, nullable=False),
+        sa.Column('card_id', postgresql.UUID(as_uuid=True), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint('seq')
+    )
+    op.create_index('ix_marketplace_listing_changes_created_at', 'marketplace_listing_changes',
+                    ['created_at'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_marketplace_listing_changes_created_at', table_name='marketplace_listing_changes')
+    op.drop_table('marketplace_listing_changes')
@@ -2,18 +2,21 @@
 Authentication API endpoints
 """
 
+from datetime import datetime
 from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from pydantic import BaseModel, EmailStr
 from app.core.database import get_db
 from app.core.security import (
     authenticate_user, 
     create_access_token, 
-    get_password_hash,
+    password_hasher,
     get_current_user
 )
 from app.models.user import User
 from app.core.config import settings
+from app.services.write_behind import write_behind
 import structlog
 
 logger = structlog.get_logger()
@@ -35,13 +38,16 @@ class Token(BaseModel):
     token_type: str
 
 @router.post("/register", response_model=Token)
-async def register(user_data: UserRegister, db: Session = Depends(get_db)):
+async def register(user_data: UserRegister, db: AsyncSession = Depends(get_db)):
     """Register a new user"""
     
     # Check if user already exists
-    existing_user = db.query(User).filter(
-        (User.email == user_data.email) | (User.username == user_data.username)
-    ).first()
+    result = await db.execute(
+        select(User).where(
+            (User.email == user_data.email) | (User.username == user_data.username)
+        )
+    )
+    existing_user = result.scalars().first()
     
     if existing_user:
         raise HTTPException(
@@ -50,7 +56,7 @@ async def register(user_data: UserRegister, db: Session = Depends(get_db)):
         )
     
     # Create new user
-    hashed_password = get_password_hash(user_data.password)
+    hashed_password = await password_hasher.hash(user_data.password)
     user = User(
         email=user_data.email,
         username=user_data.username,
@@ -60,11 +66,11 @@ async def register(user_data: UserRegister, db: Session = Depends(get_db)):
     )
     
     db.add(user)
-    db.commit()
-    db.refresh(user)
+    await db.commit()
+    await db.refresh(user)
     
     # Create access token
-    access_token = create_access_token(data={"sub": str(user.id)})
+    access_token = create_access_token(data={"sub": str(user.id), "premium": user.is_premium})
     
     logger.info("User registered", user_id=str(user.id), email=user_data.email)
     
@@ -74,10 +80,10 @@ async def register(user_data: UserRegister, db: Session = Depends(get_db)):
     }
 
 @router.post("/login", response_model=Token)
-async def login(user_credentials: UserLogin, db: Session = Depends(get_db)):
+async def login(user_credentials: UserLogin, db: AsyncSession = Depends(get_db)):
     """Login user"""
     
-    user = authenticate_user(db, user_credentials.email, user_credentials.password)
+    user = await authenticate_user(db, user_credentials.email, user_credentials.password)
     
     if not user:
         raise HTTPException(
@@ -86,12 +92,11 @@ async def login(user_credentials: UserLogin, db: Session = Depends(get_db)):
             headers={"WWW-Authenticate": "Bearer"},
         )
     
-    # Update last login
-    user.last_login = datetime.utcnow()
-    db.commit()
+    # Update last login (buffered, written with the next batch)
+    write_behind.touch(User, user.id, last_login=datetime.utcnow())
     
     # Create access token
-    access_token = create_access_token(data={"sub": str(user.id)})
+    access_token = create_access_token(data={"sub": str(user.id), "premium": user.is_premium})
     
     logger.info("User logged in", user_id=str(user.id), email=user_credentials.email)
     
@@ -104,6 +109,8 @@ async def login(user_credentials: UserLogin, db: Session = Depends(get_db)):
 async def get_current_user_info(current_user: User = Depends(get_current_user)):
     """Get current user information"""
     
+    last_login = write_behind.value(current_user, "last_login")
+    
     return {
         "id": str(current_user.id),
         "email": current_user.email,
@@ -117,5 +124,5 @@ async def get_current_user_info(current_user: User = Depends(get_current_user)):
         "total_earned": current_user.total_earned,
         "total_spent": current_user.total_spent,
         "created_at": current_user.created_at.isoformat(),
-        "last_login": current_user.last_login.isoformat() if current_user.last_login else None
+        "last_login": last_login.isoformat() if last_login else None
     }
@@ -2,13 +2,19 @@
 Credit Pools API endpoints
 """
 
+import uuid
+from datetime import datetime
 from fastapi import APIRouter, Depends, HTTPException, status, Query
-from sqlalchemy.orm import Session
+from sqlalchemy import case, func, select
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List, Dict, Any, Optional
-from pydantic import BaseModel
+from pydantic import BaseModel, ConfigDict
 from app.core.database import get_db
-from app.core.security import get_current_user
-from app.models.user import User
+from app.core.http_cache import POOLS, conditional_get
+from app.core.replicas import get_read_db, mark_primary_read
+from app.core.security import get_authenticated_user
+from app.core.user_cache import AuthenticatedUser
+from app.models.credit_pool import CreditPool, PoolStatus
 from app.services.credit_pool_service import CreditPoolService
 import structlog
 
@@ -32,18 +38,37 @@ class CreditPoolSessionRequest(BaseModel):
     requested_amount: float
     duration_hours: int = 1
 
+class PoolSummary(BaseModel):
+    # Validated straight from result rows
+    model_config = ConfigDict(from_attributes=True)
+    
+    pool_id: uuid.UUID
+    name: str
+    platform: str
+    status: PoolStatus
+    total_contributed: float
+    current_balance: float
+    available_balance: float
+    utilization_percentage: float
+    is_public: bool
+    created_at: datetime
+
+class MyPoolsResponse(BaseModel):
+    pools: List[PoolSummary]
+    total_count: int
+
 @router.post("/create")
 async def create_credit_pool(
     request: CreditPoolCreateRequest,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: AuthenticatedUser = Depends(get_authenticated_user),
+    db: AsyncSession = Depends(get_db)
 ):
     """Create a new credit pool"""
     
     try:
         pool_service = CreditPoolService(db)
         
-        pool = pool_service.create_pool(
+        pool = await pool_service.create_pool(
             owner_id=str(current_user.id),
             platform=request.platform,
             pool_name=request.pool_name,
@@ -77,21 +102,23 @@ async def create_credit_pool(
 @router.post("/contribute")
 async def contribute_to_pool(
     request: CreditPoolContributeRequest,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: AuthenticatedUser = Depends(get_authenticated_user),
+    db: AsyncSession = Depends(get_db)
 ):
     """Contribute credits to a pool"""
     
     try:
         pool_service = CreditPoolService(db)
         
-        contribution = pool_service.contribute_to_pool(
+        contribution = await pool_service.contribute_to_pool(
             pool_id=request.pool_id,
             platform_account_id=request.platform_account_id,
             contributor_id=str(current_user.id),
             amount=request.amount
         )
         
+        await mark_primary_read(str(current_user.id))
+        
         logger.info("Contribution made", 
                    contribution_id=str(contribution.id),
                    user_id=str(current_user.id))
@@ -113,15 +140,15 @@ async def contribute_to_pool(
 @router.post("/session/create")
 async def create_pool_session(
     request: CreditPoolSessionRequest,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: AuthenticatedUser = Depends(get_authenticated_user),
+    db: AsyncSession = Depends(get_db)
 ):
     """Create a session from pool credits"""
     
     try:
         pool_service = CreditPoolService(db)
         
-        session = pool_service.create_pool_session(
+        session = await pool_service.create_pool_session(
             pool_id=request.pool_id,
             user_id=str(current_user.id),
             requested_amount=request.requested_amount,
@@ -151,15 +178,15 @@ async def create_pool_session(
 async def use_pool_session(
     session_id: str,
     amount: float,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: AuthenticatedUser = Depends(get_authenticated_user),
+    db: AsyncSession = Depends(get_db)
 ):
     """Use credits from pool session"""
     
     try:
         pool_service = CreditPoolService(db)
         
-        success = pool_service.use_pool_session(session_id, amount)
+        success = await pool_service.use_pool_session(session_id, amount)
         
         if not success:
             raise HTTPException(
@@ -186,15 +213,15 @@ async def use_pool_session(
 @router.post("/session/{session_id}/complete")
 async def complete_pool_session(
     session_id: str,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: AuthenticatedUser = Depends(get_authenticated_user),
+    db: AsyncSession = Depends(get_db)
 ):
     """Complete pool session and return unused credits"""
     
     try:
         pool_service = CreditPoolService(db)
         
-        success = pool_service.complete_pool_session(session_id)
+        success = await pool_service.complete_pool_session(session_id)
         
         if not success:
             raise HTTPException(
@@ -220,15 +247,15 @@ async def complete_pool_session(
 @router.get("/{pool_id}/stats")
 async def get_pool_stats(
     pool_id: str,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: AuthenticatedUser = Depends(get_authenticated_user),
+    db: AsyncSession = Depends(get_db)
 ):
     """Get pool statistics"""
     
     try:
         pool_service = CreditPoolService(db)
         
-        stats = pool_service.get_pool_stats(pool_id)
+        stats = await pool_service.get_pool_stats(pool_id)
         
         logger.info("Pool stats retrieved", pool_id=pool_id)
         
@@ -241,17 +268,17 @@ async def get_pool_stats(
             detail=f"Failed to get stats: {str(e)}"
         )
 
-@router.get("/public")
+@router.get("/public", dependencies=[conditional_get(POOLS)])
 async def get_public_pools(
     platform: Optional[str] = Query(None, description="Filter by platform"),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_read_db)
 ):
     """Get public credit pools"""
     
     try:
         pool_service = CreditPoolService(db)
         
-        pools = pool_service.get_public_pools(platform)
+        pools = await pool_service.get_public_pools(platform)
         
         logger.info("Public pools retrieved", 
                    count=len(pools),
@@ -269,41 +296,41 @@ async def get_public_pools(
             detail="Internal server error"
         )
 
-@router.get("/my-pools")
+@router.get("/my-pools", response_model=MyPoolsResponse)
 async def get_my_pools(
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: AuthenticatedUser = Depends(get_authenticated_user),
+    db: AsyncSession = Depends(get_read_db)
 ):
     """Get user's credit pools"""
     
     try:
-        # Get user's pools
-        pools = db.query(CreditPool).filter(
-            CreditPool.owner_id == current_user.id
-        ).all()
-        
-        pool_list = []
-        for pool in pools:
-            pool_list.append({
-                "pool_id": str(pool.id),
-                "name": pool.pool_name,
-                "platform": pool.platform,
-                "status": pool.status,
-                "total_contributed": pool.total_contributed,
-                "current_balance": pool.current_balance,
-                "available_balance": pool.available_balance,
-                "utilization_percentage": pool.get_utilization_percentage(),
-                "is_public": pool.is_public,
-                "created_at": pool.created_at.isoformat()
-            })
+        # Get user's pools as response rows
+        result = await db.execute(
+            select(
+                CreditPool.id.label("pool_id"),
+                CreditPool.pool_name.label("name"),
+                CreditPool.platform,
+                CreditPool.status,
+                CreditPool.total_contributed,
+                CreditPool.current_balance,
+                CreditPool.available_balance,
+                case(
+                    (CreditPool.total_contributed == 0, 0.0),
+                    else_=CreditPool.total_used / CreditPool.total_contributed * 100
+                ).label("utilization_percentage"),
+                CreditPool.is_public,
+                CreditPool.created_at
+            ).where(CreditPool.owner_id == current_user.id)
+        )
+        pools = result.all()
         
         logger.info("User pools retrieved", 
                    user_id=str(current_user.id),
-                   count=len(pool_list))
+                   count=len(pools))
         
         return {
-            "pools": pool_list,
-            "total_count": len(pool_list)
+            "pools": pools,
+            "total_count": len(pools)
         }
         
     except Exception as e:
@@ -316,15 +343,15 @@ async def get_my_pools(
 @router.post("/{pool_id}/auto-refill")
 async def trigger_auto_refill(
     pool_id: str,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: AuthenticatedUser = Depends(get_authenticated_user),
+    db: AsyncSession = Depends(get_db)
 ):
     """Trigger auto-refill for a pool"""
     
     try:
         pool_service = CreditPoolService(db)
         
-        success = pool_service.auto_refill_pool(pool_id)
+        success = await pool_service.auto_refill_pool(pool_id)
         
         if not success:
             raise HTTPException(
@@ -2,102 +2,392 @@
 Marketplace API endpoints
 """
 
+import dataclasses
+import enum
+import uuid
+from datetime import datetime
 from fastapi import APIRouter, Depends, HTTPException, status, Query
-from sqlalchemy.orm import Session
-from typing import List, Dict, Any, Optional
-from pydantic import BaseModel
-from app.core.database import get_db
-from app.core.security import get_current_user
+from sqlalchemy import func, select, tuple_
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession
+from sqlalchemy.orm import aliased
+from typing import List, Dict, Any, AsyncIterator, Optional
+from pydantic import BaseModel, ConfigDict
+from app.core.database import AsyncSessionLocal, get_db
+from app.core.http_cache import CARDS, PRICES, VersionedCache, conditional_get
+from app.core.pagination import InvalidCursor, decode_cursor, encode_cursor
+from app.core.replicas import get_read_db, get_read_engine, mark_primary_read
+from app.core.responses import stream_json_array
+from app.core.security import get_authenticated_user
+from app.core.user_cache import AuthenticatedUser
 from app.models.user import User
 from app.models.virtual_card import VirtualCard, CardStatus
-from app.models.platform_account import PlatformType
-from app.services.virtual_card_service import VirtualCardService
+from app.models.platform_account import PlatformAccount, PlatformType
+from app.models.listing import Listing
+from app.models.order_event import OrderEvent, OrderEventKind
+from app.repositories.base import coerce_id
+from app.repositories.order_journal import OrderJournal
 from app.services.dynamic_pricing_service import DynamicPricingService
+from app.services.checkout_holds import checkout_holds
+from app.services.listing_counts import listing_counts
+from app.services.listing_search import (
+    BALANCE_RANGES, EXPIRY_RANGES, PRICE_RANGES, SELLER_FACET_SIZE, ListingFilters, listing_snapshot
+)
+from app.services.marketplace_service import PURCHASED, MarketplaceService, PurchaseFailed
 import structlog
 
 logger = structlog.get_logger()
 router = APIRouter()
 
 class MarketplaceListing(BaseModel):
-    card_id: str
-    platform: str
+    # Validated straight from result rows
+    model_config = ConfigDict(from_attributes=True)
+    
+    card_id: uuid.UUID
+    platform: PlatformType
     seller_username: str
     available_balance: float
     price_per_hour: float
     current_price: float
-    demand_multiplier: float
-    created_at: str
-    expires_at: str
+    demand_multiplier: Optional[float]
+    created_at: datetime
+    expires_at: datetime
+    utilization_percentage: float
+    # Set while a buyer is checking out; others cannot purchase until then
+    reserved_until: Optional[datetime] = None
+
+class MarketplaceListingsResponse(BaseModel):
+    listings: List[MarketplaceListing]
+    # All listings matching the filters; an upper bound when not exact
+    total_count: Optional[int]
+    total_count_exact: bool
+    limit: int
+    sort: str
+    next_cursor: Optional[str] = None
+
+class FacetBucket(BaseModel):
+    value: str
+    count: int
+    # Bounds of range facets; max is exclusive and None on the last bucket
+    min: Optional[float] = None
+    max: Optional[float] = None
+
+class ListingSearchResponse(BaseModel):
+    listings: List[MarketplaceListing]
+    # Exact, from the worker's listing snapshot
+    total_count: int
+    limit: int
+    sort: str
+    next_cursor: Optional[str] = None
+    facets: Dict[str, List[FacetBucket]]
+
+class ListingSort(str, enum.Enum):
+    PRICE = "price"
+    PRICE_DESC = "-price"
+    BALANCE = "balance"
+    BALANCE_DESC = "-balance"
+    OLDEST = "created_at"
+    NEWEST = "-created_at"
+
+class Purchase(BaseModel):
+    card_id: uuid.UUID
+    platform: PlatformType
+    seller_username: str
+    purchase_price: float
+    available_balance: float
+    purchased_at: datetime
+    expires_at: datetime
+    status: CardStatus
+
+class PurchasesResponse(BaseModel):
+    purchases: List[Purchase]
+    total_count: int
+
+class Sale(BaseModel):
+    card_id: uuid.UUID
+    platform: PlatformType
+    buyer_username: str
+    sale_price: float
+    initial_balance: float
+    remaining_balance: float
+    sold_at: datetime
+    status: CardStatus
+
+class SalesResponse(BaseModel):
+    sales: List[Sale]
+    total_count: int
+
+class PlatformSummary(BaseModel):
+    platform: PlatformType
+    active_listings: int
+    min_price: float
+    avg_price: float
+    total_available_balance: float
+
+class PlatformsResponse(BaseModel):
+    platforms: List[PlatformSummary]
+    total_count: int
 
 class PurchaseRequest(BaseModel):
     card_id: str
     amount: float
     duration_hours: int = 1
 
-@router.get("/listings")
+class BatchMode(str, enum.Enum):
+    ALL_OR_NOTHING = "all_or_nothing"
+    BEST_EFFORT = "best_effort"
+
+class BatchPurchaseLine(BaseModel):
+    card_id: str
+    duration_hours: int = 1
+
+class BatchPurchaseOrder(BaseModel):
+    """The `quantity` cheapest cards of a platform at or under max_price"""
+    platform: PlatformType
+    quantity: int
+    max_price: float
+    duration_hours: int = 1
+
+class BatchPurchaseRequest(BaseModel):
+    # Either explicit lines or an order
+    lines: List[BatchPurchaseLine] = []
+    order: Optional[BatchPurchaseOrder] = None
+    mode: BatchMode = BatchMode.ALL_OR_NOTHING
+
+class PurchasedCard(BaseModel):
+    card_number: str
+    cvv: str
+    expiry_date: datetime
+    platform: Optional[PlatformType]
+
+class BatchPurchaseResult(BaseModel):
+    card_id: str
+    duration_hours: int
+    # "purchased" or why the line was refused
+    status: str
+    total_cost: Optional[float] = None
+    card_details: Optional[PurchasedCard] = None
+
+class BatchPurchaseResponse(BaseModel):
+    success: bool
+    mode: BatchMode
+    results: List[BatchPurchaseResult]
+    total_cost: float
+    remaining_balance: Optional[float]
+    # Cards an order could not fill
+    unfilled: int = 0
+
+class BuyOrderRequest(BaseModel):
+    platform: PlatformType
+    max_price: float
+    duration_hours: int = 1
+    # Smallest card balance the order accepts
+    min_balance: float = 0.0
+
+class BuyOrderResponse(BaseModel):
+    order_id: uuid.UUID
+    # open, filled, cancelled or failed
+    status: str
+    platform: PlatformType
+    max_price: float
+    duration_hours: int
+    min_balance: float
+    card_id: Optional[uuid.UUID] = None
+    reason: Optional[str] = None
+    placed_at: datetime
+    closed_at: Optional[datetime] = None
+
+class ReserveRequest(BaseModel):
+    card_id: str
+
+class ReservationResponse(BaseModel):
+    card_id: uuid.UUID
+    reserved_until: datetime
+
+# Rows for large result sets are streamed from a server-side cursor
+STREAM_PARTITION_SIZE = 500
+
+# Cards per batch purchase, as lines or an order quantity
+MAX_BATCH_LINES = 100
+
+# Holds are not versioned: they lapse on their own and are taken by
+# purchases too, so a listings page may show a hold's reserved_until
+# for up to this long after it changed
+HOLD_FLAG_LAG_SECONDS = 30
+
+# Per-platform aggregate, recomputed once per worker after listings change
+platform_summary_cache = VersionedCache(CARDS, PRICES)
+
+# Listings come from the marketplace_listings read model, which only
+# holds cards that are for sale; no joins or status filters needed
+LISTING_COLUMNS = (
+    Listing.card_id,
+    Listing.platform,
+    Listing.seller_username,
+    Listing.available_balance,
+    Listing.price_per_hour,
+    Listing.current_price,
+    Listing.demand_multiplier,
+    Listing.created_at,
+    Listing.expires_at,
+    Listing.utilization_percentage,
+)
+
+# Sort column per listing order; card id breaks ties so every key is unique
+# and pages stay stable while cards are bought or listed. Each has a
+# matching (column, card_id) and (platform, column, card_id) index.
+LISTING_SORT_COLUMNS = {
+    "price": Listing.current_price,
+    "balance": Listing.available_balance,
+    "created_at": Listing.created_at,
+}
+
+def _decode_listing_cursor(sort: ListingSort, cursor: str):
+    """(sort value, card id) of the last row of the previous page"""
+    values = decode_cursor(cursor)
+    if len(values) != 3 or values[0] != sort.value:
+        raise InvalidCursor("Cursor was issued for a different sort")
+    try:
+        value = datetime.fromisoformat(values[1]) if sort.value.lstrip("-") == "created_at" else float(values[1])
+        card_id = uuid.UUID(values[2])
+    except (TypeError, ValueError) as e:
+        raise InvalidCursor(str(e)) from e
+    return value, card_id
+
+def _listing_keyset(sort: ListingSort, cursor: Optional[str]):
+    """ORDER BY clauses and the seek condition for the page after `cursor`"""
+    descending = sort.value.startswith("-")
+    column = LISTING_SORT_COLUMNS[sort.value.lstrip("-")]
+    
+    if descending:
+        order_by = (column.desc(), Listing.card_id.desc())
+    else:
+        order_by = (column.asc(), Listing.card_id.asc())
+    
+    if cursor is None:
+        return order_by, None
+    
+    value, card_id = _decode_listing_cursor(sort, cursor)
+    
+    # Row comparison so Postgres seeks straight into the composite index
+    key = tuple_(column, Listing.card_id)
+    seek = key < tuple_(value, card_id) if descending else key > tuple_(value, card_id)
+    return order_by, seek
+
+async def _flag_reserved(listings: List[Any], fields) -> List[Any]:
+    """Set reserved_until on cards someone is checking out; one MGET for the page"""
+    try:
+        holds = await checkout_holds.holds(row.card_id for row in listings)
+    except Exception as e:
+        logger.warning("Failed to read checkout holds", error=str(e))
+        return listings
+    return [
+        {**fields(row), "reserved_until": holds[str(row.card_id)].expires_at}
+        if str(row.card_id) in holds else row
+        for row in listings
+    ]
+
+def _range_facet(counts, ranges) -> List[Dict[str, Any]]:
+    return [
+        {
+            "value": f"{low:g}-{high:g}" if high is not None else f"{low:g}+",
+            "count": counts.get(index, 0),
+            "min": low,
+            "max": high
+        }
+        for index, (low, high) in enumerate(ranges)
+    ]
+
+def _listing_cursor(sort: ListingSort, row) -> str:
+    """Cursor pointing just past `row`"""
+    column = sort.value.lstrip("-")
+    value = {
+        "price": row.current_price,
+        "balance": row.available_balance,
+        "created_at": row.created_at,
+    }[column]
+    return encode_cursor(sort.value, value, row.card_id)
+
+@router.get(
+    "/listings",
+    response_model=MarketplaceListingsResponse,
+    dependencies=[conditional_get(CARDS, PRICES, bucket_seconds=HOLD_FLAG_LAG_SECONDS)]
+)
 async def get_marketplace_listings(
-    platform: Optional[str] = Query(None, description="Filter by platform"),
+    platform: Optional[PlatformType] = Query(None, description="Filter by platform"),
     min_price: Optional[float] = Query(None, description="Minimum price per hour"),
     max_price: Optional[float] = Query(None, description="Maximum price per hour"),
     min_balance: Optional[float] = Query(None, description="Minimum available balance"),
-    limit: int = Query(50, description="Number of listings to return"),
-    offset: int = Query(0, description="Number of listings to skip"),
-    db: Session = Depends(get_db)
+    sort: ListingSort = Query(ListingSort.PRICE, description="Sort order; prefix with - for descending"),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
+    limit: int = Query(50, ge=1, le=200, description="Number of listings to return"),
+    db: AsyncSession = Depends(get_read_db)
 ):
     """Get marketplace listings"""
     
     try:
-        # Build query
-        query = db.query(VirtualCard).filter(
-            VirtualCard.status == CardStatus.ACTIVE,
-            VirtualCard.buyer_id.is_(None)  # Not yet purchased
-        )
+        try:
+            order_by, seek = _listing_keyset(sort, cursor)
+        except InvalidCursor:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Invalid cursor"
+            )
+        
+        # Single-table range read; no ORM objects are built
+        query = select(*LISTING_COLUMNS)
         
         # Apply filters
         if platform:
-            query = query.join(VirtualCard.platform_account).filter(
-                VirtualCard.platform_account.has(platform=platform)
-            )
+            query = query.where(Listing.platform == platform)
         
         if min_price:
-            query = query.filter(VirtualCard.current_price >= min_price)
+            query = query.where(Listing.current_price >= min_price)
         
         if max_price:
-            query = query.filter(VirtualCard.current_price <= max_price)
+            query = query.where(Listing.current_price <= max_price)
         
         if min_balance:
-            query = query.filter(VirtualCard.current_balance >= min_balance)
-        
-        # Apply pagination
-        listings = query.offset(offset).limit(limit).all()
-        
-        # Format response
-        marketplace_listings = []
-        for card in listings:
-            marketplace_listings.append({
-                "card_id": str(card.id),
-                "platform": card.platform_account.platform,
-                "seller_username": card.seller.username,
-                "available_balance": card.current_balance,
-                "price_per_hour": card.price_per_hour,
-                "current_price": card.current_price,
-                "demand_multiplier": card.demand_multiplier,
-                "created_at": card.created_at.isoformat(),
-                "expires_at": card.expires_at.isoformat(),
-                "utilization_percentage": (card.total_charged / card.initial_balance) * 100 if card.initial_balance > 0 else 0
-            })
+            query = query.where(Listing.available_balance >= min_balance)
+        
+        # Seek past the previous page; one extra row tells us if there is a next
+        if seek is not None:
+            query = query.where(seek)
+        result = await db.execute(query.order_by(*order_by).limit(limit + 1))
+        listings = result.all()
+        
+        next_cursor = None
+        if len(listings) > limit:
+            listings = listings[:limit]
+            next_cursor = _listing_cursor(sort, listings[-1])
+        
+        listings = await _flag_reserved(listings, lambda row: row._mapping)
+        
+        # Maintained counters; the balance filter has no counter dimension
+        try:
+            total_count, total_count_exact = await listing_counts.count(
+                platform, min_price or None, max_price or None
+            )
+            total_count_exact = total_count_exact and not min_balance
+        except Exception as e:
+            logger.warning("Failed to read listing counts", error=str(e))
+            total_count, total_count_exact = None, False
         
         logger.info("Marketplace listings retrieved", 
-                   count=len(marketplace_listings),
+                   count=len(listings),
                    platform=platform)
         
         return {
-            "listings": marketplace_listings,
-            "total_count": len(marketplace_listings),
-            "offset": offset,
-            "limit": limit
+            "listings": listings,
+            "total_count": total_count,
+            "total_count_exact": total_count_exact,
+            "limit": limit,
+            "sort": sort.value,
+            "next_cursor": next_cursor
         }
         
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error("Failed to get marketplace listings", error=str(e))
         raise HTTPException(
@@ -105,124 +395,498 @@ async def get_marketplace_listings(
             detail="Internal server error"
         )
 
+# Refusals as the endpoint has always reported them
+PURCHASE_ERRORS = {
+    PurchaseFailed.NOT_FOUND: (status.HTTP_404_NOT_FOUND, "Card not found"),
+    PurchaseFailed.SOLD: (status.HTTP_400_BAD_REQUEST, "Card already purchased"),
+    PurchaseFailed.UNAVAILABLE: (status.HTTP_400_BAD_REQUEST, "Card is not available for purchase"),
+    PurchaseFailed.INSUFFICIENT_BALANCE: (status.HTTP_400_BAD_REQUEST, "Insufficient balance"),
+}
+
+def _retry_after(hold) -> int:
+    """Seconds until a hold lapses, for the Retry-After header"""
+    return max(1, int((hold.expires_at - datetime.utcnow()).total_seconds()) + 1)
+
+# Snapshot attribute each listing sort orders by
+SEARCH_SORT_KEYS = {
+    "price": "current_price",
+    "balance": "available_balance",
+    "created_at": "created_at",
+}
+
+# Results depend on the clock (expired listings drop out, hours-left
+# filters and expiry facets move) as well as on holds, so the ETag moves
+# with time too
+SEARCH_ETAG_BUCKET_SECONDS = min(60, HOLD_FLAG_LAG_SECONDS)
+
+@router.get(
+    "/search",
+    response_model=ListingSearchResponse,
+    dependencies=[conditional_get(CARDS, PRICES, bucket_seconds=SEARCH_ETAG_BUCKET_SECONDS)]
+)
+async def search_marketplace_listings(
+    platform: List[PlatformType] = Query([], description="Platforms to include; repeatable"),
+    seller: List[str] = Query([], description="Seller usernames to include; repeatable"),
+    min_price: Optional[float] = Query(None, description="Minimum price per hour"),
+    max_price: Optional[float] = Query(None, description="Maximum price per hour"),
+    min_balance: Optional[float] = Query(None, description="Minimum available balance"),
+    max_balance: Optional[float] = Query(None, description="Maximum available balance"),
+    min_hours_left: Optional[float] = Query(None, description="Expiring no sooner than this many hours from now"),
+    max_hours_left: Optional[float] = Query(None, description="Expiring within this many hours"),
+    sort: ListingSort = Query(ListingSort.PRICE, description="Sort order; prefix with - for descending"),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
+    limit: int = Query(50, ge=1, le=200, description="Number of listings to return")
+):
+    """Search listings, with counts per platform, price, balance, seller and expiry
+
+    Each facet's counts apply every other filter but its own, so they
+    show what picking a different value of that facet would return.
+    """
+    
+    try:
+        try:
+            after = _decode_listing_cursor(sort, cursor) if cursor else None
+        except InvalidCursor:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Invalid cursor"
+            )
+        
+        try:
+            await listing_snapshot.refresh()
+        except Exception as e:
+            # A slightly stale snapshot beats no results
+            if not listing_snapshot.loaded:
+                raise
+            logger.warning("Failed to refresh listing snapshot", error=str(e))
+        
+        result = listing_snapshot.search(
+            ListingFilters(
+                platforms=set(platform),
+                sellers=set(seller),
+                min_price=min_price,
+                max_price=max_price,
+                min_balance=min_balance,
+                max_balance=max_balance,
+                min_hours_left=min_hours_left,
+                max_hours_left=max_hours_left
+            ),
+            SEARCH_SORT_KEYS[sort.value.lstrip("-")],
+            sort.value.startswith("-"),
+            after,
+            limit
+        )
+        listings = await _flag_reserved(result.listings, dataclasses.asdict)
+        facets = result.facets
+        
+        return {
+            "listings": listings,
+            "total_count": result.total_count,
+            "limit": limit,
+            "sort": sort.value,
+            "next_cursor": _listing_cursor(sort, result.listings[-1]) if result.has_more else None,
+            "facets": {
+                "platform": [
+                    {"value": p.value, "count": facets["platform"].get(p, 0)} for p in PlatformType
+                ],
+                "price": _range_facet(facets["price"], PRICE_RANGES),
+                "balance": _range_facet(facets["balance"], BALANCE_RANGES),
+                "seller": [
+                    {"value": username, "count": count}
+                    for username, count in facets["seller"].most_common(SELLER_FACET_SIZE)
+                ],
+                "expiry": _range_facet(facets["expiry"], EXPIRY_RANGES)
+            }
+        }
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error("Failed to search marketplace listings", error=str(e))
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Internal server error"
+        )
+
+@router.post("/reserve", response_model=ReservationResponse)
+async def reserve_card(
+    request: ReserveRequest,
+    current_user: AuthenticatedUser = Depends(get_authenticated_user)
+):
+    """Hold a card for checkout; purchase it before the hold expires"""
+    
+    try:
+        card_id = coerce_id(request.card_id)
+        if card_id is None:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Card not found"
+            )
+        
+        acquired, hold = await checkout_holds.reserve(card_id, current_user.id)
+        if not acquired:
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail="Card is reserved by another buyer",
+                headers={"Retry-After": str(_retry_after(hold))}
+            )
+        return {"card_id": card_id, "reserved_until": hold.expires_at}
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error("Failed to reserve card", error=str(e))
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Internal server error"
+        )
+
+@router.delete("/reserve/{card_id}")
+async def release_card(
+    card_id: str,
+    current_user: AuthenticatedUser = Depends(get_authenticated_user)
+):
+    """Release a card held by the current user"""
+    
+    try:
+        released = await checkout_holds.release(card_id, current_user.id)
+        if not released:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="No reservation for this card"
+            )
+        return {"message": "Reservation released"}
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error("Failed to release card", error=str(e))
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Internal server error"
+        )
+
 @router.post("/purchase")
 async def purchase_credits(
     request: PurchaseRequest,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: AuthenticatedUser = Depends(get_authenticated_user),
+    db: AsyncSession = Depends(get_db)
 ):
-    """Purchase credits from marketplace"""
+    """Purchase credits from marketplace
+
+    Takes the card's checkout hold first, or keeps the one the buyer
+    already has, so only one buyer at a time reaches the database.
+    """
     
     try:
-        card_service = VirtualCardService(db)
-        
-        # Get virtual card
-        card = card_service.get_card_details(request.card_id)
-        if not card:
+        card_id = coerce_id(request.card_id)
+        if card_id is None:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail="Card not found"
             )
         
-        # Check if card is available
-        if card.buyer_id is not None:
+        try:
+            acquired, hold = await checkout_holds.reserve(card_id, current_user.id, exclusive=False)
+        except Exception as e:
+            # The conditional UPDATE still settles the race, just in Postgres
+            logger.warning("Failed to take checkout hold", error=str(e))
+            acquired, hold = True, None
+        if not acquired:
             raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="Card already purchased"
+                status_code=status.HTTP_409_CONFLICT,
+                detail="Card is reserved by another buyer",
+                headers={"Retry-After": str(_retry_after(hold))}
             )
         
-        if not card.can_be_used():
+        try:
+            purchase = await MarketplaceService(db).purchase(
+                current_user.id, card_id, request.duration_hours
+            )
+        except PurchaseFailed as e:
+            status_code, detail = PURCHASE_ERRORS[e.reason]
+            raise HTTPException(status_code=status_code, detail=detail)
+        finally:
+            # Sold or refused, the hold has served its purpose
+            if hold is not None:
+                try:
+                    await checkout_holds.release(card_id, current_user.id)
+                except Exception as e:
+                    logger.warning("Failed to release checkout hold", error=str(e))
+        
+        await mark_primary_read(str(current_user.id))
+        
+        return {
+            "success": True,
+            "card_id": request.card_id,
+            "total_cost": purchase.total_cost,
+            "duration_hours": request.duration_hours,
+            "remaining_balance": purchase.remaining_balance,
+            "card_details": {
+                "card_number": purchase.card_number,
+                "cvv": purchase.cvv,
+                "expiry_date": purchase.expiry_date.isoformat(),
+                "platform": purchase.platform
+            }
+        }
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error("Failed to purchase credits", error=str(e))
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Internal server error"
+        )
+
+def _order_status(events: List[OrderEvent]) -> Dict[str, Any]:
+    """BuyOrderResponse fields from an order's journal events"""
+    placed = events[0]
+    closed = events[-1] if len(events) > 1 else None
+    return {
+        "order_id": placed.order_id,
+        "status": closed.kind.value if closed else "open",
+        "platform": placed.platform,
+        "max_price": placed.max_price,
+        "duration_hours": placed.duration_hours,
+        "min_balance": placed.min_balance,
+        "card_id": closed.card_id if closed else None,
+        "reason": closed.reason if closed else None,
+        "placed_at": placed.created_at,
+        "closed_at": closed.created_at if closed else None
+    }
+
+@router.post("/orders", response_model=BuyOrderResponse, status_code=status.HTTP_202_ACCEPTED)
+async def place_buy_order(
+    request: BuyOrderRequest,
+    current_user: AuthenticatedUser = Depends(get_authenticated_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """Place a buy order; the order book fills it with the best matching listing"""
+    
+    try:
+        if request.max_price <= 0 or request.duration_hours < 1 or request.min_balance < 0:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
-                detail="Card is not available for purchase"
+                detail="max_price must be positive, duration_hours at least 1 and min_balance not negative"
             )
         
-        # Calculate total cost
-        total_cost = card.current_price * request.duration_hours
+        event = OrderJournal(db).place(
+            current_user.id,
+            request.platform,
+            request.max_price,
+            request.duration_hours,
+            request.min_balance
+        )
+        await db.commit()
+        
+        logger.info("Buy order placed",
+                   order_id=str(event.order_id),
+                   buyer_id=str(current_user.id),
+                   platform=request.platform.value,
+                   max_price=request.max_price)
+        
+        return _order_status([event])
         
-        # Check if user has sufficient balance
-        if current_user.balance < total_cost:
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error("Failed to place buy order", error=str(e))
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Internal server error"
+        )
+
+@router.get("/orders/{order_id}", response_model=BuyOrderResponse)
+async def get_buy_order(
+    order_id: str,
+    current_user: AuthenticatedUser = Depends(get_authenticated_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """Get the status of one of the current user's buy orders"""
+    
+    try:
+        events = await OrderJournal(db).history(order_id)
+        if not events or events[0].buyer_id != current_user.id:
             raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="Insufficient balance"
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Order not found"
             )
         
-        # Assign card to buyer
-        card.buyer_id = current_user.id
+        return _order_status(events)
         
-        # Deduct from user balance
-        current_user.balance -= total_cost
-        current_user.total_spent += total_cost
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error("Failed to get buy order", error=str(e))
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Internal server error"
+        )
+
+@router.delete("/orders/{order_id}", response_model=BuyOrderResponse)
+async def cancel_buy_order(
+    order_id: str,
+    current_user: AuthenticatedUser = Depends(get_authenticated_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """Cancel an open buy order"""
+    
+    try:
+        journal = OrderJournal(db)
+        events = await journal.history(order_id)
+        if not events or events[0].buyer_id != current_user.id:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Order not found"
+            )
         
-        # Add to seller balance
-        seller = card.seller
-        seller.balance += total_cost
-        seller.total_earned += total_cost
+        if len(events) == 1:
+            events.append(journal.close(events[0].order_id, current_user.id, OrderEventKind.CANCELLED))
+            try:
+                await db.commit()
+            except IntegrityError:
+                # Filled or failed since it was read
+                await db.rollback()
+                events = await journal.history(order_id)
         
-        db.commit()
+        if events[-1].kind != OrderEventKind.CANCELLED:
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail=f"Order is already {events[-1].kind.value}"
+            )
         
-        logger.info("Credits purchased", 
-                   card_id=request.card_id,
-                   buyer_id=str(current_user.id),
-                   amount=total_cost)
+        return _order_status(events)
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error("Failed to cancel buy order", error=str(e))
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Internal server error"
+        )
+
+@router.post("/purchase:batch", response_model=BatchPurchaseResponse)
+async def purchase_batch(
+    request: BatchPurchaseRequest,
+    current_user: AuthenticatedUser = Depends(get_authenticated_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """Purchase many cards in one transaction, with a result per line"""
+    
+    try:
+        if bool(request.lines) == (request.order is not None):
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Provide either lines or an order"
+            )
+        
+        order = request.order
+        quantity = order.quantity if order else len(request.lines)
+        hours = [order.duration_hours] if order else [line.duration_hours for line in request.lines]
+        if not 1 <= quantity <= MAX_BATCH_LINES:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"A batch buys between 1 and {MAX_BATCH_LINES} cards"
+            )
+        if min(hours) < 1:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="duration_hours must be at least 1"
+            )
+        
+        service = MarketplaceService(db)
+        all_or_nothing = request.mode == BatchMode.ALL_OR_NOTHING
+        if order:
+            result = await service.purchase_order(
+                current_user.id, order.platform, order.quantity,
+                order.duration_hours, order.max_price, all_or_nothing
+            )
+        else:
+            result = await service.purchase_batch(
+                current_user.id,
+                [(line.card_id, line.duration_hours) for line in request.lines],
+                all_or_nothing
+            )
+        
+        if any(line.status == PURCHASED for line in result.lines):
+            await mark_primary_read(str(current_user.id))
         
         return {
-            "success": True,
-            "card_id": request.card_id,
-            "total_cost": total_cost,
-            "duration_hours": request.duration_hours,
-            "remaining_balance": current_user.balance,
-            "card_details": {
-                "card_number": card.card_number,
-                "cvv": card.cvv,
-                "expiry_date": card.expiry_date.isoformat(),
-                "platform": card.platform_account.platform
-            }
+            "success": result.success,
+            "mode": request.mode,
+            "results": [
+                {
+                    "card_id": str(line.card_id),
+                    "duration_hours": line.duration_hours,
+                    "status": line.status,
+                    "total_cost": line.purchase.total_cost if line.purchase else None,
+                    "card_details": {
+                        "card_number": line.purchase.card_number,
+                        "cvv": line.purchase.cvv,
+                        "expiry_date": line.purchase.expiry_date,
+                        "platform": line.purchase.platform
+                    } if line.purchase else None
+                }
+                for line in result.lines
+            ],
+            "total_cost": result.total_cost,
+            "remaining_balance": result.remaining_balance,
+            "unfilled": result.unfilled
         }
         
     except HTTPException:
         raise
     except Exception as e:
-        logger.error("Failed to purchase credits", error=str(e))
+        logger.error("Failed to purchase batch", error=str(e))
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Internal server error"
         )
 
-@router.get("/my-purchases")
+async def _stream_rows(engine: AsyncEngine, statement) -> AsyncIterator[List[Any]]:
+    """Partitions of result rows, read on a session the stream owns
+
+    A streamed body is sent after the endpoint returns, by which time its
+    request-scoped session may be closed.
+    """
+    try:
+        async with AsyncSessionLocal(bind=engine) as db:
+            result = await db.stream(statement)
+            async for rows in result.mappings().partitions(STREAM_PARTITION_SIZE):
+                yield rows
+    except Exception as e:
+        logger.error("Failed to stream rows", error=str(e))
+        raise
+
+@router.get("/my-purchases", responses={200: {"model": PurchasesResponse}})
 async def get_my_purchases(
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: AuthenticatedUser = Depends(get_authenticated_user),
+    engine: AsyncEngine = Depends(get_read_engine)
 ):
     """Get user's purchased credits"""
     
     try:
-        # Get user's purchased cards
-        purchased_cards = db.query(VirtualCard).filter(
-            VirtualCard.buyer_id == current_user.id
-        ).all()
-        
-        purchases = []
-        for card in purchased_cards:
-            purchases.append({
-                "card_id": str(card.id),
-                "platform": card.platform_account.platform,
-                "seller_username": card.seller.username,
-                "purchase_price": card.current_price,
-                "available_balance": card.current_balance,
-                "purchased_at": card.created_at.isoformat(),
-                "expires_at": card.expires_at.isoformat(),
-                "status": card.status
-            })
-        
-        logger.info("User purchases retrieved", 
-                   user_id=str(current_user.id),
-                   count=len(purchases))
+        # Get user's purchased cards, streamed as they are read
+        statement = select(
+            VirtualCard.id.label("card_id"),
+            PlatformAccount.platform.label("platform"),
+            User.username.label("seller_username"),
+            VirtualCard.current_price.label("purchase_price"),
+            VirtualCard.current_balance.label("available_balance"),
+            VirtualCard.created_at.label("purchased_at"),
+            VirtualCard.expires_at,
+            VirtualCard.status
+        ).join(
+            VirtualCard.platform_account
+        ).join(
+            VirtualCard.seller
+        ).where(VirtualCard.buyer_id == current_user.id)
         
-        return {
-            "purchases": purchases,
-            "total_count": len(purchases)
-        }
+        logger.info("User purchases retrieved", user_id=str(current_user.id))
+        
+        return stream_json_array({}, "purchases", _stream_rows(engine, statement))
         
     except Exception as e:
         logger.error("Failed to get user purchases", error=str(e))
@@ -231,41 +895,38 @@ async def get_my_purchases(
             detail="Internal server error"
         )
 
-@router.get("/my-sales")
+@router.get("/my-sales", responses={200: {"model": SalesResponse}})
 async def get_my_sales(
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: AuthenticatedUser = Depends(get_authenticated_user),
+    engine: AsyncEngine = Depends(get_read_engine)
 ):
     """Get user's sold credits"""
     
     try:
-        # Get user's sold cards
-        sold_cards = db.query(VirtualCard).filter(
+        Buyer = aliased(User)
+        
+        # Get user's sold cards, streamed as they are read
+        statement = select(
+            VirtualCard.id.label("card_id"),
+            PlatformAccount.platform.label("platform"),
+            func.coalesce(Buyer.username, "Unknown").label("buyer_username"),
+            VirtualCard.current_price.label("sale_price"),
+            VirtualCard.initial_balance,
+            VirtualCard.current_balance.label("remaining_balance"),
+            VirtualCard.created_at.label("sold_at"),
+            VirtualCard.status
+        ).join(
+            VirtualCard.platform_account
+        ).outerjoin(
+            Buyer, VirtualCard.buyer_id == Buyer.id
+        ).where(
             VirtualCard.seller_id == current_user.id,
             VirtualCard.buyer_id.isnot(None)
-        ).all()
-        
-        sales = []
-        for card in sold_cards:
-            sales.append({
-                "card_id": str(card.id),
-                "platform": card.platform_account.platform,
-                "buyer_username": card.buyer.username if card.buyer else "Unknown",
-                "sale_price": card.current_price,
-                "initial_balance": card.initial_balance,
-                "remaining_balance": card.current_balance,
-                "sold_at": card.created_at.isoformat(),
-                "status": card.status
-            })
-        
-        logger.info("User sales retrieved", 
-                   user_id=str(current_user.id),
-                   count=len(sales))
+        )
         
-        return {
-            "sales": sales,
-            "total_count": len(sales)
-        }
+        logger.info("User sales retrieved", user_id=str(current_user.id))
+        
+        return stream_json_array({}, "sales", _stream_rows(engine, statement))
         
     except Exception as e:
         logger.error("Failed to get user sales", error=str(e))
@@ -274,33 +935,29 @@ async def get_my_sales(
             detail="Internal server error"
         )
 
-@router.get("/platforms")
-async def get_available_platforms(db: Session = Depends(get_db)):
+@router.get(
+    "/platforms",
+    response_model=PlatformsResponse,
+    dependencies=[conditional_get(CARDS, PRICES)]
+)
+async def get_available_platforms(db: AsyncSession = Depends(get_read_db)):
     """Get available platforms in marketplace"""
     
     try:
-        # Get platforms with active listings
-        platforms = db.query(VirtualCard.platform_account).join(
-            VirtualCard.platform_account
-        ).filter(
-            VirtualCard.status == CardStatus.ACTIVE,
-            VirtualCard.buyer_id.is_(None)
-        ).distinct().all()
-        
-        platform_list = []
-        for platform_account in platforms:
-            # Count active listings for this platform
-            listing_count = db.query(VirtualCard).filter(
-                VirtualCard.platform_account_id == platform_account.id,
-                VirtualCard.status == CardStatus.ACTIVE,
-                VirtualCard.buyer_id.is_(None)
-            ).count()
-            
-            platform_list.append({
-                "platform": platform_account.platform,
-                "active_listings": listing_count,
-                "is_premium": platform_account.is_premium
-            })
+        async def summarise():
+            # One pass over the listings read model, grouped by platform
+            result = await db.execute(
+                select(
+                    Listing.platform,
+                    func.count().label("active_listings"),
+                    func.min(Listing.current_price).label("min_price"),
+                    func.avg(Listing.current_price).label("avg_price"),
+                    func.sum(Listing.available_balance).label("total_available_balance")
+                ).group_by(Listing.platform).order_by(Listing.platform)
+            )
+            return [dict(row) for row in result.mappings()]
+        
+        platform_list = await platform_summary_cache.get(summarise)
         
         logger.info("Available platforms retrieved", count=len(platform_list))
         
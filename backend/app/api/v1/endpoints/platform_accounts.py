@@ -2,13 +2,15 @@
 Platform Accounts API endpoints
 """
 
+from datetime import datetime
 from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List, Dict, Any
 from pydantic import BaseModel
 from app.core.database import get_db
-from app.core.security import get_current_user
-from app.models.user import User
+from app.core.security import get_authenticated_user
+from app.core.user_cache import AuthenticatedUser
 from app.models.platform_account import PlatformAccount, PlatformType, AccountStatus
 import structlog
 
@@ -32,18 +34,21 @@ class PlatformAccountUpdateRequest(BaseModel):
 @router.post("/connect")
 async def connect_platform_account(
     request: PlatformAccountCreateRequest,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: AuthenticatedUser = Depends(get_authenticated_user),
+    db: AsyncSession = Depends(get_db)
 ):
     """Connect a new platform account"""
     
     try:
         # Check if account already exists
-        existing_account = db.query(PlatformAccount).filter(
-            PlatformAccount.user_id == current_user.id,
-            PlatformAccount.platform == request.platform,
-            PlatformAccount.email == request.email
-        ).first()
+        result = await db.execute(
+            select(PlatformAccount).where(
+                PlatformAccount.user_id == current_user.id,
+                PlatformAccount.platform == request.platform,
+                PlatformAccount.email == request.email
+            )
+        )
+        existing_account = result.scalars().first()
         
         if existing_account:
             raise HTTPException(
@@ -62,8 +67,8 @@ async def connect_platform_account(
         )
         
         db.add(platform_account)
-        db.commit()
-        db.refresh(platform_account)
+        await db.commit()
+        await db.refresh(platform_account)
         
         logger.info("Platform account connected", 
                    account_id=str(platform_account.id),
@@ -89,15 +94,16 @@ async def connect_platform_account(
 
 @router.get("/")
 async def get_platform_accounts(
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: AuthenticatedUser = Depends(get_authenticated_user),
+    db: AsyncSession = Depends(get_db)
 ):
     """Get user's platform accounts"""
     
     try:
-        accounts = db.query(PlatformAccount).filter(
-            PlatformAccount.user_id == current_user.id
-        ).all()
+        result = await db.execute(
+            select(PlatformAccount).where(PlatformAccount.user_id == current_user.id)
+        )
+        accounts = result.scalars().all()
         
         account_list = []
         for account in accounts:
@@ -136,16 +142,19 @@ async def get_platform_accounts(
 @router.get("/{account_id}")
 async def get_platform_account(
     account_id: str,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: AuthenticatedUser = Depends(get_authenticated_user),
+    db: AsyncSession = Depends(get_db)
 ):
     """Get specific platform account details"""
     
     try:
-        account = db.query(PlatformAccount).filter(
-            PlatformAccount.id == account_id,
-            PlatformAccount.user_id == current_user.id
-        ).first()
+        result = await db.execute(
+            select(PlatformAccount).where(
+                PlatformAccount.id == account_id,
+                PlatformAccount.user_id == current_user.id
+            )
+        )
+        account = result.scalars().first()
         
         if not account:
             raise HTTPException(
@@ -184,16 +193,19 @@ async def get_platform_account(
 async def update_platform_account(
     account_id: str,
     request: PlatformAccountUpdateRequest,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: AuthenticatedUser = Depends(get_authenticated_user),
+    db: AsyncSession = Depends(get_db)
 ):
     """Update platform account settings"""
     
     try:
-        account = db.query(PlatformAccount).filter(
-            PlatformAccount.id == account_id,
-            PlatformAccount.user_id == current_user.id
-        ).first()
+        result = await db.execute(
+            select(PlatformAccount).where(
+                PlatformAccount.id == account_id,
+                PlatformAccount.user_id == current_user.id
+            )
+        )
+        account = result.scalars().first()
         
         if not account:
             raise HTTPException(
@@ -215,7 +227,7 @@ async def update_platform_account(
         if request.max_pool_amount is not None:
             account.max_pool_amount = request.max_pool_amount
         
-        db.commit()
+        await db.commit()
         
         logger.info("Platform account updated", 
                    account_id=account_id,
@@ -235,16 +247,19 @@ async def update_platform_account(
 @router.delete("/{account_id}")
 async def disconnect_platform_account(
     account_id: str,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: AuthenticatedUser = Depends(get_authenticated_user),
+    db: AsyncSession = Depends(get_db)
 ):
     """Disconnect platform account"""
     
     try:
-        account = db.query(PlatformAccount).filter(
-            PlatformAccount.id == account_id,
-            PlatformAccount.user_id == current_user.id
-        ).first()
+        result = await db.execute(
+            select(PlatformAccount).where(
+                PlatformAccount.id == account_id,
+                PlatformAccount.user_id == current_user.id
+            )
+        )
+        account = result.scalars().first()
         
         if not account:
             raise HTTPException(
@@ -254,10 +269,12 @@ async def disconnect_platform_account(
         
         # Check if account has active virtual cards
         from app.models.virtual_card import VirtualCard
-        active_cards = db.query(VirtualCard).filter(
-            VirtualCard.platform_account_id == account_id,
-            VirtualCard.status == "active"
-        ).count()
+        active_cards = await db.scalar(
+            select(func.count()).select_from(VirtualCard).where(
+                VirtualCard.platform_account_id == account_id,
+                VirtualCard.status == "active"
+            )
+        )
         
         if active_cards > 0:
             raise HTTPException(
@@ -266,8 +283,8 @@ async def disconnect_platform_account(
             )
         
         # Delete account
-        db.delete(account)
-        db.commit()
+        await db.delete(account)
+        await db.commit()
         
         logger.info("Platform account disconnected", 
                    account_id=account_id,
@@ -287,16 +304,19 @@ async def disconnect_platform_account(
 @router.post("/{account_id}/sync-credits")
 async def sync_credits(
     account_id: str,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: AuthenticatedUser = Depends(get_authenticated_user),
+    db: AsyncSession = Depends(get_db)
 ):
     """Sync credits from platform account"""
     
     try:
-        account = db.query(PlatformAccount).filter(
-            PlatformAccount.id == account_id,
-            PlatformAccount.user_id == current_user.id
-        ).first()
+        result = await db.execute(
+            select(PlatformAccount).where(
+                PlatformAccount.id == account_id,
+                PlatformAccount.user_id == current_user.id
+            )
+        )
+        account = result.scalars().first()
         
         if not account:
             raise HTTPException(
@@ -307,7 +327,7 @@ async def sync_credits(
         # This would integrate with platform APIs to get actual credit balance
         # For now, just update the timestamp
         account.last_credit_sync = datetime.utcnow()
-        db.commit()
+        await db.commit()
         
         logger.info("Credits synced", 
                    account_id=account_id,
@@ -3,30 +3,36 @@ Dynamic Pricing API endpoints
 """
 
 from fastapi import APIRouter, Depends, HTTPException, status, Query
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import Dict, Any, Optional
 from app.core.database import get_db
-from app.core.security import get_current_user
-from app.models.user import User
+from app.core.http_cache import CARDS, PRICES, conditional_get
+from app.core.replicas import get_read_db
+from app.core.security import get_authenticated_user
+from app.core.user_cache import AuthenticatedUser
 from app.services.dynamic_pricing_service import DynamicPricingService
 import structlog
 
 logger = structlog.get_logger()
 router = APIRouter()
 
+# Trends also depend on usage logs and on rolling 24h/7d windows, neither
+# of which bumps a version, so the ETag moves with time too
+PRICING_ETAG_BUCKET_SECONDS = 60
+
 @router.get("/demand/{platform}")
 async def get_demand_multiplier(
     platform: str,
     region: str = Query("global", description="Region for demand calculation"),
     time_window_hours: int = Query(24, description="Time window for demand calculation"),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Get demand multiplier for a platform"""
     
     try:
         pricing_service = DynamicPricingService(db)
         
-        multiplier = pricing_service.calculate_demand_multiplier(
+        multiplier = await pricing_service.calculate_demand_multiplier(
             platform=platform,
             region=region,
             time_window_hours=time_window_hours
@@ -50,18 +56,21 @@ async def get_demand_multiplier(
             detail="Internal server error"
         )
 
-@router.get("/trends/{platform}")
+@router.get(
+    "/trends/{platform}",
+    dependencies=[conditional_get(CARDS, PRICES, bucket_seconds=PRICING_ETAG_BUCKET_SECONDS)]
+)
 async def get_pricing_trends(
     platform: str,
     days: int = Query(7, description="Number of days for trend analysis"),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_read_db)
 ):
     """Get pricing trends for a platform"""
     
     try:
         pricing_service = DynamicPricingService(db)
         
-        trends = pricing_service.get_pricing_trends(platform, days)
+        trends = await pricing_service.get_pricing_trends(platform, days)
         
         logger.info("Pricing trends retrieved", platform=platform)
         
@@ -79,7 +88,7 @@ async def predict_optimal_pricing(
     platform: str,
     base_price: float,
     target_utilization: float = Query(0.8, description="Target utilization rate"),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Predict optimal pricing for maximum revenue"""
     
@@ -107,15 +116,15 @@ async def predict_optimal_pricing(
 
 @router.post("/update-all")
 async def update_all_pricing(
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: AuthenticatedUser = Depends(get_authenticated_user),
+    db: AsyncSession = Depends(get_db)
 ):
     """Update pricing for all active cards"""
     
     try:
         pricing_service = DynamicPricingService(db)
         
-        platform_stats = pricing_service.update_all_card_pricing()
+        platform_stats = await pricing_service.update_all_card_pricing()
         
         logger.info("All card pricing updated", 
                    user_id=str(current_user.id),
@@ -134,8 +143,11 @@ async def update_all_pricing(
             detail="Internal server error"
         )
 
-@router.get("/market-overview")
-async def get_market_overview(db: Session = Depends(get_db)):
+@router.get(
+    "/market-overview",
+    dependencies=[conditional_get(CARDS, PRICES, bucket_seconds=PRICING_ETAG_BUCKET_SECONDS)]
+)
+async def get_market_overview(db: AsyncSession = Depends(get_read_db)):
     """Get overall market pricing overview"""
     
     try:
@@ -147,7 +159,7 @@ async def get_market_overview(db: Session = Depends(get_db)):
         
         for platform in platforms:
             try:
-                trends = pricing_service.get_pricing_trends(platform, days=7)
+                trends = await pricing_service.get_pricing_trends(platform, days=7)
                 market_data[platform] = trends
             except Exception as e:
                 logger.warning(f"Failed to get trends for {platform}", error=str(e))
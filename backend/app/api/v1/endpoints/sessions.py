@@ -2,14 +2,22 @@
 Sessions API endpoints
 """
 
+import uuid
+from datetime import datetime
 from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from typing import Dict, Any
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import joinedload
+from typing import Dict, Any, List
 from pydantic import BaseModel
 from app.core.database import get_db
-from app.core.security import get_current_user
-from app.models.user import User
+from app.core.security import get_authenticated_user
+from app.core.user_cache import AuthenticatedUser
+from app.models.platform_account import PlatformType
+from app.models.session import SessionStatus
+from app.repositories.base import Repository
 from app.services.platform_integration_service import PlatformIntegrationService
+from app.services.write_behind import write_behind
 import structlog
 
 logger = structlog.get_logger()
@@ -22,11 +30,25 @@ class SessionRequest(BaseModel):
     message: str
     request_type: str = "chat"
 
+class SessionSummary(BaseModel):
+    session_id: uuid.UUID
+    platform: PlatformType
+    status: SessionStatus
+    total_usage: float
+    request_count: int
+    started_at: datetime
+    expires_at: datetime
+    remaining_time: float
+
+class SessionsResponse(BaseModel):
+    sessions: List[SessionSummary]
+    total_count: int
+
 @router.post("/create")
 async def create_session(
     request: SessionCreateRequest,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: AuthenticatedUser = Depends(get_authenticated_user),
+    db: AsyncSession = Depends(get_db)
 ):
     """Create a new platform session"""
     
@@ -35,9 +57,7 @@ async def create_session(
         
         # Get virtual card
         from app.models.virtual_card import VirtualCard
-        virtual_card = db.query(VirtualCard).filter(
-            VirtualCard.id == request.virtual_card_id
-        ).first()
+        virtual_card = await Repository(db, VirtualCard).get(request.virtual_card_id)
         
         if not virtual_card:
             raise HTTPException(
@@ -77,8 +97,8 @@ async def create_session(
 async def execute_request(
     session_id: str,
     request: SessionRequest,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: AuthenticatedUser = Depends(get_authenticated_user),
+    db: AsyncSession = Depends(get_db)
 ):
     """Execute request in session"""
     
@@ -87,9 +107,7 @@ async def execute_request(
         
         # Check if user owns the session
         from app.models.session import Session as SessionModel
-        session = db.query(SessionModel).filter(
-            SessionModel.id == session_id
-        ).first()
+        session = await Repository(db, SessionModel).get(session_id)
         
         if not session or str(session.buyer_id) != str(current_user.id):
             raise HTTPException(
@@ -124,8 +142,8 @@ async def execute_request(
 @router.delete("/{session_id}")
 async def terminate_session(
     session_id: str,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: AuthenticatedUser = Depends(get_authenticated_user),
+    db: AsyncSession = Depends(get_db)
 ):
     """Terminate session"""
     
@@ -134,9 +152,7 @@ async def terminate_session(
         
         # Check if user owns the session
         from app.models.session import Session as SessionModel
-        session = db.query(SessionModel).filter(
-            SessionModel.id == session_id
-        ).first()
+        session = await Repository(db, SessionModel).get(session_id)
         
         if not session or str(session.buyer_id) != str(current_user.id):
             raise HTTPException(
@@ -171,17 +187,15 @@ async def terminate_session(
 @router.get("/{session_id}")
 async def get_session_info(
     session_id: str,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: AuthenticatedUser = Depends(get_authenticated_user),
+    db: AsyncSession = Depends(get_db)
 ):
     """Get session information"""
     
     try:
         from app.models.session import Session as SessionModel
         
-        session = db.query(SessionModel).filter(
-            SessionModel.id == session_id
-        ).first()
+        session = await Repository(db, SessionModel).get(session_id)
         
         if not session or str(session.buyer_id) != str(current_user.id):
             raise HTTPException(
@@ -189,16 +203,19 @@ async def get_session_info(
                 detail="Access denied"
             )
         
+        platform_account = await session.awaitable_attrs.platform_account
+        last_request_at = write_behind.value(session, "last_request_at")
+        
         return {
             "session_id": str(session.id),
             "session_token": session.session_token,
-            "platform": session.platform_account.platform,
+            "platform": platform_account.platform,
             "status": session.status,
-            "total_usage": session.total_usage,
-            "request_count": session.request_count,
+            "total_usage": write_behind.value(session, "total_usage"),
+            "request_count": write_behind.value(session, "request_count"),
             "started_at": session.started_at.isoformat(),
             "expires_at": session.expires_at.isoformat(),
-            "last_request_at": session.last_request_at.isoformat() if session.last_request_at else None
+            "last_request_at": last_request_at.isoformat() if last_request_at else None
         }
         
     except HTTPException:
@@ -210,30 +227,33 @@ async def get_session_info(
             detail="Internal server error"
         )
 
-@router.get("/")
+@router.get("/", response_model=SessionsResponse)
 async def get_user_sessions(
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: AuthenticatedUser = Depends(get_authenticated_user),
+    db: AsyncSession = Depends(get_db)
 ):
     """Get user's active sessions"""
     
     try:
         from app.models.session import Session as SessionModel
         
-        sessions = db.query(SessionModel).filter(
-            SessionModel.buyer_id == current_user.id
-        ).all()
+        result = await db.execute(
+            select(SessionModel).options(
+                joinedload(SessionModel.platform_account)
+            ).where(SessionModel.buyer_id == current_user.id)
+        )
+        sessions = result.scalars().all()
         
         session_list = []
         for session in sessions:
             session_list.append({
-                "session_id": str(session.id),
+                "session_id": session.id,
                 "platform": session.platform_account.platform,
                 "status": session.status,
-                "total_usage": session.total_usage,
-                "request_count": session.request_count,
-                "started_at": session.started_at.isoformat(),
-                "expires_at": session.expires_at.isoformat(),
+                "total_usage": write_behind.value(session, "total_usage"),
+                "request_count": write_behind.value(session, "request_count"),
+                "started_at": session.started_at,
+                "expires_at": session.expires_at,
                 "remaining_time": session.get_remaining_time().total_seconds() if session.is_active() else 0
             })
         
@@ -2,13 +2,18 @@
 Virtual Cards API endpoints
 """
 
+import uuid
+from datetime import datetime
 from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List, Dict, Any
-from pydantic import BaseModel
+from pydantic import BaseModel, ConfigDict
 from app.core.database import get_db
-from app.core.security import get_current_user
-from app.models.user import User
+from app.core.security import get_authenticated_user
+from app.core.user_cache import AuthenticatedUser
+from app.models.virtual_card import VirtualCard, CardStatus
+from app.models.platform_account import PlatformAccount, PlatformType
 from app.services.virtual_card_service import VirtualCardService
 from app.services.dynamic_pricing_service import DynamicPricingService
 import structlog
@@ -29,11 +34,26 @@ class VirtualCardValidateRequest(BaseModel):
 class VirtualCardChargeRequest(BaseModel):
     amount: float
 
+class VirtualCardSummary(BaseModel):
+    # Validated straight from result rows
+    model_config = ConfigDict(from_attributes=True)
+    
+    card_id: uuid.UUID
+    card_number: str
+    expiry_date: datetime
+    initial_balance: float
+    current_balance: float
+    current_price: float
+    status: CardStatus
+    usage_count: int
+    created_at: datetime
+    platform: PlatformType
+
 @router.post("/create")
 async def create_virtual_card(
     request: VirtualCardCreateRequest,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: AuthenticatedUser = Depends(get_authenticated_user),
+    db: AsyncSession = Depends(get_db)
 ):
     """Create a new virtual card"""
     
@@ -41,7 +61,7 @@ async def create_virtual_card(
         card_service = VirtualCardService(db)
         
         # Create virtual card
-        virtual_card = card_service.generate_virtual_card(
+        virtual_card = await card_service.generate_virtual_card(
             seller_id=str(current_user.id),
             platform_account_id=request.platform_account_id,
             initial_balance=request.initial_balance,
@@ -51,7 +71,7 @@ async def create_virtual_card(
         
         # Apply dynamic pricing
         pricing_service = DynamicPricingService(db)
-        pricing_service.update_card_pricing(str(virtual_card.id))
+        await pricing_service.update_card_pricing(str(virtual_card.id))
         
         logger.info("Virtual card created", 
                    card_id=str(virtual_card.id), 
@@ -78,14 +98,14 @@ async def create_virtual_card(
 @router.post("/validate")
 async def validate_virtual_card(
     request: VirtualCardValidateRequest,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Validate virtual card"""
     
     try:
         card_service = VirtualCardService(db)
         
-        validation_result = card_service.validate_card(
+        validation_result = await card_service.validate_card(
             request.card_number,
             request.cvv
         )
@@ -111,15 +131,15 @@ async def validate_virtual_card(
 async def charge_virtual_card(
     card_id: str,
     request: VirtualCardChargeRequest,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: AuthenticatedUser = Depends(get_authenticated_user),
+    db: AsyncSession = Depends(get_db)
 ):
     """Charge amount from virtual card"""
     
     try:
         card_service = VirtualCardService(db)
         
-        success = card_service.charge_card(card_id, request.amount)
+        success = await card_service.charge_card(card_id, request.amount)
         
         if not success:
             raise HTTPException(
@@ -128,7 +148,7 @@ async def charge_virtual_card(
             )
         
         # Get updated card details
-        card = card_service.get_card_details(card_id)
+        card = await card_service.get_card_details(card_id)
         
         logger.info("Card charged", 
                    card_id=card_id, 
@@ -153,14 +173,14 @@ async def charge_virtual_card(
 @router.get("/{card_id}")
 async def get_virtual_card(
     card_id: str,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: AuthenticatedUser = Depends(get_authenticated_user),
+    db: AsyncSession = Depends(get_db)
 ):
     """Get virtual card details"""
     
     try:
         card_service = VirtualCardService(db)
-        card = card_service.get_card_details(card_id)
+        card = await card_service.get_card_details(card_id)
         
         if not card:
             raise HTTPException(
@@ -203,8 +223,8 @@ async def get_virtual_card(
 @router.delete("/{card_id}")
 async def deactivate_virtual_card(
     card_id: str,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: AuthenticatedUser = Depends(get_authenticated_user),
+    db: AsyncSession = Depends(get_db)
 ):
     """Deactivate virtual card"""
     
@@ -212,14 +232,14 @@ async def deactivate_virtual_card(
         card_service = VirtualCardService(db)
         
         # Check if user owns the card
-        card = card_service.get_card_details(card_id)
+        card = await card_service.get_card_details(card_id)
         if not card or str(card.seller_id) != str(current_user.id):
             raise HTTPException(
                 status_code=status.HTTP_403_FORBIDDEN,
                 detail="Access denied"
             )
         
-        success = card_service.deactivate_card(card_id)
+        success = await card_service.deactivate_card(card_id)
         
         if not success:
             raise HTTPException(
@@ -242,36 +262,33 @@ async def deactivate_virtual_card(
             detail="Internal server error"
         )
 
-@router.get("/")
+@router.get("/", response_model=List[VirtualCardSummary])
 async def get_user_virtual_cards(
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: AuthenticatedUser = Depends(get_authenticated_user),
+    db: AsyncSession = Depends(get_db)
 ):
     """Get all virtual cards for current user"""
     
     try:
-        card_service = VirtualCardService(db)
-        
-        # Get user's cards
-        cards = db.query(VirtualCard).filter(
-            VirtualCard.seller_id == current_user.id
-        ).all()
+        # Get user's cards as response rows
+        result = await db.execute(
+            select(
+                VirtualCard.id.label("card_id"),
+                VirtualCard.card_number,
+                VirtualCard.expiry_date,
+                VirtualCard.initial_balance,
+                VirtualCard.current_balance,
+                VirtualCard.current_price,
+                VirtualCard.status,
+                VirtualCard.usage_count,
+                VirtualCard.created_at,
+                PlatformAccount.platform
+            ).join(
+                PlatformAccount, VirtualCard.platform_account_id == PlatformAccount.id
+            ).where(VirtualCard.seller_id == current_user.id)
+        )
         
-        return [
-            {
-                "card_id": str(card.id),
-                "card_number": card.card_number,
-                "expiry_date": card.expiry_date.isoformat(),
-                "initial_balance": card.initial_balance,
-                "current_balance": card.current_balance,
-                "current_price": card.current_price,
-                "status": card.status,
-                "usage_count": card.usage_count,
-                "created_at": card.created_at.isoformat(),
-                "platform": card.platform_account.platform
-            }
-            for card in cards
-        ]
+        return result.all()
         
     except Exception as e:
         logger.error("Failed to get user virtual cards", error=str(e))
@@ -0,0 +1 @@
+# Operational commands, run with python -m app.commands.<name>
@@ -0,0 +1,42 @@
+"""
+Rebuild the marketplace listings read model
+
+Re-projects every listed card from virtual_cards into
+marketplace_listings in one transaction, then recounts the listing
+counters and invalidates cached listing responses. Use after restoring
+a backup, after a manual fix to virtual_cards, or whenever listings and
+cards disagree.
+
+    python -m app.commands.rebuild_listings
+"""
+
+import asyncio
+
+from app.core.database import AsyncSessionLocal, close_db, close_redis, init_redis
+from app.core.http_cache import CARDS, PRICES, bump_versions
+from app.repositories.listing import ListingRepository
+from app.services.listing_counts import listing_counts
+
+
+async def rebuild():
+    await init_redis()
+    try:
+        async with AsyncSessionLocal() as db:
+            listed = await ListingRepository(db).rebuild()
+            await db.commit()
+        print(f"marketplace_listings rebuilt: {listed} listed cards")
+
+        await bump_versions(CARDS, PRICES)
+        drift = await listing_counts.rebuild()
+        print(f"listing counts rebuilt, corrected drift of {drift}")
+    finally:
+        await close_redis()
+        await close_db()
+
+
+def main():
+    asyncio.run(rebuild())
+
+
+if __name__ == "__main__":
+    main()
@@ -2,45 +2,240 @@
 Database configuration and session management
 """
 
-from sqlalchemy import create_engine, MetaData
-from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker, Session
-from sqlalchemy.pool import StaticPool
-import redis
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, AsyncGenerator, Dict, Iterator, List, Optional
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.ext.asyncio import AsyncAttrs, AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.orm import DeclarativeBase
+from sqlalchemy.pool import AsyncAdaptedQueuePool, StaticPool
+import redis.asyncio as aioredis
+from redis.exceptions import ConnectionError as RedisConnectionError
 from app.core.config import settings
+from app.services.monitoring import (
+    DB_POOL_CHECKOUT_WAIT,
+    DB_POOL_SIZE,
+    DB_POOL_CHECKED_OUT,
+    DB_POOL_OVERFLOW,
+    DB_POOL_OVERFLOW_CREATED,
+    DB_POOL_TIMEOUTS,
+    REDIS_POOL_MAX,
+    REDIS_POOL_CREATED,
+    REDIS_POOL_IN_USE,
+    REDIS_POOL_WAIT,
+    REDIS_POOL_TIMEOUTS
+)
+
+def get_async_database_url(url: str) -> str:
+    """Map a database URL onto its asyncio driver"""
+    scheme, _, rest = url.partition("://")
+    if scheme in ("postgresql", "postgres", "postgresql+psycopg2"):
+        return f"postgresql+asyncpg://{rest}"
+    if scheme == "sqlite":
+        return f"sqlite+aiosqlite://{rest}"
+    return url
+
+def get_pool_sizing() -> Dict[str, int]:
+    """Per-worker pool_size/max_overflow derived from settings"""
+    if not settings.DB_MAX_CONNECTIONS:
+        return {"pool_size": settings.DB_POOL_SIZE, "max_overflow": settings.DB_MAX_OVERFLOW}
+    
+    # Split the global connection budget evenly, keeping the configured
+    # ratio between steady-state and burst connections
+    per_worker = max(1, settings.DB_MAX_CONNECTIONS // max(1, settings.WEB_CONCURRENCY))
+    burst_share = settings.DB_MAX_OVERFLOW / max(1, settings.DB_POOL_SIZE + settings.DB_MAX_OVERFLOW)
+    max_overflow = int(per_worker * burst_share)
+    return {"pool_size": max(1, per_worker - max_overflow), "max_overflow": max_overflow}
+
+class InstrumentedQueuePool(AsyncAdaptedQueuePool):
+    """Queue pool that reports checkout wait time and timeouts"""
+    
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        except PoolTimeoutError:
+            DB_POOL_TIMEOUTS.inc()
+            raise
+        finally:
+            DB_POOL_CHECKOUT_WAIT.observe(time.perf_counter() - start)
+
+def engine_options(url: str) -> Dict[str, Any]:
+    """Engine keyword arguments for the configured backend"""
+    if "sqlite" in url:
+        return {"poolclass": StaticPool, "connect_args": {"check_same_thread": False}}
+    
+    return {
+        "poolclass": InstrumentedQueuePool,
+        "pool_timeout": settings.DB_POOL_TIMEOUT,
+        "pool_recycle": settings.DB_POOL_RECYCLE,
+        "pool_pre_ping": settings.DB_POOL_PRE_PING,
+        **get_pool_sizing()
+    }
+
+def _instrument_pool(sync_engine):
+    """Export pool occupancy through the Prometheus registry"""
+    if not isinstance(sync_engine.pool, InstrumentedQueuePool):
+        return
+    
+    DB_POOL_SIZE.set(sync_engine.pool.size())
+    
+    # Resolve the pool on every event: engine.dispose() swaps in a new one
+    def _update_occupancy(*_):
+        pool = sync_engine.pool
+        DB_POOL_CHECKED_OUT.set(pool.checkedout())
+        DB_POOL_OVERFLOW.set(max(0, pool.overflow()))
+    
+    def _on_connect(*_):
+        # QueuePool bumps its overflow counter before opening the connection,
+        # so a positive value here means this one is beyond pool_size
+        if sync_engine.pool.overflow() > 0:
+            DB_POOL_OVERFLOW_CREATED.inc()
+    
+    event.listen(sync_engine, "checkout", _update_occupancy)
+    event.listen(sync_engine, "checkin", _update_occupancy)
+    event.listen(sync_engine, "connect", _on_connect)
+
+ASYNC_DATABASE_URL = get_async_database_url(settings.DATABASE_URL)
 
 # SQLAlchemy setup
-engine = create_engine(
-    settings.DATABASE_URL,
-    poolclass=StaticPool,
-    connect_args={"check_same_thread": False} if "sqlite" in settings.DATABASE_URL else {}
+engine = create_async_engine(ASYNC_DATABASE_URL, **engine_options(ASYNC_DATABASE_URL))
+_instrument_pool(engine.sync_engine)
+
+# expire_on_commit is off so ORM attributes stay readable after commit
+# without an implicit (and, under asyncio, illegal) lazy refresh
+AsyncSessionLocal = async_sessionmaker(
+    engine,
+    class_=AsyncSession,
+    autoflush=False,
+    expire_on_commit=False
 )
 
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
-Base = declarative_base()
+class Base(AsyncAttrs, DeclarativeBase):
+    pass
+
+class QueryCounter:
+    """SQL statements executed while a counter is active"""
+    
+    def __init__(self, parent: Optional["QueryCounter"] = None):
+        self.statements: List[str] = []
+        # The counter this one was opened inside, which also sees its statements
+        self.parent = parent
+    
+    @property
+    def count(self) -> int:
+        return len(self.statements)
+
+_query_counter: ContextVar[Optional[QueryCounter]] = ContextVar("query_counter", default=None)
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _count_query(conn, cursor, statement, parameters, context, executemany):
+    counter = _query_counter.get()
+    while counter is not None:
+        counter.statements.append(statement)
+        counter = counter.parent
 
-# Redis setup
-redis_client = redis.from_url(settings.REDIS_URL, decode_responses=True)
+@contextmanager
+def count_queries() -> Iterator[QueryCounter]:
+    """Count statements issued by the current task and tasks it spawns
+
+    SQLAlchemy runs async sessions in greenlets that inherit the caller's
+    context, so this sees every engine, primary or replica. Counters nest:
+    one wrapped around a request still counts while the logging middleware
+    counts the same request.
+    """
+    counter = QueryCounter(_query_counter.get())
+    token = _query_counter.set(counter)
+    try:
+        yield counter
+    finally:
+        _query_counter.reset(token)
+
+class InstrumentedRedisPool(aioredis.BlockingConnectionPool):
+    """Blocking Redis pool that reports checkout wait and occupancy"""
+    
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._report_occupancy()
+    
+    def _report_occupancy(self):
+        in_use = len(self._in_use_connections)
+        REDIS_POOL_IN_USE.set(in_use)
+        REDIS_POOL_CREATED.set(len(self._available_connections) + in_use)
+    
+    def reset(self):
+        super().reset()
+        self._report_occupancy()
+    
+    async def get_connection(self, command_name, *keys, **options):
+        start = time.perf_counter()
+        try:
+            connection = await super().get_connection(command_name, *keys, **options)
+        except RedisConnectionError:
+            REDIS_POOL_TIMEOUTS.inc()
+            raise
+        finally:
+            REDIS_POOL_WAIT.observe(time.perf_counter() - start)
+        self._report_occupancy()
+        return connection
+    
+    async def release(self, connection):
+        await super().release(connection)
+        self._report_occupancy()
+
+# Redis setup: one pool per worker, opened and closed by the app lifespan
+redis_client: Optional[aioredis.Redis] = None
+
+async def init_redis():
+    """Create the shared Redis connection pool"""
+    global redis_client
+    
+    pool = InstrumentedRedisPool.from_url(
+        settings.REDIS_URL,
+        max_connections=settings.REDIS_MAX_CONNECTIONS,
+        timeout=settings.REDIS_POOL_TIMEOUT,
+        socket_timeout=settings.REDIS_SOCKET_TIMEOUT,
+        socket_connect_timeout=settings.REDIS_SOCKET_CONNECT_TIMEOUT,
+        health_check_interval=settings.REDIS_HEALTH_CHECK_INTERVAL,
+        retry_on_timeout=True,
+        decode_responses=True
+    )
+    REDIS_POOL_MAX.set(settings.REDIS_MAX_CONNECTIONS)
+    redis_client = aioredis.Redis(connection_pool=pool)
+    await redis_client.ping()
+
+async def close_redis():
+    """Close the shared Redis connection pool"""
+    global redis_client
+    
+    if redis_client is not None:
+        await redis_client.aclose()
+        await redis_client.connection_pool.disconnect()
+        redis_client = None
 
 async def init_db():
     """Initialize database tables"""
     # Import all models to ensure they're registered
-    from app.models import user, virtual_card, session, transaction, platform_account, credit_pool
+    from app.models import user, virtual_card, session, transaction, platform_account, credit_pool, listing, order_event
     
     # Create all tables
-    Base.metadata.create_all(bind=engine)
-    
-    # Initialize Redis
-    await redis_client.ping()
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+
+async def close_db():
+    """Dispose of pooled database connections"""
+    await engine.dispose()
 
-def get_db() -> Session:
+async def get_db() -> AsyncGenerator[AsyncSession, None]:
     """Dependency to get database session"""
-    db = SessionLocal()
-    try:
+    async with AsyncSessionLocal() as db:
         yield db
-    finally:
-        db.close()
 
-def get_redis():
-    """Dependency to get Redis client"""
+def get_redis() -> aioredis.Redis:
+    """Dependency to get the shared Redis client"""
+    if redis_client is None:
+        raise RuntimeError("Redis pool is not initialized")
     return redis_client
@@ -0,0 +1,183 @@
+"""
+Conditional GET and HTTP caching for public read endpoints
+
+Each scope of public data (cards, pools, prices) has a version counter
+in one Redis hash, bumped after every committed mutation in that scope.
+Endpoints derive a weak ETag and Last-Modified from the versions of the
+scopes they read, so a revalidation costs one HMGET instead of the query
+and answers 304 when nothing changed.
+"""
+
+import hashlib
+import time
+from email.utils import formatdate, parsedate_to_datetime
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Tuple
+from fastapi import Depends, HTTPException, Request, Response, status
+from app.core.config import settings
+from app.core.database import get_redis
+import structlog
+
+logger = structlog.get_logger()
+
+VERSIONS_KEY = "cache_versions"
+
+# Scopes; bump the ones a mutation touches, after its commit
+CARDS = "cards"
+POOLS = "pools"
+PRICES = "prices"
+
+async def bump_versions(*scopes: str):
+    """Invalidate cached responses built from these scopes
+
+    Call after the commit: bumping first lets a concurrent reader tag
+    the old rows with the new version. Failures are logged, not raised;
+    the mutation has already happened and Cache-Control max-age still
+    bounds how long a browser or CDN serves without revalidating.
+    """
+    now = time.time()
+    try:
+        pipe = get_redis().pipeline(transaction=True)
+        for scope in scopes:
+            pipe.hincrby(VERSIONS_KEY, scope, 1)
+            pipe.hset(VERSIONS_KEY, f"{scope}:ts", now)
+        await pipe.execute()
+    except Exception as e:
+        logger.warning("Failed to bump cache versions", scopes=list(scopes), error=str(e))
+
+async def get_versions(scopes: Iterable[str]) -> List[Tuple[str, Optional[str], Optional[float]]]:
+    """(scope, version, last bump time) for each scope"""
+    scopes = list(scopes)
+    fields = []
+    for scope in scopes:
+        fields.extend((scope, f"{scope}:ts"))
+    values = await get_redis().hmget(VERSIONS_KEY, fields)
+    return [
+        (scope, values[2 * i], float(values[2 * i + 1]) if values[2 * i + 1] else None)
+        for i, scope in enumerate(scopes)
+    ]
+
+def _within_replica_lag(last_modified: Optional[float]) -> bool:
+    # A replica may not have replayed the latest change yet, so anything
+    # read now must not be tagged with the new versions
+    return bool(
+        settings.DATABASE_REPLICA_URLS
+        and last_modified is not None
+        and time.time() - last_modified < settings.REPLICA_MAX_LAG_SECONDS
+    )
+
+def _etag_matches(if_none_match: str, etag: str) -> bool:
+    # Weak comparison (RFC 9110 13.1.2)
+    if if_none_match.strip() == "*":
+        return True
+    opaque = etag.removeprefix("W/")
+    return any(tag.strip().removeprefix("W/") == opaque for tag in if_none_match.split(","))
+
+def _not_modified_since(if_modified_since: str, last_modified: float) -> bool:
+    try:
+        since = parsedate_to_datetime(if_modified_since).timestamp()
+    except (TypeError, ValueError):
+        return False
+    # HTTP dates have one-second resolution
+    return int(last_modified) <= since
+
+def conditional_get(
+    *scopes: str,
+    max_age: Optional[int] = None,
+    stale_while_revalidate: Optional[int] = None,
+    bucket_seconds: Optional[int] = None
+):
+    """Dependency adding validators and Cache-Control, raising 304 on a match
+
+    The ETag covers the request path and query as well as the scope
+    versions, so each filter combination is validated separately. With
+    bucket_seconds the validators also move on every that many seconds,
+    for bodies that depend on the clock or on state no scope versions.
+    """
+    if max_age is None:
+        max_age = settings.HTTP_CACHE_MAX_AGE_SECONDS
+    if stale_while_revalidate is None:
+        stale_while_revalidate = settings.HTTP_CACHE_STALE_WHILE_REVALIDATE_SECONDS
+    cache_control = f"public, max-age={max_age}, stale-while-revalidate={stale_while_revalidate}"
+
+    async def dependency(request: Request, response: Response):
+        if not settings.HTTP_CACHE_ENABLED:
+            return
+
+        try:
+            versions = await get_versions(scopes)
+        except Exception as e:
+            # Serve uncached rather than fail the read
+            logger.warning("Failed to read cache versions", error=str(e))
+            response.headers["Cache-Control"] = "no-cache"
+            return
+
+        headers: Dict[str, str] = {"Cache-Control": cache_control}
+        bumped = [ts for _, _, ts in versions if ts is not None]
+        last_modified = max(bumped) if bumped else None
+
+        # Without validators a possibly lagging body cannot be revalidated
+        # as current until the next bump
+        if _within_replica_lag(last_modified):
+            response.headers.update(headers)
+            return
+
+        digest = hashlib.blake2b(digest_size=12)
+        digest.update(request.url.path.encode())
+        digest.update(b"?" + "&".join(sorted(request.url.query.split("&"))).encode())
+        for scope, version, ts in versions:
+            digest.update(f"|{scope}={version}@{ts}".encode())
+        if bucket_seconds:
+            bucket_start = time.time() // bucket_seconds * bucket_seconds
+            digest.update(f"|t={bucket_start}".encode())
+            last_modified = max(last_modified or 0.0, bucket_start)
+        headers["ETag"] = f'W/"{digest.hexdigest()}"'
+        if last_modified is not None:
+            headers["Last-Modified"] = formatdate(last_modified, usegmt=True)
+
+        if_none_match = request.headers.get("if-none-match")
+        if_modified_since = request.headers.get("if-modified-since")
+        if if_none_match is not None:
+            not_modified = _etag_matches(if_none_match, headers["ETag"])
+        elif if_modified_since is not None and last_modified is not None:
+            not_modified = _not_modified_since(if_modified_since, last_modified)
+        else:
+            not_modified = False
+
+        if not_modified:
+            raise HTTPException(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+        response.headers.update(headers)
+
+    return Depends(dependency)
+
+class VersionedCache:
+    """Per-process cache of one derived value, invalidated by scope bumps
+
+    The value is recomputed the first time it is asked for after any of
+    its scopes is bumped; in between it is served from memory after one
+    HMGET. Without Redis every call computes.
+    """
+
+    def __init__(self, *scopes: str):
+        self.scopes = scopes
+        self._versions: Optional[Tuple] = None
+        self._value: Any = None
+
+    async def get(self, compute: Callable[[], Awaitable[Any]]) -> Any:
+        try:
+            versions = tuple(await get_versions(self.scopes))
+        except Exception as e:
+            logger.warning("Failed to read cache versions", error=str(e))
+            return await compute()
+
+        if versions == self._versions:
+            return self._value
+
+        value = await compute()
+        bumped = [ts for _, _, ts in versions if ts is not None]
+        if not _within_replica_lag(max(bumped) if bumped else None):
+            self._versions, self._value = versions, value
+        return value
+
+    def clear(self):
+        self._versions = self._value = None
@@ -0,0 +1,82 @@
+"""
+Structured logging with rendering and I/O on a background thread
+"""
+
+import logging
+import queue
+import sys
+import threading
+from typing import Any, Dict, Optional, TextIO
+import structlog
+from app.core.config import settings
+from app.services.monitoring import LOG_RECORDS_DROPPED
+
+_STOP = object()
+
+class BackgroundLogWriter:
+    """Final structlog processor that hands events to a writer thread
+
+    Callers only timestamp the event and enqueue it; JSON rendering and
+    the write happen on the thread. When the queue is full events are
+    dropped and counted rather than blocking the event loop.
+    """
+
+    def __init__(self, stream: TextIO, max_queue: int):
+        self.stream = stream
+        self._queue: "queue.Queue[Any]" = queue.Queue(maxsize=max_queue)
+        self._renderer = structlog.processors.JSONRenderer()
+        self._thread: Optional[threading.Thread] = None
+
+    def __call__(self, logger, method_name: str, event_dict: Dict[str, Any]):
+        try:
+            self._queue.put_nowait(event_dict)
+        except queue.Full:
+            LOG_RECORDS_DROPPED.inc()
+        raise structlog.DropEvent
+
+    def _run(self):
+        while True:
+            event = self._queue.get()
+            if event is _STOP:
+                break
+            try:
+                self.stream.write(self._renderer(None, None, event) + "\n")
+                if self._queue.empty():
+                    self.stream.flush()
+            except Exception:
+                # A log line that cannot be rendered must not kill the writer
+                pass
+        self.stream.flush()
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="log-writer", daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout: float = 5.0):
+        """Write out everything queued and stop the thread"""
+        if self._thread is None:
+            return
+        self._queue.put(_STOP)
+        self._thread.join(timeout)
+        self._thread = None
+
+log_writer = BackgroundLogWriter(sys.stdout, settings.LOG_QUEUE_SIZE)
+
+def configure_logging():
+    """Route structlog through the background writer"""
+    structlog.configure(
+        processors=[
+            structlog.contextvars.merge_contextvars,
+            structlog.processors.add_log_level,
+            structlog.processors.TimeStamper(fmt="iso", utc=True),
+            structlog.processors.format_exc_info,
+            log_writer,
+        ],
+        # Calls below LOG_LEVEL are no-ops and never reach the queue
+        wrapper_class=structlog.make_filtering_bound_logger(
+            logging.getLevelName(settings.LOG_LEVEL.upper())
+        ),
+        cache_logger_on_first_use=True,
+    )
+    log_writer.start()
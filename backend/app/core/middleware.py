@@ -1,91 +1,119 @@
 """
 Custom middleware for the application
+
+Both middlewares are plain ASGI callables rather than BaseHTTPMiddleware
+subclasses: they run the app in the caller's task (so context variables
+such as the query counter propagate) and pass response messages straight
+through, which keeps streaming responses streaming.
 """
 
+import random
 import time
 import structlog
-from fastapi import Request, Response
-from starlette.middleware.base import BaseHTTPMiddleware
+from starlette.datastructures import MutableHeaders
+from starlette.requests import Request
 from starlette.responses import Response as StarletteResponse
-from app.core.database import get_redis
-import redis
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from app.core.config import settings
+from app.core.database import count_queries
+from app.core.rate_limit import rate_limiter, resolve_limit
+from app.services.monitoring import record_request
 
 logger = structlog.get_logger()
 
-class LoggingMiddleware(BaseHTTPMiddleware):
-    """Middleware for request/response logging"""
+class LoggingMiddleware:
+    """Middleware for request logging and metrics
     
-    async def dispatch(self, request: Request, call_next):
-        start_time = time.time()
-        
-        # Log request
-        logger.info("Request started",
-                  method=request.method,
-                  url=str(request.url),
-                  client_ip=request.client.host if request.client else "unknown")
-        
-        # Process request
-        response = await call_next(request)
-        
-        # Calculate processing time
-        process_time = time.time() - start_time
+    Writes one record per request, after the response has been sent,
+    keyed by route template rather than raw URL. Successful requests are
+    sampled at LOG_SAMPLE_RATE; errors and slow requests are always logged.
+    """
+    
+    def __init__(self, app: ASGIApp):
+        self.app = app
+    
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
         
-        # Log response
-        logger.info("Request completed",
-                  method=request.method,
-                  url=str(request.url),
-                  status_code=response.status_code,
-                  process_time=round(process_time, 4))
+        start_time = time.perf_counter()
+        status_code = 500
         
-        return response
+        with count_queries() as queries:
+            async def send_wrapper(message: Message):
+                nonlocal status_code
+                if message["type"] == "http.response.start":
+                    status_code = message["status"]
+                    if settings.DEBUG:
+                        MutableHeaders(scope=message).append("X-Query-Count", str(queries.count))
+                await send(message)
+            
+            # Process request
+            try:
+                await self.app(scope, receive, send_wrapper)
+            finally:
+                # Processing time includes any streamed body
+                process_time = time.perf_counter() - start_time
+                
+                # The router stores the matched route in the scope
+                route = scope.get("route")
+                route_path = getattr(route, "path", "unmatched")
+                
+                record_request(scope["method"], route_path, status_code, process_time)
+                
+                if (
+                    status_code >= 400
+                    or process_time >= settings.LOG_SLOW_REQUEST_SECONDS
+                    or random.random() < settings.LOG_SAMPLE_RATE
+                ):
+                    client = scope.get("client")
+                    logger.info("Request",
+                              method=scope["method"],
+                              route=route_path,
+                              status_code=status_code,
+                              process_time=round(process_time, 4),
+                              query_count=queries.count,
+                              client_ip=client[0] if client else "unknown")
 
-class RateLimitMiddleware(BaseHTTPMiddleware):
-    """Middleware for rate limiting"""
+class RateLimitMiddleware:
+    """Middleware for rate limiting per client, route group and tier"""
     
-    def __init__(self, app, calls: int = 100, period: int = 60):
-        super().__init__(app)
-        self.calls = calls
-        self.period = period
-        self.redis_client = redis.from_url("redis://localhost:6379", decode_responses=True)
+    def __init__(self, app: ASGIApp, limiter=None):
+        self.app = app
+        self.limiter = limiter or rate_limiter
     
-    async def dispatch(self, request: Request, call_next):
-        # Get client IP
-        client_ip = request.client.host if request.client else "unknown"
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http" or not settings.RATE_LIMIT_ENABLED:
+            await self.app(scope, receive, send)
+            return
+        
+        key, limit = resolve_limit(Request(scope))
+        
+        try:
+            result = await self.limiter.acquire(key, limit)
+        except Exception as e:
+            # Fail open: an unavailable limiter must not take the API down
+            logger.warning("Rate limiter unavailable", error=str(e))
+            await self.app(scope, receive, send)
+            return
         
-        # Check rate limit
-        if await self._is_rate_limited(client_ip):
-            logger.warning("Rate limit exceeded", client_ip=client_ip)
-            return StarletteResponse(
+        if not result.allowed:
+            logger.warning("Rate limit exceeded", key=key)
+            response = StarletteResponse(
                 content="Rate limit exceeded",
                 status_code=429,
-                headers={"Retry-After": str(self.period)}
+                headers=result.headers()
             )
+            await response(scope, receive, send)
+            return
         
-        # Process request
-        response = await call_next(request)
-        
-        # Update rate limit counter
-        await self._update_rate_limit(client_ip)
-        
-        return response
-    
-    async def _is_rate_limited(self, client_ip: str) -> bool:
-        """Check if client is rate limited"""
-        key = f"rate_limit:{client_ip}"
-        current_calls = self.redis_client.get(key)
+        headers = result.headers()
         
-        if current_calls is None:
-            return False
+        async def send_wrapper(message: Message):
+            if message["type"] == "http.response.start":
+                MutableHeaders(scope=message).update(headers)
+            await send(message)
         
-        return int(current_calls) >= self.calls
-    
-    async def _update_rate_limit(self, client_ip: str):
-        """Update rate limit counter"""
-        key = f"rate_limit:{client_ip}"
-        
-        # Increment counter
-        current_calls = self.redis_client.incr(key)
-        
-        # Set expiration on first call
-        if current_calls == 1:
-            self.redis_client.expire(key, self.period)
+        # Process request
+        await self.app(scope, receive, send_wrapper)
@@ -0,0 +1,27 @@
+"""
+Opaque cursors for keyset pagination
+"""
+
+import base64
+import binascii
+from typing import Any, List
+import orjson
+from app.core.responses import json_default
+
+class InvalidCursor(ValueError):
+    """Cursor could not be decoded or belongs to another query"""
+
+def encode_cursor(*values: Any) -> str:
+    """Pack the sort key of the last row returned into a URL-safe token"""
+    return base64.urlsafe_b64encode(orjson.dumps(values, default=json_default)).rstrip(b"=").decode()
+
+def decode_cursor(cursor: str) -> List[Any]:
+    """Inverse of encode_cursor; raises InvalidCursor on anything malformed"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = orjson.loads(base64.urlsafe_b64decode(padded))
+    except (binascii.Error, ValueError) as e:
+        raise InvalidCursor(str(e)) from e
+    if not isinstance(values, list):
+        raise InvalidCursor("Cursor is not a list")
+    return values
@@ -0,0 +1,314 @@
+"""
+Redis token-bucket rate limiting
+"""
+
+import asyncio
+import math
+import re
+import time
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+from starlette.requests import Request
+import redis.asyncio as aioredis
+from app.core.config import settings
+from app.core.database import get_redis
+from app.core.security import get_token_payload
+from app.core.user_cache import user_cache
+from app.services.monitoring import RATE_LIMIT_LOCAL_HITS, RATE_LIMIT_REDIS_CALLS
+import structlog
+
+logger = structlog.get_logger()
+
+# Refill, take and persist in one atomic step. Uses the Redis clock so
+# every worker agrees on elapsed time. With `partial` set, takes as many
+# whole tokens as are available up to `cost` (used for leases). Returns
+# tokens as a string because Lua numbers are truncated to integers on
+# the way out.
+TOKEN_BUCKET_LUA = """
+local capacity = tonumber(ARGV[1])
+local rate = tonumber(ARGV[2])
+local cost = tonumber(ARGV[3])
+local partial = tonumber(ARGV[4])
+
+local clock = redis.call('TIME')
+local now = tonumber(clock[1]) + tonumber(clock[2]) / 1000000
+
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(state[1])
+local ts = tonumber(state[2])
+if tokens == nil then
+    tokens = capacity
+    ts = now
+end
+
+tokens = math.min(capacity, tokens + math.max(0, now - ts) * rate)
+
+local taken = 0
+if tokens >= cost then
+    taken = cost
+elseif partial == 1 then
+    taken = math.floor(tokens)
+end
+tokens = tokens - taken
+
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'ts', tostring(now))
+redis.call('PEXPIRE', KEYS[1], math.ceil((capacity - tokens) / rate * 1000) + 1000)
+
+return {taken, tostring(tokens)}
+"""
+
+# Give back unspent leased tokens, never beyond capacity
+TOKEN_REFUND_LUA = """
+local tokens = tonumber(redis.call('HGET', KEYS[1], 'tokens'))
+if tokens == nil then
+    return 0
+end
+tokens = math.min(tonumber(ARGV[1]), tokens + tonumber(ARGV[2]))
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens))
+return 1
+"""
+
+# First match wins; anything else falls into "default"
+ROUTE_GROUPS = [
+    ("session_request", re.compile(r"^/api/v1/sessions/[^/]+/request/?$")),
+    ("marketplace_listings", re.compile(r"^/api/v1/marketplace/listings/?$")),
+]
+
+@dataclass(frozen=True)
+class RateLimit:
+    """A bucket of `capacity` tokens refilled evenly over `period` seconds"""
+    capacity: int
+    period: float
+
+    @property
+    def refill_rate(self) -> float:
+        return self.capacity / self.period
+
+@dataclass(frozen=True)
+class RateLimitResult:
+    allowed: bool
+    limit: int
+    remaining: float
+    refill_rate: float
+
+    @property
+    def retry_after(self) -> int:
+        """Seconds until the next token is available"""
+        if self.remaining >= 1:
+            return 0
+        return math.ceil((1 - self.remaining) / self.refill_rate)
+
+    @property
+    def reset_after(self) -> int:
+        """Seconds until the bucket is full again"""
+        return math.ceil((self.limit - self.remaining) / self.refill_rate)
+
+    def headers(self) -> Dict[str, str]:
+        headers = {
+            "X-RateLimit-Limit": str(self.limit),
+            "X-RateLimit-Remaining": str(int(self.remaining)),
+            "X-RateLimit-Reset": str(self.reset_after),
+        }
+        if not self.allowed:
+            headers["Retry-After"] = str(self.retry_after)
+        return headers
+
+class RedisRateLimiter:
+    """Token buckets kept in Redis, one script call per request"""
+
+    def __init__(self):
+        self._client: Optional[aioredis.Redis] = None
+        self._take = None
+        self._refund = None
+
+    def _bind(self):
+        # The client is recreated by the app lifespan; rebind when it changes
+        client = get_redis()
+        if client is not self._client:
+            self._client = client
+            self._take = client.register_script(TOKEN_BUCKET_LUA)
+            self._refund = client.register_script(TOKEN_REFUND_LUA)
+
+    async def take(self, key: str, limit: RateLimit, cost: int, partial: bool = False) -> Tuple[int, float]:
+        """Tokens taken from the global bucket and what it has left"""
+        self._bind()
+        taken, tokens = await self._take(
+            keys=[key],
+            args=[limit.capacity, limit.refill_rate, cost, int(partial)]
+        )
+        return int(taken), float(tokens)
+
+    async def refund(self, refunds: List[Tuple[str, RateLimit, float]]):
+        """Return unspent tokens to their global buckets in one round trip"""
+        self._bind()
+        async with self._client.pipeline(transaction=False) as pipe:
+            for key, limit, tokens in refunds:
+                await self._refund(keys=[key], args=[limit.capacity, tokens], client=pipe)
+            await pipe.execute()
+
+    async def acquire(self, key: str, limit: RateLimit, cost: int = 1) -> RateLimitResult:
+        """Take `cost` tokens from a bucket if available"""
+        taken, tokens = await self.take(key, limit, cost)
+        RATE_LIMIT_REDIS_CALLS.labels(op="acquire").inc()
+        return RateLimitResult(
+            allowed=taken == cost,
+            limit=limit.capacity,
+            remaining=tokens,
+            refill_rate=limit.refill_rate
+        )
+
+    async def start(self):
+        pass
+
+    async def stop(self):
+        pass
+
+class _Lease:
+    """Tokens this worker has already taken from a global bucket"""
+    __slots__ = ("limit", "tokens", "global_remaining", "expires_at", "lock")
+
+    def __init__(self, limit: RateLimit):
+        self.limit = limit
+        self.tokens = 0.0
+        self.global_remaining = float(limit.capacity)
+        self.expires_at = 0.0
+        self.lock = asyncio.Lock()
+
+    def try_take(self, cost: int, now: float) -> bool:
+        if self.tokens >= cost and now < self.expires_at:
+            self.tokens -= cost
+            return True
+        return False
+
+    def result(self, allowed: bool) -> RateLimitResult:
+        return RateLimitResult(
+            allowed=allowed,
+            limit=self.limit.capacity,
+            remaining=self.tokens + self.global_remaining,
+            refill_rate=self.limit.refill_rate
+        )
+
+class HybridRateLimiter:
+    """Per-worker token buckets that lease batches from the Redis buckets
+
+    Requests are served from a local lease of up to
+    capacity * RATE_LIMIT_LEASE_FRACTION tokens, and only go to Redis to
+    lease the next batch. Leased tokens are debited globally up front, so
+    the global limit is never exceeded. The error is in the other
+    direction: tokens leased by a worker that stops receiving traffic sit
+    unused until reconciliation returns them, at most one lease per worker
+    per bucket for RATE_LIMIT_LEASE_SECONDS.
+    """
+
+    def __init__(self, lease_fraction: float, lease_seconds: float):
+        self.lease_fraction = lease_fraction
+        self.lease_seconds = lease_seconds
+        self.redis = RedisRateLimiter()
+        self._leases: Dict[str, _Lease] = {}
+        self._task: Optional[asyncio.Task] = None
+
+    def _batch_size(self, limit: RateLimit, cost: int) -> int:
+        return max(cost, math.ceil(limit.capacity * self.lease_fraction))
+
+    async def acquire(self, key: str, limit: RateLimit, cost: int = 1) -> RateLimitResult:
+        """Take `cost` tokens, from the local lease when possible"""
+        lease = self._leases.get(key)
+        if lease is None or lease.limit != limit:
+            # New bucket, or the caller's tier changed
+            lease = self._leases[key] = _Lease(limit)
+
+        if lease.try_take(cost, time.monotonic()):
+            RATE_LIMIT_LOCAL_HITS.inc()
+            return lease.result(True)
+
+        # One lease request per bucket at a time; the rest wait for it
+        async with lease.lock:
+            if lease.try_take(cost, time.monotonic()):
+                RATE_LIMIT_LOCAL_HITS.inc()
+                return lease.result(True)
+
+            # Top up to a full batch, carrying over whatever is left
+            wanted = self._batch_size(limit, cost) - int(lease.tokens)
+            taken, lease.global_remaining = await self.redis.take(key, limit, max(wanted, 0), partial=True)
+            RATE_LIMIT_REDIS_CALLS.labels(op="lease").inc()
+
+            lease.tokens += taken
+            lease.expires_at = time.monotonic() + self.lease_seconds
+            return lease.result(lease.try_take(cost, time.monotonic()))
+
+    async def reconcile(self):
+        """Return tokens held by expired leases and forget idle buckets"""
+        now = time.monotonic()
+        refunds = []
+        for key, lease in list(self._leases.items()):
+            if now < lease.expires_at or lease.lock.locked():
+                continue
+            if lease.tokens >= 1:
+                refunds.append((key, lease.limit, lease.tokens))
+            # A request may still hold this lease; it must not spend refunded tokens
+            lease.tokens = 0.0
+            del self._leases[key]
+
+        if refunds:
+            await self.redis.refund(refunds)
+            RATE_LIMIT_REDIS_CALLS.labels(op="refund").inc()
+
+    async def _reconcile_loop(self):
+        while True:
+            await asyncio.sleep(self.lease_seconds)
+            try:
+                await self.reconcile()
+            except Exception as e:
+                logger.warning("Rate limit reconciliation failed", error=str(e))
+
+    async def start(self):
+        """Start periodic reconciliation"""
+        self._task = asyncio.create_task(self._reconcile_loop())
+
+    async def stop(self):
+        """Stop reconciliation and hand every unspent lease back"""
+        if self._task:
+            self._task.cancel()
+            self._task = None
+        for lease in self._leases.values():
+            lease.expires_at = 0.0
+        try:
+            await self.reconcile()
+        except Exception as e:
+            logger.warning("Failed to return leased rate limit tokens", error=str(e))
+
+if settings.RATE_LIMIT_LEASE_FRACTION > 0:
+    rate_limiter = HybridRateLimiter(settings.RATE_LIMIT_LEASE_FRACTION, settings.RATE_LIMIT_LEASE_SECONDS)
+else:
+    rate_limiter = RedisRateLimiter()
+
+def get_route_group(path: str) -> str:
+    """Rate limit group for a request path"""
+    for group, pattern in ROUTE_GROUPS:
+        if pattern.match(path):
+            return group
+    return "default"
+
+def resolve_limit(request: Request) -> Tuple[str, RateLimit]:
+    """Bucket key and limit for a request
+
+    Authenticated callers are limited per user and tier, everyone else per
+    client IP. The tier comes from the identity cache when the user is in
+    it, otherwise from the claim issued at login.
+    """
+    group = get_route_group(request.url.path)
+
+    payload = get_token_payload(request.headers.get("authorization"))
+    if payload and payload.get("sub"):
+        client = f"user:{payload['sub']}"
+        identity = user_cache.get(payload["sub"])
+        premium = identity.is_premium if identity is not None else bool(payload.get("premium"))
+    else:
+        client = f"ip:{request.client.host if request.client else 'unknown'}"
+        premium = False
+
+    calls = settings.RATE_LIMITS.get(group, settings.RATE_LIMITS["default"])
+    if premium:
+        calls = int(calls * settings.RATE_LIMIT_PREMIUM_MULTIPLIER)
+
+    return f"rate_limit:{group}:{client}", RateLimit(calls, settings.RATE_LIMIT_PERIOD_SECONDS)
@@ -0,0 +1,149 @@
+"""
+Read-replica routing for read-only database sessions
+"""
+
+import asyncio
+import itertools
+from typing import AsyncGenerator, List, Optional
+from fastapi import Request
+from sqlalchemy import text
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, create_async_engine
+from app.core.config import settings
+from app.core.database import (
+    AsyncSessionLocal,
+    engine as primary_engine,
+    engine_options,
+    get_async_database_url,
+    get_redis
+)
+from app.core.security import get_token_payload
+from app.services.monitoring import DB_REPLICA_LAG, DB_READ_ROUTED
+import structlog
+
+logger = structlog.get_logger()
+
+# Seconds behind the primary; zero when everything received has been replayed
+REPLICA_LAG_SQL = text("""
+    SELECT CASE
+        WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+        ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0)
+    END
+""")
+
+PRIMARY_PIN_KEY = "db_primary_pin:{user_id}"
+
+class ReplicaRouter:
+    """Chooses an engine for read-only sessions based on replica lag"""
+
+    def __init__(self, replica_urls: List[str], max_lag_seconds: float):
+        self.max_lag_seconds = max_lag_seconds
+        self.replicas: List[AsyncEngine] = []
+        self.labels: List[str] = []
+        for url in replica_urls:
+            async_url = get_async_database_url(url)
+            self.replicas.append(create_async_engine(async_url, **engine_options(async_url)))
+            self.labels.append(make_url(async_url).host or "replica")
+
+        # Replicas only take traffic once a lag check has passed
+        self._healthy: List[AsyncEngine] = []
+        self._cursor = itertools.count()
+        self._task: Optional[asyncio.Task] = None
+
+    def choose(self, pin_to_primary: bool = False) -> AsyncEngine:
+        """Pick a healthy replica round-robin, or the primary"""
+        healthy = self._healthy
+        if pin_to_primary or not healthy:
+            DB_READ_ROUTED.labels(target="primary").inc()
+            return primary_engine
+
+        DB_READ_ROUTED.labels(target="replica").inc()
+        return healthy[next(self._cursor) % len(healthy)]
+
+    async def check_lag(self):
+        """Measure lag on every replica and rebuild the healthy set"""
+        healthy = []
+        for replica, label in zip(self.replicas, self.labels):
+            try:
+                async with replica.connect() as conn:
+                    lag = await asyncio.wait_for(
+                        conn.scalar(REPLICA_LAG_SQL),
+                        timeout=self.max_lag_seconds
+                    )
+                lag = float(lag or 0)
+            except Exception as e:
+                logger.warning("Replica lag check failed", replica=label, error=str(e))
+                DB_REPLICA_LAG.labels(replica=label).set(float("inf"))
+                continue
+
+            DB_REPLICA_LAG.labels(replica=label).set(lag)
+            if lag <= self.max_lag_seconds:
+                healthy.append(replica)
+            else:
+                logger.warning("Replica lagging, routing reads to primary", replica=label, lag=lag)
+
+        self._healthy = healthy
+
+    async def _monitor(self, interval: float):
+        while True:
+            await self.check_lag()
+            await asyncio.sleep(interval)
+
+    async def start(self, interval: float):
+        """Run an initial lag check and start the background monitor"""
+        if not self.replicas:
+            return
+        await self.check_lag()
+        self._task = asyncio.create_task(self._monitor(interval))
+        logger.info("Replica routing enabled", replicas=self.labels, healthy=len(self._healthy))
+
+    async def stop(self):
+        """Stop monitoring and dispose of replica connections"""
+        if self._task:
+            self._task.cancel()
+            self._task = None
+        for replica in self.replicas:
+            await replica.dispose()
+
+replica_router = ReplicaRouter(settings.DATABASE_REPLICA_URLS, settings.REPLICA_MAX_LAG_SECONDS)
+
+async def mark_primary_read(user_id: str):
+    """Pin a user's reads to the primary after they write
+
+    The pin outlives the maximum lag a replica may have before it is taken
+    out of rotation, so any replica serving this user afterwards has
+    already replayed the write.
+    """
+    if not replica_router.replicas:
+        return
+    try:
+        ttl = max(1, int(settings.REPLICA_MAX_LAG_SECONDS + settings.REPLICA_CHECK_INTERVAL_SECONDS) + 1)
+        await get_redis().setex(PRIMARY_PIN_KEY.format(user_id=user_id), ttl, 1)
+    except Exception as e:
+        logger.warning("Failed to pin reads to primary", user_id=user_id, error=str(e))
+
+async def _is_pinned_to_primary(request: Request) -> bool:
+    """Whether the caller recently wrote and must read from the primary"""
+    payload = get_token_payload(request.headers.get("authorization"))
+    if not payload or not payload.get("sub"):
+        return False
+
+    try:
+        return bool(await get_redis().exists(PRIMARY_PIN_KEY.format(user_id=payload["sub"])))
+    except Exception:
+        # Without the pin store we cannot prove the replica is fresh enough
+        return True
+
+async def get_read_engine(request: Request) -> AsyncEngine:
+    """Dependency to get the engine a read-only session for this request binds to
+
+    For streamed responses, whose body is sent after the request's
+    dependencies have closed and so must open a session of its own.
+    """
+    pin_to_primary = bool(replica_router.replicas) and await _is_pinned_to_primary(request)
+    return replica_router.choose(pin_to_primary)
+
+async def get_read_db(request: Request) -> AsyncGenerator[AsyncSession, None]:
+    """Dependency to get a read-only session, served by a replica when possible"""
+    async with AsyncSessionLocal(bind=await get_read_engine(request)) as db:
+        yield db
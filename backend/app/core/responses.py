@@ -0,0 +1,47 @@
+"""
+JSON response helpers
+"""
+
+import uuid
+from typing import Any, AsyncIterator, Dict, Iterable, Mapping
+import orjson
+from starlette.responses import StreamingResponse
+
+def json_default(value: Any) -> Any:
+    """orjson fallback for UUID subclasses, such as the one asyncpg returns"""
+    if isinstance(value, uuid.UUID):
+        return str(value)
+    raise TypeError(f"Type is not JSON serializable: {type(value).__name__}")
+
+def _dump_rows(rows: Iterable[Mapping[str, Any]]) -> bytes:
+    # orjson handles datetime and str enums natively, and exact UUIDs
+    return orjson.dumps([dict(row) for row in rows], default=json_default)[1:-1]
+
+def stream_json_array(
+    head: Dict[str, Any],
+    key: str,
+    partitions: AsyncIterator[Iterable[Mapping[str, Any]]]
+) -> StreamingResponse:
+    """Stream `{**head, key: [...rows], "total_count": n}` one partition at a time
+
+    Rows are never all held in memory, and the client sees the first
+    bytes as soon as the first partition arrives from the database.
+    """
+    async def body():
+        opening = orjson.dumps(head)[:-1]
+        if len(opening) > 1:
+            opening += b","
+        yield opening + orjson.dumps(key) + b":["
+
+        count = 0
+        async for rows in partitions:
+            rows = list(rows)
+            if not rows:
+                continue
+            chunk = _dump_rows(rows)
+            yield (b"," + chunk) if count else chunk
+            count += len(rows)
+
+        yield b'],"total_count":' + str(count).encode() + b"}"
+
+    return StreamingResponse(body(), media_type="application/json")
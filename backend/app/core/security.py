@@ -2,16 +2,22 @@
 Security utilities for authentication and authorization
 """
 
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
 from typing import Optional, Dict, Any
 from jose import JWTError, jwt
 from passlib.context import CryptContext
 from fastapi import HTTPException, status, Depends
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from app.core.config import settings
 from app.core.database import get_db
+from app.core.user_cache import AuthenticatedUser, user_cache
 from app.models.user import User
+from app.repositories.user import UserRepository
+from app.services.monitoring import PASSWORD_HASH_DURATION, PASSWORD_HASH_QUEUE_DEPTH, PASSWORD_HASH_REJECTED
 import structlog
 
 logger = structlog.get_logger()
@@ -30,6 +36,55 @@ def get_password_hash(password: str) -> str:
     """Hash a password"""
     return pwd_context.hash(password)
 
+class PasswordHasher:
+    """Runs bcrypt on a dedicated thread pool so it never blocks the event loop
+
+    bcrypt releases the GIL while hashing, so `workers` threads give that
+    many hashes in parallel. Calls beyond `workers + max_queue` in flight
+    are turned away with a 503 instead of queueing without bound.
+    """
+    
+    def __init__(self, workers: int, max_queue: int):
+        self.workers = workers
+        self.max_queue = max_queue
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="password-hash")
+        self._in_flight = 0
+    
+    def _set_depth(self):
+        PASSWORD_HASH_QUEUE_DEPTH.set(max(0, self._in_flight - self.workers))
+    
+    async def _run(self, fn, *args):
+        if self._in_flight >= self.workers + self.max_queue:
+            PASSWORD_HASH_REJECTED.inc()
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Too many authentication requests, please retry",
+                headers={"Retry-After": "1"}
+            )
+        
+        self._in_flight += 1
+        self._set_depth()
+        start = time.perf_counter()
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self._executor, fn, *args)
+        finally:
+            self._in_flight -= 1
+            self._set_depth()
+            PASSWORD_HASH_DURATION.observe(time.perf_counter() - start)
+    
+    async def verify(self, plain_password: str, hashed_password: str) -> bool:
+        """Verify a password against its hash"""
+        return await self._run(verify_password, plain_password, hashed_password)
+    
+    async def hash(self, password: str) -> str:
+        """Hash a password"""
+        return await self._run(get_password_hash, password)
+    
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+password_hasher = PasswordHasher(settings.PASSWORD_HASH_WORKERS, settings.PASSWORD_HASH_MAX_QUEUE)
+
 def create_access_token(data: Dict[str, Any], expires_delta: Optional[timedelta] = None) -> str:
     """Create JWT access token"""
     to_encode = data.copy()
@@ -52,17 +107,24 @@ def verify_token(token: str) -> Optional[Dict[str, Any]]:
     except JWTError:
         return None
 
-def get_current_user(
-    credentials: HTTPAuthorizationCredentials = Depends(security),
-    db: Session = Depends(get_db)
-) -> User:
-    """Get current authenticated user"""
-    
-    credentials_exception = HTTPException(
+def get_token_payload(authorization: Optional[str]) -> Optional[Dict[str, Any]]:
+    """Verified payload from an Authorization header, if it carries a bearer token"""
+    scheme, _, token = (authorization or "").partition(" ")
+    if scheme.lower() != "bearer" or not token:
+        return None
+    return verify_token(token)
+
+def _credentials_exception() -> HTTPException:
+    return HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
+
+def _get_token_user_id(credentials: HTTPAuthorizationCredentials) -> str:
+    """User id from a bearer token, or 401"""
+    
+    credentials_exception = _credentials_exception()
     
     try:
         token = credentials.credentials
@@ -78,26 +140,63 @@ def get_current_user(
     except JWTError:
         raise credentials_exception
     
-    user = db.query(User).filter(User.id == user_id).first()
-    if user is None:
-        raise credentials_exception
-    
-    if not user.is_active:
+    return user_id
+
+def _check_active(is_active: bool):
+    if not is_active:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="User account is inactive"
         )
+
+async def get_current_user(
+    credentials: HTTPAuthorizationCredentials = Depends(security),
+    db: AsyncSession = Depends(get_db)
+) -> User:
+    """Get current authenticated user
+    
+    Loads the full row into the request's session (the same one the
+    endpoint receives from get_db), for endpoints that read or change
+    balances. Endpoints that only need who the caller is should depend on
+    get_authenticated_user instead.
+    """
+    user_id = _get_token_user_id(credentials)
+    
+    user = await UserRepository(db).get(user_id)
+    if user is None:
+        raise _credentials_exception()
+    
+    _check_active(user.is_active)
+    user_cache.put(user)
     
     return user
 
-def authenticate_user(db: Session, email: str, password: str) -> Optional[User]:
+async def get_authenticated_user(
+    credentials: HTTPAuthorizationCredentials = Depends(security),
+    db: AsyncSession = Depends(get_db)
+) -> AuthenticatedUser:
+    """Get current user identity, from the per-process cache when fresh"""
+    user_id = _get_token_user_id(credentials)
+    
+    identity = user_cache.get(user_id)
+    if identity is None:
+        user = await UserRepository(db).get(user_id)
+        if user is None:
+            raise _credentials_exception()
+        identity = user_cache.put(user)
+    
+    _check_active(identity.is_active)
+    
+    return identity
+
+async def authenticate_user(db: AsyncSession, email: str, password: str) -> Optional[User]:
     """Authenticate user with email and password"""
-    user = db.query(User).filter(User.email == email).first()
+    user = await UserRepository(db).get_by_email(email)
     
     if not user:
         return None
     
-    if not verify_password(password, user.password_hash):
+    if not await password_hasher.verify(password, user.password_hash):
         return None
     
     return user
@@ -0,0 +1,133 @@
+"""
+Per-process cache of authenticated user identities
+"""
+
+import asyncio
+import time
+import uuid
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Optional, Tuple
+from app.core.config import settings
+from app.core.database import get_redis
+from app.models.user import User
+import structlog
+
+logger = structlog.get_logger()
+
+USER_INVALIDATION_CHANNEL = "user_invalidated"
+
+@dataclass(frozen=True)
+class AuthenticatedUser:
+    """Balance-free snapshot of a user, safe to share between requests"""
+    id: uuid.UUID
+    email: str
+    username: str
+    is_active: bool
+    is_verified: bool
+    is_premium: bool
+
+    @classmethod
+    def from_user(cls, user: User) -> "AuthenticatedUser":
+        return cls(
+            id=user.id,
+            email=user.email,
+            username=user.username,
+            is_active=user.is_active,
+            is_verified=user.is_verified,
+            is_premium=user.is_premium
+        )
+
+class UserCache:
+    """Short-TTL LRU of user identities, invalidated over Redis pub/sub
+
+    Whatever deactivates a user or changes a cached field must call
+    publish_user_invalidation() after its commit. The app itself has no
+    such path, so a change made outside it (an admin script, a manual
+    UPDATE) that does not publish is seen only once the TTL expires. The
+    TTL likewise bounds how long a change goes unseen if a message is
+    lost, e.g. while the subscriber is reconnecting.
+    """
+
+    def __init__(self, ttl_seconds: float, max_entries: int):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Tuple[float, AuthenticatedUser]]" = OrderedDict()
+        self._task: Optional[asyncio.Task] = None
+
+    def get(self, user_id: str) -> Optional[AuthenticatedUser]:
+        """Cached identity, or None if missing or expired"""
+        entry = self._entries.get(user_id)
+        if entry is None:
+            return None
+
+        expires_at, identity = entry
+        if expires_at < time.monotonic():
+            self._entries.pop(user_id, None)
+            return None
+
+        self._entries.move_to_end(user_id)
+        return identity
+
+    def put(self, user: User) -> AuthenticatedUser:
+        """Cache a freshly loaded user"""
+        identity = AuthenticatedUser.from_user(user)
+        if self.ttl_seconds <= 0:
+            return identity
+
+        self._entries[str(user.id)] = (time.monotonic() + self.ttl_seconds, identity)
+        self._entries.move_to_end(str(user.id))
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+        return identity
+
+    def invalidate(self, user_id: str):
+        """Drop one user from this process's cache"""
+        self._entries.pop(user_id, None)
+
+    def clear(self):
+        self._entries.clear()
+
+    async def _listen(self):
+        while True:
+            pubsub = get_redis().pubsub()
+            try:
+                await pubsub.subscribe(USER_INVALIDATION_CHANNEL)
+                # Anything published while we were not subscribed is lost
+                self.clear()
+                async for message in pubsub.listen():
+                    if message["type"] == "message":
+                        self.invalidate(message["data"])
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning("User invalidation subscriber disconnected", error=str(e))
+                await asyncio.sleep(1)
+            finally:
+                await pubsub.aclose()
+
+    async def start(self):
+        """Subscribe to invalidations from other workers"""
+        self._task = asyncio.create_task(self._listen())
+
+    async def stop(self):
+        """Stop the invalidation subscriber"""
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        self.clear()
+
+user_cache = UserCache(settings.USER_CACHE_TTL_SECONDS, settings.USER_CACHE_MAX_ENTRIES)
+
+async def publish_user_invalidation(user_id: str):
+    """Evict a user from every worker's cache; call after committing the change"""
+    user_cache.invalidate(user_id)
+    try:
+        await get_redis().publish(USER_INVALIDATION_CHANNEL, user_id)
+    except Exception as e:
+        # Other workers fall back on the TTL
+        logger.warning("Failed to publish user invalidation", user_id=user_id, error=str(e))
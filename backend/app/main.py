@@ -6,18 +6,28 @@ Main FastAPI application entry point
 from fastapi import FastAPI, HTTPException, Depends, status
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.middleware.trustedhost import TrustedHostMiddleware
+from fastapi.responses import ORJSONResponse
 from fastapi.security import HTTPBearer
 import structlog
 import uvicorn
 from contextlib import asynccontextmanager
 
 from app.core.config import settings
-from app.core.database import init_db
-from app.core.security import get_current_user
+from app.core.logging import configure_logging, log_writer
+from app.core.database import init_db, close_db, init_redis, close_redis
+from app.core.rate_limit import rate_limiter
+from app.core.replicas import replica_router
+from app.core.user_cache import user_cache
+from app.core.security import get_current_user, password_hasher
 from app.api.v1.api import api_router
 from app.core.middleware import LoggingMiddleware, RateLimitMiddleware
+from app.services.listing_counts import listing_counts
+from app.services.listing_search import listing_snapshot
 from app.services.monitoring import setup_monitoring
+from app.services.order_book import order_book
+from app.services.write_behind import write_behind
 
+configure_logging()
 logger = structlog.get_logger()
 
 @asynccontextmanager
@@ -26,6 +36,14 @@ async def lifespan(app: FastAPI):
     # Startup
     logger.info("Starting Subsplit Backend")
     await init_db()
+    await init_redis()
+    await user_cache.start()
+    await rate_limiter.start()
+    await replica_router.start(settings.REPLICA_CHECK_INTERVAL_SECONDS)
+    await write_behind.start()
+    await listing_counts.start()
+    await listing_snapshot.start()
+    await order_book.start()
     await setup_monitoring()
     logger.info("Subsplit Backend started successfully")
     
@@ -33,6 +51,17 @@ async def lifespan(app: FastAPI):
     
     # Shutdown
     logger.info("Shutting down Subsplit Backend")
+    await order_book.stop()
+    await listing_snapshot.stop()
+    await listing_counts.stop()
+    await write_behind.stop()
+    await replica_router.stop()
+    await user_cache.stop()
+    await rate_limiter.stop()
+    await close_redis()
+    await close_db()
+    password_hasher.shutdown()
+    log_writer.stop()
 
 app = FastAPI(
     title="Subsplit API",
@@ -40,6 +69,7 @@ app = FastAPI(
     version="1.0.0",
     docs_url="/docs" if settings.DEBUG else None,
     redoc_url="/redoc" if settings.DEBUG else None,
+    default_response_class=ORJSONResponse,
     lifespan=lifespan
 )
 
@@ -1 +1,13 @@
 # Database models
+# Imported together so relationship() names resolve whichever model is used first
+from app.models import (  # noqa: F401
+    credit_pool,
+    listing,
+    order_event,
+    platform_account,
+    session,
+    transaction,
+    usage_log,
+    user,
+    virtual_card,
+)
@@ -2,7 +2,7 @@
 Credit pool model for pooling credits across multiple accounts
 """
 
-from sqlalchemy import Column, String, DateTime, Boolean, Float, Enum, ForeignKey, Integer
+from sqlalchemy import Column, String, DateTime, Boolean, Float, Enum, ForeignKey, Integer, Index, text
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import relationship
 import uuid
@@ -18,6 +18,12 @@ class PoolStatus(str, enum.Enum):
 
 class CreditPool(Base):
     __tablename__ = "credit_pools"
+    __table_args__ = (
+        Index("ix_credit_pools_public_active_platform", "platform",
+              postgresql_where=text("is_public AND status = 'ACTIVE'")),
+        Index("ix_credit_pools_is_public_status_platform", "is_public", "status", "platform"),
+        Index("ix_credit_pools_owner_id", "owner_id"),
+    )
     
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     
@@ -64,6 +70,9 @@ class CreditPool(Base):
 
 class CreditPoolContribution(Base):
     __tablename__ = "credit_pool_contributions"
+    __table_args__ = (
+        Index("ix_credit_pool_contributions_credit_pool_id", "credit_pool_id"),
+    )
     
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     
@@ -88,6 +97,9 @@ class CreditPoolContribution(Base):
 
 class PoolSession(Base):
     __tablename__ = "pool_sessions"
+    __table_args__ = (
+        Index("ix_pool_sessions_credit_pool_id_status", "credit_pool_id", "status"),
+    )
     
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     
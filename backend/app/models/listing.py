@@ -0,0 +1,57 @@
+"""
+Marketplace listing read model
+"""
+
+from sqlalchemy import Column, String, DateTime, Float, BigInteger, Enum, ForeignKey, Index
+from sqlalchemy.dialects.postgresql import UUID
+from datetime import datetime
+from app.core.database import Base
+from app.models.platform_account import PlatformType
+
+class Listing(Base):
+    """One row per card on the marketplace, denormalised for browsing
+
+    Written in the same transaction as the card change by
+    ListingRepository.sync(); never edited directly.
+    """
+    __tablename__ = "marketplace_listings"
+    __table_args__ = (
+        # Keyset orders, with and without a platform filter
+        Index("ix_marketplace_listings_price", "current_price", "card_id"),
+        Index("ix_marketplace_listings_platform_price", "platform", "current_price", "card_id"),
+        Index("ix_marketplace_listings_balance", "available_balance", "card_id"),
+        Index("ix_marketplace_listings_platform_balance", "platform", "available_balance", "card_id"),
+        Index("ix_marketplace_listings_created_at", "created_at", "card_id"),
+        Index("ix_marketplace_listings_platform_created_at", "platform", "created_at", "card_id"),
+    )
+
+    card_id = Column(UUID(as_uuid=True), ForeignKey("virtual_cards.id", ondelete="CASCADE"), primary_key=True)
+    platform = Column(Enum(PlatformType), nullable=False)
+    seller_id = Column(UUID(as_uuid=True), nullable=False)
+    seller_username = Column(String(50), nullable=False)
+
+    available_balance = Column(Float, nullable=False)
+    price_per_hour = Column(Float, nullable=False)
+    current_price = Column(Float, nullable=False)
+    demand_multiplier = Column(Float)
+    utilization_percentage = Column(Float, nullable=False, default=0.0)
+
+    created_at = Column(DateTime, nullable=False)
+    expires_at = Column(DateTime, nullable=False)
+
+class ListingChange(Base):
+    """Card ids whose listing row changed, in commit-ish order
+
+    Appended by ListingRepository in the same transaction as the change so
+    in-memory copies of the read model can fetch only what moved. A row
+    without a card id means the whole table was rebuilt. Old rows are
+    pruned; readers that fall behind reload everything.
+    """
+    __tablename__ = "marketplace_listing_changes"
+    __table_args__ = (
+        Index("ix_marketplace_listing_changes_created_at", "created_at"),
+    )
+
+    seq = Column(BigInteger, primary_key=True, autoincrement=True)
+    card_id = Column(UUID(as_uuid=True))
+    created_at = Column(DateTime, nullable=False, default=datetime.utcnow)
@@ -0,0 +1,51 @@
+"""
+Buy order journal for the marketplace order book
+"""
+
+from sqlalchemy import Column, String, DateTime, Float, Integer, BigInteger, Enum, Index, text
+from sqlalchemy.dialects.postgresql import UUID
+from datetime import datetime
+import enum
+from app.core.database import Base
+from app.models.platform_account import PlatformType
+
+class OrderEventKind(str, enum.Enum):
+    PLACED = "placed"
+    CANCELLED = "cancelled"
+    FILLED = "filled"
+    FAILED = "failed"
+
+class OrderEvent(Base):
+    """Append-only log of buy orders; rows are never updated or deleted
+
+    An order is open from its PLACED event until its one terminal event.
+    A unique index allows only one terminal event per order, so a fill
+    racing a cancellation commits at most one of them.
+    """
+    __tablename__ = "order_events"
+    __table_args__ = (
+        Index("ix_order_events_order_id", "order_id"),
+        Index(
+            "uq_order_events_terminal",
+            "order_id",
+            unique=True,
+            postgresql_where=text("kind <> 'PLACED'")
+        ),
+    )
+
+    seq = Column(BigInteger, primary_key=True, autoincrement=True)
+    order_id = Column(UUID(as_uuid=True), nullable=False)
+    kind = Column(Enum(OrderEventKind), nullable=False)
+    buyer_id = Column(UUID(as_uuid=True), nullable=False)
+
+    # The order, on PLACED events
+    platform = Column(Enum(PlatformType))
+    max_price = Column(Float)
+    duration_hours = Column(Integer)
+    min_balance = Column(Float)
+
+    # The outcome, on terminal events
+    card_id = Column(UUID(as_uuid=True))
+    reason = Column(String(50))
+
+    created_at = Column(DateTime, nullable=False, default=datetime.utcnow)
@@ -17,6 +17,13 @@ class PlatformType(str, enum.Enum):
     MIDJOURNEY = "midjourney"
     CANVA = "canva"
 
+    @classmethod
+    def _missing_(cls, value):
+        # Query strings such as ?platform=ChatGPT
+        if isinstance(value, str):
+            return cls._value2member_map_.get(value.lower())
+        return None
+
 class AccountStatus(str, enum.Enum):
     ACTIVE = "active"
     INACTIVE = "inactive"
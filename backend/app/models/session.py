@@ -2,7 +2,7 @@
 Session model for managing AI platform access sessions
 """
 
-from sqlalchemy import Column, String, DateTime, Boolean, Float, Enum, ForeignKey, JSON
+from sqlalchemy import Column, String, DateTime, Boolean, Float, Enum, ForeignKey, Integer, JSON, Index
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import relationship
 import uuid
@@ -18,6 +18,9 @@ class SessionStatus(str, enum.Enum):
 
 class Session(Base):
     __tablename__ = "sessions"
+    __table_args__ = (
+        Index("ix_sessions_buyer_id", "buyer_id"),
+    )
     
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     
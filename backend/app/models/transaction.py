@@ -49,7 +49,7 @@ class Transaction(Base):
     # Status and metadata
     status = Column(Enum(TransactionStatus), default=TransactionStatus.PENDING)
     description = Column(Text)
-    metadata = Column(String(1000))  # Additional transaction data
+    extra_metadata = Column("metadata", String(1000))  # Additional transaction data
     
     # Timestamps
     created_at = Column(DateTime, default=datetime.utcnow)
@@ -2,7 +2,7 @@
 Usage log model for tracking platform usage and billing
 """
 
-from sqlalchemy import Column, String, DateTime, Float, ForeignKey, Integer, JSON, Text
+from sqlalchemy import Column, String, DateTime, Float, ForeignKey, Integer, JSON, Text, Index
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import relationship
 import uuid
@@ -11,6 +11,9 @@ from app.core.database import Base
 
 class UsageLog(Base):
     __tablename__ = "usage_logs"
+    __table_args__ = (
+        Index("ix_usage_logs_platform_created_at", "platform", "created_at"),
+    )
     
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     
@@ -40,7 +40,7 @@ class User(Base):
     
     # Relationships
     platform_accounts = relationship("PlatformAccount", back_populates="user")
-    virtual_cards = relationship("VirtualCard", back_populates="seller")
+    virtual_cards = relationship("VirtualCard", foreign_keys="VirtualCard.seller_id", back_populates="seller")
     sessions = relationship("Session", back_populates="buyer")
-    transactions = relationship("Transaction", back_populates="buyer")
+    transactions = relationship("Transaction", foreign_keys="Transaction.buyer_id", back_populates="buyer")
     credit_pools = relationship("CreditPool", back_populates="owner")
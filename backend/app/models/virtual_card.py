@@ -2,7 +2,7 @@
 Virtual card model for managing credit transactions
 """
 
-from sqlalchemy import Column, String, DateTime, Boolean, Float, Enum, ForeignKey, Integer
+from sqlalchemy import Column, String, DateTime, Boolean, Float, Enum, ForeignKey, Integer, Index, text
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import relationship
 import uuid
@@ -19,6 +19,13 @@ class CardStatus(str, enum.Enum):
 
 class VirtualCard(Base):
     __tablename__ = "virtual_cards"
+    __table_args__ = (
+        Index("ix_virtual_cards_available_platform_account", "platform_account_id",
+              postgresql_where=text("status = 'ACTIVE' AND buyer_id IS NULL")),
+        Index("ix_virtual_cards_seller_id", "seller_id"),
+        Index("ix_virtual_cards_buyer_id", "buyer_id", postgresql_where=text("buyer_id IS NOT NULL")),
+        Index("ix_virtual_cards_created_at", "created_at"),
+    )
     
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     
@@ -73,3 +80,12 @@ class VirtualCard(Base):
             not self.is_expired() and 
             not self.is_depleted()
         )
+    
+    def is_listed(self):
+        # On the marketplace: active and not yet bought
+        return self.status == CardStatus.ACTIVE and self.buyer_id is None
+    
+    def get_utilization_percentage(self):
+        if not self.initial_balance:
+            return 0.0
+        return (self.total_charged or 0.0) / self.initial_balance * 100
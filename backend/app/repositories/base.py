@@ -0,0 +1,42 @@
+"""
+Base repository with identity-map primary key lookups
+"""
+
+import uuid
+from typing import Any, Generic, Optional, Type, TypeVar
+from sqlalchemy.ext.asyncio import AsyncSession
+
+ModelT = TypeVar("ModelT")
+
+def coerce_id(value: Any) -> Optional[uuid.UUID]:
+    """Normalise an id to the UUID key the identity map is indexed by"""
+    if isinstance(value, uuid.UUID):
+        return value
+    try:
+        return uuid.UUID(str(value))
+    except ValueError:
+        return None
+
+class Repository(Generic[ModelT]):
+    """Loads rows of one model for a session
+
+    get() goes through Session.get(), which returns an already-loaded
+    instance without touching the database and otherwise runs the mapper's
+    pre-built primary key loader rather than constructing a new select().
+    Subclasses add lookups on other columns as lambda statements, whose
+    construction is cached per call site.
+    """
+    
+    model: Type[ModelT]
+    
+    def __init__(self, db: AsyncSession, model: Optional[Type[ModelT]] = None):
+        self.db = db
+        if model is not None:
+            self.model = model
+    
+    async def get(self, id: Any) -> Optional[ModelT]:
+        """Load by primary key, None for unknown or malformed ids"""
+        pk = coerce_id(id)
+        if pk is None:
+            return None
+        return await self.db.get(self.model, pk)
@@ -0,0 +1,135 @@
+"""
+Marketplace listing read model repository
+"""
+
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+from sqlalchemy import case, delete, func, select
+from sqlalchemy.dialects.postgresql import insert
+from app.models.listing import Listing, ListingChange
+from app.models.platform_account import PlatformAccount
+from app.models.user import User
+from app.models.virtual_card import VirtualCard, CardStatus
+from app.repositories.base import Repository
+
+# Rows per multi-row upsert; keeps bind parameters under asyncpg's limit
+UPSERT_BATCH_SIZE = 1000
+
+# Columns refreshed when a listed card changes
+MUTABLE_COLUMNS = (
+    "available_balance",
+    "price_per_hour",
+    "current_price",
+    "demand_multiplier",
+    "utilization_percentage",
+    "expires_at",
+)
+
+class ListingRepository(Repository[Listing]):
+    model = Listing
+
+    async def sync(self, *cards: VirtualCard):
+        """Upsert listed cards and remove the rest, in the caller's transaction
+
+        Call after changing the cards and before committing. Cards must
+        already be flushed so the foreign key holds for new ones.
+        """
+        rows: List[Dict[str, Any]] = []
+        removed = []
+        for card in cards:
+            if card.is_listed():
+                rows.append(await self._row(card))
+            else:
+                removed.append(card.id)
+
+        for start in range(0, len(rows), UPSERT_BATCH_SIZE):
+            stmt = insert(Listing).values(rows[start:start + UPSERT_BATCH_SIZE])
+            await self.db.execute(stmt.on_conflict_do_update(
+                index_elements=[Listing.card_id],
+                set_={column: stmt.excluded[column] for column in MUTABLE_COLUMNS}
+            ))
+
+        if removed:
+            await self.db.execute(delete(Listing).where(Listing.card_id.in_(removed)))
+
+        await self._record_changes([card.id for card in cards])
+
+    async def remove(self, *card_ids: Any) -> List[Any]:
+        """Delete listings by card id, returning (card_id, platform, current_price) of each removed row"""
+        if not card_ids:
+            return []
+        result = await self.db.execute(
+            delete(Listing).where(Listing.card_id.in_(card_ids)).returning(
+                Listing.card_id, Listing.platform, Listing.current_price
+            )
+        )
+        await self._record_changes(list(card_ids))
+        return result.all()
+
+    async def rebuild(self) -> int:
+        """Replace the read model with a fresh projection of virtual_cards
+
+        Runs in the caller's transaction, so readers keep seeing the old
+        rows until it commits. A card changed while it runs can be
+        projected from the older snapshot; its next sync corrects it.
+        """
+        await self.db.execute(delete(Listing))
+        projection = select(
+            VirtualCard.id,
+            PlatformAccount.platform,
+            User.id,
+            User.username,
+            VirtualCard.current_balance,
+            VirtualCard.price_per_hour,
+            VirtualCard.current_price,
+            VirtualCard.demand_multiplier,
+            case(
+                (VirtualCard.initial_balance > 0,
+                 func.coalesce(VirtualCard.total_charged, 0) / VirtualCard.initial_balance * 100),
+                else_=0.0
+            ),
+            func.coalesce(VirtualCard.created_at, func.now()),
+            VirtualCard.expires_at,
+        ).join(
+            PlatformAccount, VirtualCard.platform_account_id == PlatformAccount.id
+        ).join(
+            User, VirtualCard.seller_id == User.id
+        ).where(
+            VirtualCard.status == CardStatus.ACTIVE,
+            VirtualCard.buyer_id.is_(None)
+        )
+        stmt = insert(Listing).from_select(
+            ["card_id", "platform", "seller_id", "seller_username", "available_balance",
+             "price_per_hour", "current_price", "demand_multiplier", "utilization_percentage",
+             "created_at", "expires_at"],
+            projection
+        ).on_conflict_do_nothing(index_elements=[Listing.card_id])
+        await self.db.execute(stmt)
+        await self._record_changes([None])
+        return await self.db.scalar(select(func.count()).select_from(Listing))
+
+    async def _record_changes(self, card_ids: List[Optional[Any]]):
+        """Log changed card ids for incremental readers; None means everything"""
+        now = datetime.utcnow()
+        for start in range(0, len(card_ids), UPSERT_BATCH_SIZE):
+            await self.db.execute(insert(ListingChange).values([
+                {"card_id": card_id, "created_at": now}
+                for card_id in card_ids[start:start + UPSERT_BATCH_SIZE]
+            ]))
+
+    async def _row(self, card: VirtualCard) -> Dict[str, Any]:
+        platform_account = await card.awaitable_attrs.platform_account
+        seller = await card.awaitable_attrs.seller
+        return {
+            "card_id": card.id,
+            "platform": platform_account.platform,
+            "seller_id": card.seller_id,
+            "seller_username": seller.username,
+            "available_balance": card.current_balance,
+            "price_per_hour": card.price_per_hour,
+            "current_price": card.current_price,
+            "demand_multiplier": card.demand_multiplier,
+            "utilization_percentage": card.get_utilization_percentage(),
+            "created_at": card.created_at,
+            "expires_at": card.expires_at,
+        }
@@ -0,0 +1,88 @@
+"""
+Buy order journal repository
+"""
+
+import uuid
+from typing import Any, List, Optional
+from sqlalchemy import exists, func, select
+from sqlalchemy.orm import aliased
+from app.models.order_event import OrderEvent, OrderEventKind
+from app.models.platform_account import PlatformType
+from app.repositories.base import Repository, coerce_id
+
+class OrderJournal(Repository[OrderEvent]):
+    """Appends to and reads the order_events log; the caller commits"""
+
+    model = OrderEvent
+
+    def place(
+        self,
+        buyer_id: Any,
+        platform: PlatformType,
+        max_price: float,
+        duration_hours: int,
+        min_balance: float
+    ) -> OrderEvent:
+        event = OrderEvent(
+            order_id=uuid.uuid4(),
+            kind=OrderEventKind.PLACED,
+            buyer_id=coerce_id(buyer_id),
+            platform=platform,
+            max_price=max_price,
+            duration_hours=duration_hours,
+            min_balance=min_balance
+        )
+        self.db.add(event)
+        return event
+
+    def close(
+        self,
+        order_id: uuid.UUID,
+        buyer_id: uuid.UUID,
+        kind: OrderEventKind,
+        card_id: Optional[uuid.UUID] = None,
+        reason: Optional[str] = None
+    ) -> OrderEvent:
+        """Append the order's terminal event
+
+        A second terminal event for the same order fails with
+        IntegrityError when the transaction is flushed.
+        """
+        event = OrderEvent(order_id=order_id, kind=kind, buyer_id=buyer_id, card_id=card_id, reason=reason)
+        self.db.add(event)
+        return event
+
+    async def history(self, order_id: Any) -> List[OrderEvent]:
+        """Events of one order, oldest first; empty for unknown ids"""
+        order_pk = coerce_id(order_id)
+        if order_pk is None:
+            return []
+        result = await self.db.execute(
+            select(OrderEvent).where(OrderEvent.order_id == order_pk).order_by(OrderEvent.seq)
+        )
+        return list(result.scalars())
+
+    async def open_orders(self) -> List[OrderEvent]:
+        """PLACED events of orders with no terminal event yet"""
+        Terminal = aliased(OrderEvent)
+        closed = exists().where(
+            Terminal.order_id == OrderEvent.order_id,
+            Terminal.kind != OrderEventKind.PLACED
+        )
+        result = await self.db.execute(
+            select(OrderEvent).where(
+                OrderEvent.kind == OrderEventKind.PLACED,
+                ~closed
+            ).order_by(OrderEvent.seq)
+        )
+        return list(result.scalars())
+
+    async def since(self, seq: int, limit: int = 1000) -> List[OrderEvent]:
+        """Events after `seq` in journal order"""
+        result = await self.db.execute(
+            select(OrderEvent).where(OrderEvent.seq > seq).order_by(OrderEvent.seq).limit(limit)
+        )
+        return list(result.scalars())
+
+    async def last_seq(self) -> int:
+        return await self.db.scalar(select(func.coalesce(func.max(OrderEvent.seq), 0)))
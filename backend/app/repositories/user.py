@@ -0,0 +1,17 @@
+"""
+User repository
+"""
+
+from typing import Optional
+from sqlalchemy import lambda_stmt, select
+from app.models.user import User
+from app.repositories.base import Repository
+
+class UserRepository(Repository[User]):
+    model = User
+    
+    async def get_by_email(self, email: str) -> Optional[User]:
+        """Get user by email"""
+        stmt = lambda_stmt(lambda: select(User).where(User.email == email))
+        result = await self.db.execute(stmt)
+        return result.scalars().first()
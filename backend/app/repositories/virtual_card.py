@@ -0,0 +1,25 @@
+"""
+Virtual card repository
+"""
+
+from typing import Optional
+from sqlalchemy import lambda_stmt, select
+from app.models.virtual_card import VirtualCard
+from app.repositories.base import Repository
+
+class VirtualCardRepository(Repository[VirtualCard]):
+    model = VirtualCard
+    
+    async def get_by_credentials(self, card_number: str, cvv: str) -> Optional[VirtualCard]:
+        """Get card by number and CVV"""
+        stmt = lambda_stmt(lambda: select(VirtualCard).where(
+            VirtualCard.card_number == card_number,
+            VirtualCard.cvv == cvv
+        ))
+        result = await self.db.execute(stmt)
+        return result.scalars().first()
+    
+    async def card_number_exists(self, card_number: str) -> bool:
+        """Whether a card number is already issued"""
+        stmt = lambda_stmt(lambda: select(VirtualCard.id).where(VirtualCard.card_number == card_number))
+        return await self.db.scalar(stmt) is not None
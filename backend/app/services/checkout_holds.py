@@ -0,0 +1,132 @@
+"""
+Short-lived checkout holds on marketplace cards
+"""
+
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Dict, Iterable, Optional, Tuple
+import redis.asyncio as aioredis
+from app.core.config import settings
+from app.core.database import get_redis
+
+HOLD_KEY_PREFIX = "checkout_hold:"
+BUYER_KEY_PREFIX = "checkout_hold:buyer:"
+
+# Card key -> "<buyer id>|<expiry in epoch ms>", buyer key -> card id. A
+# buyer holds one explicit reservation at a time: taking another releases
+# the previous one, so nobody can sit on a whole page of listings. Holds
+# taken on a buyer's behalf while a purchase settles (ARGV[5] = 0) leave
+# the buyer key, and so the buyer's own reservation, alone.
+RESERVE_LUA = """
+local current = redis.call('GET', KEYS[1])
+if current and string.match(current, '^[^|]*') ~= ARGV[1] then
+    return {0, current}
+end
+
+local exclusive = ARGV[5] == '1'
+local previous = redis.call('GET', KEYS[2])
+if exclusive and previous and previous ~= ARGV[3] then
+    local previous_key = ARGV[4] .. previous
+    local value = redis.call('GET', previous_key)
+    if value and string.match(value, '^[^|]*') == ARGV[1] then
+        redis.call('DEL', previous_key)
+    end
+end
+
+local clock = redis.call('TIME')
+local now = tonumber(clock[1]) * 1000 + math.floor(tonumber(clock[2]) / 1000)
+local ttl = tonumber(ARGV[2])
+local value = ARGV[1] .. '|' .. (now + ttl)
+redis.call('SET', KEYS[1], value, 'PX', ttl)
+if exclusive or previous == ARGV[3] then
+    redis.call('SET', KEYS[2], ARGV[3], 'PX', ttl)
+end
+return {1, value}
+"""
+
+RELEASE_LUA = """
+local current = redis.call('GET', KEYS[1])
+if not current or string.match(current, '^[^|]*') ~= ARGV[1] then
+    return 0
+end
+redis.call('DEL', KEYS[1])
+if redis.call('GET', KEYS[2]) == ARGV[2] then
+    redis.call('DEL', KEYS[2])
+end
+return 1
+"""
+
+@dataclass(frozen=True)
+class Hold:
+    buyer_id: str
+    expires_at: datetime
+
+def _parse_hold(value: Any) -> Optional[Hold]:
+    if value is None:
+        return None
+    if isinstance(value, bytes):
+        value = value.decode()
+    buyer_id, _, expires_ms = value.partition("|")
+    return Hold(buyer_id=buyer_id, expires_at=datetime.utcfromtimestamp(int(expires_ms) / 1000))
+
+class CheckoutHolds:
+    """Per-card Redis holds that let one buyer at a time check out
+
+    Purchases take the hold before touching the database, so buyers who
+    lose a race for a popular card are turned away by one script call.
+    Holds expire on their own; nothing here is authoritative, the
+    conditional UPDATE in MarketplaceService still decides who gets a card.
+    """
+
+    def __init__(self, ttl_seconds: float):
+        self.ttl_seconds = ttl_seconds
+        self._client: Optional[aioredis.Redis] = None
+        self._reserve = None
+        self._release = None
+
+    def _bind(self):
+        # The client is recreated by the app lifespan; rebind when it changes
+        client = get_redis()
+        if client is not self._client:
+            self._client = client
+            self._reserve = client.register_script(RESERVE_LUA)
+            self._release = client.register_script(RELEASE_LUA)
+
+    async def reserve(self, card_id: Any, buyer_id: Any, exclusive: bool = True) -> Tuple[bool, Hold]:
+        """(acquired, current hold); holding the card already refreshes it
+
+        An exclusive hold is the buyer's one explicit reservation and
+        replaces any previous one. Purchases pass exclusive=False so that
+        settling one card does not drop the reservation on another.
+        """
+        self._bind()
+        card_id, buyer_id = str(card_id), str(buyer_id)
+        acquired, value = await self._reserve(
+            keys=[HOLD_KEY_PREFIX + card_id, BUYER_KEY_PREFIX + buyer_id],
+            args=[buyer_id, int(self.ttl_seconds * 1000), card_id, HOLD_KEY_PREFIX, int(exclusive)]
+        )
+        return bool(acquired), _parse_hold(value)
+
+    async def release(self, card_id: Any, buyer_id: Any) -> bool:
+        """Drop the hold if `buyer_id` has it"""
+        self._bind()
+        card_id, buyer_id = str(card_id), str(buyer_id)
+        released = await self._release(
+            keys=[HOLD_KEY_PREFIX + card_id, BUYER_KEY_PREFIX + buyer_id],
+            args=[buyer_id, card_id]
+        )
+        return bool(released)
+
+    async def holds(self, card_ids: Iterable[Any]) -> Dict[str, Hold]:
+        """Current holds among `card_ids`, keyed by card id string"""
+        card_ids = [str(card_id) for card_id in card_ids]
+        if not card_ids:
+            return {}
+        values = await get_redis().mget([HOLD_KEY_PREFIX + card_id for card_id in card_ids])
+        return {
+            card_id: _parse_hold(value)
+            for card_id, value in zip(card_ids, values)
+            if value is not None
+        }
+
+checkout_holds = CheckoutHolds(ttl_seconds=settings.CHECKOUT_HOLD_SECONDS)
@@ -4,21 +4,25 @@ Credit Pool Service - Handles credit pooling across multiple accounts
 
 from datetime import datetime, timedelta
 from typing import Dict, Any, List, Optional
-from sqlalchemy.orm import Session
-from sqlalchemy import and_, func
+from sqlalchemy import and_, func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
 from app.models.credit_pool import CreditPool, CreditPoolContribution, PoolSession, PoolStatus
 from app.models.platform_account import PlatformAccount
 from app.models.user import User
 from app.core.config import settings
+from app.core.http_cache import POOLS, bump_versions
+from app.repositories.base import Repository
+from app.services.write_behind import write_behind
 import structlog
 
 logger = structlog.get_logger()
 
 class CreditPoolService:
-    def __init__(self, db: Session):
+    def __init__(self, db: AsyncSession):
         self.db = db
     
-    def create_pool(
+    async def create_pool(
         self,
         owner_id: str,
         platform: str,
@@ -45,14 +49,15 @@ class CreditPoolService:
         )
         
         self.db.add(pool)
-        self.db.commit()
-        self.db.refresh(pool)
+        await self.db.commit()
+        await self.db.refresh(pool)
+        await bump_versions(POOLS)
         
         logger.info("Credit pool created", pool_id=str(pool.id), owner_id=owner_id, platform=platform)
         
         return pool
     
-    def contribute_to_pool(
+    async def contribute_to_pool(
         self,
         pool_id: str,
         platform_account_id: str,
@@ -61,7 +66,7 @@ class CreditPoolService:
     ) -> CreditPoolContribution:
         """Contribute credits to a pool"""
         
-        pool = self.db.query(CreditPool).filter(CreditPool.id == pool_id).first()
+        pool = await self._get_pool(pool_id)
         if not pool:
             raise Exception("Pool not found")
         
@@ -72,9 +77,7 @@ class CreditPoolService:
             raise Exception(f"Amount must be between {pool.min_contribution} and {pool.max_contribution}")
         
         # Check if platform account has enough credits
-        platform_account = self.db.query(PlatformAccount).filter(
-            PlatformAccount.id == platform_account_id
-        ).first()
+        platform_account = await Repository(self.db, PlatformAccount).get(platform_account_id)
         
         if not platform_account or platform_account.available_credits < amount:
             raise Exception("Insufficient credits in platform account")
@@ -97,14 +100,15 @@ class CreditPoolService:
         platform_account.credits_used += amount
         
         self.db.add(contribution)
-        self.db.commit()
-        self.db.refresh(contribution)
+        await self.db.commit()
+        await self.db.refresh(contribution)
+        await bump_versions(POOLS)
         
         logger.info("Contribution made", contribution_id=str(contribution.id), amount=amount)
         
         return contribution
     
-    def create_pool_session(
+    async def create_pool_session(
         self,
         pool_id: str,
         user_id: str,
@@ -113,7 +117,7 @@ class CreditPoolService:
     ) -> PoolSession:
         """Create a session from pool credits"""
         
-        pool = self.db.query(CreditPool).filter(CreditPool.id == pool_id).first()
+        pool = await self._get_pool(pool_id)
         if not pool:
             raise Exception("Pool not found")
         
@@ -139,17 +143,18 @@ class CreditPoolService:
         pool.last_used_at = datetime.utcnow()
         
         self.db.add(session)
-        self.db.commit()
-        self.db.refresh(session)
+        await self.db.commit()
+        await self.db.refresh(session)
+        await bump_versions(POOLS)
         
         logger.info("Pool session created", session_id=str(session.id), amount=requested_amount)
         
         return session
     
-    def use_pool_session(self, session_id: str, amount: float) -> bool:
+    async def use_pool_session(self, session_id: str, amount: float) -> bool:
         """Use credits from pool session"""
         
-        session = self.db.query(PoolSession).filter(PoolSession.id == session_id).first()
+        session = await self._get_pool_session(session_id)
         if not session:
             return False
         
@@ -162,20 +167,21 @@ class CreditPoolService:
         # Update session usage
         session.used_amount += amount
         
-        # Update pool
-        pool = session.credit_pool
-        pool.total_used += amount
+        # Pool-wide usage stats are buffered so concurrent sessions on the
+        # same pool don't serialise on its row
+        write_behind.increment(CreditPool, session.credit_pool_id, total_used=amount)
+        write_behind.touch(CreditPool, session.credit_pool_id, last_used_at=datetime.utcnow())
         
-        self.db.commit()
+        await self.db.commit()
         
         logger.info("Pool session used", session_id=session_id, amount=amount)
         
         return True
     
-    def complete_pool_session(self, session_id: str) -> bool:
+    async def complete_pool_session(self, session_id: str) -> bool:
         """Complete pool session and return unused credits"""
         
-        session = self.db.query(PoolSession).filter(PoolSession.id == session_id).first()
+        session = await self._get_pool_session(session_id)
         if not session:
             return False
         
@@ -183,7 +189,7 @@ class CreditPoolService:
         unused_amount = session.allocated_amount - session.used_amount
         
         # Return unused credits to pool
-        pool = session.credit_pool
+        pool = await session.awaitable_attrs.credit_pool
         pool.available_balance += unused_amount
         
         # Update session
@@ -193,31 +199,40 @@ class CreditPoolService:
         # Update pool stats
         pool.active_sessions -= 1
         
-        self.db.commit()
+        await self.db.commit()
+        await bump_versions(POOLS)
         
         logger.info("Pool session completed", session_id=session_id, unused_amount=unused_amount)
         
         return True
     
-    def get_pool_stats(self, pool_id: str) -> Dict[str, Any]:
+    async def get_pool_stats(self, pool_id: str) -> Dict[str, Any]:
         """Get pool statistics"""
         
-        pool = self.db.query(CreditPool).filter(CreditPool.id == pool_id).first()
+        pool = await self._get_pool(pool_id)
         if not pool:
             raise Exception("Pool not found")
         
         # Get contribution stats
-        contributions = self.db.query(CreditPoolContribution).filter(
-            CreditPoolContribution.credit_pool_id == pool_id
-        ).all()
+        result = await self.db.execute(
+            select(CreditPoolContribution).where(
+                CreditPoolContribution.credit_pool_id == pool_id
+            )
+        )
+        contributions = result.scalars().all()
         
         # Get active sessions
-        active_sessions = self.db.query(PoolSession).filter(
-            and_(
-                PoolSession.credit_pool_id == pool_id,
-                PoolSession.status == "active"
+        active_sessions = await self.db.scalar(
+            select(func.count()).select_from(PoolSession).where(
+                and_(
+                    PoolSession.credit_pool_id == pool_id,
+                    PoolSession.status == "active"
+                )
             )
-        ).count()
+        )
+        
+        # Include usage still waiting in this worker's write-behind buffer
+        total_used = write_behind.value(pool, "total_used")
         
         return {
             "pool_id": str(pool.id),
@@ -225,20 +240,20 @@ class CreditPoolService:
             "platform": pool.platform,
             "status": pool.status,
             "total_contributed": pool.total_contributed,
-            "total_used": pool.total_used,
+            "total_used": total_used,
             "current_balance": pool.current_balance,
             "available_balance": pool.available_balance,
-            "utilization_percentage": pool.get_utilization_percentage(),
+            "utilization_percentage": (total_used / pool.total_contributed) * 100 if pool.total_contributed else 0,
             "total_sessions": pool.total_sessions,
             "active_sessions": active_sessions,
             "contributions_count": len(contributions),
             "created_at": pool.created_at.isoformat()
         }
     
-    def get_public_pools(self, platform: str = None) -> List[Dict[str, Any]]:
+    async def get_public_pools(self, platform: str = None) -> List[Dict[str, Any]]:
         """Get public pools"""
         
-        query = self.db.query(CreditPool).filter(
+        query = select(CreditPool).where(
             and_(
                 CreditPool.is_public == True,
                 CreditPool.status == PoolStatus.ACTIVE
@@ -246,9 +261,10 @@ class CreditPoolService:
         )
         
         if platform:
-            query = query.filter(CreditPool.platform == platform)
+            query = query.where(CreditPool.platform == platform)
         
-        pools = query.all()
+        result = await self.db.execute(query)
+        pools = result.scalars().all()
         
         return [
             {
@@ -264,10 +280,10 @@ class CreditPoolService:
             for pool in pools
         ]
     
-    def auto_refill_pool(self, pool_id: str) -> bool:
+    async def auto_refill_pool(self, pool_id: str) -> bool:
         """Auto-refill pool when balance is low"""
         
-        pool = self.db.query(CreditPool).filter(CreditPool.id == pool_id).first()
+        pool = await self._get_pool(pool_id)
         if not pool:
             return False
         
@@ -275,16 +291,21 @@ class CreditPoolService:
             return False
         
         # Find contributors who can contribute more
-        contributors = self.db.query(CreditPoolContribution).filter(
-            CreditPoolContribution.credit_pool_id == pool_id
-        ).all()
+        result = await self.db.execute(
+            select(CreditPoolContribution).options(
+                selectinload(CreditPoolContribution.platform_account)
+            ).where(
+                CreditPoolContribution.credit_pool_id == pool_id
+            )
+        )
+        contributors = result.scalars().all()
         
         refill_amount = 0
         for contribution in contributors:
             platform_account = contribution.platform_account
             if platform_account.available_credits >= pool.auto_refill_amount:
                 # Make auto contribution
-                self.contribute_to_pool(
+                await self.contribute_to_pool(
                     pool_id,
                     str(platform_account.id),
                     str(contribution.contributor_id),
@@ -296,6 +317,14 @@ class CreditPoolService:
         
         return refill_amount > 0
     
+    async def _get_pool(self, pool_id: str) -> Optional[CreditPool]:
+        """Load a pool by id"""
+        return await Repository(self.db, CreditPool).get(pool_id)
+    
+    async def _get_pool_session(self, session_id: str) -> Optional[PoolSession]:
+        """Load a pool session by id"""
+        return await Repository(self.db, PoolSession).get(session_id)
+    
     def _generate_session_token(self) -> str:
         """Generate unique session token"""
         import secrets
@@ -5,23 +5,28 @@ Dynamic Pricing Service - Handles dynamic pricing based on demand
 import numpy as np
 from datetime import datetime, timedelta
 from typing import Dict, Any, List, Optional, Tuple
-from sqlalchemy.orm import Session
-from sqlalchemy import and_, func, desc
+from sqlalchemy import and_, func, desc, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import joinedload
 from app.models.virtual_card import VirtualCard
 from app.models.usage_log import UsageLog
 from app.models.transaction import Transaction
 from app.core.config import settings
+from app.core.http_cache import PRICES, bump_versions
+from app.repositories.listing import ListingRepository
+from app.repositories.virtual_card import VirtualCardRepository
+from app.services.listing_counts import listing_counts, listing_field
 import structlog
 
 logger = structlog.get_logger()
 
 class DynamicPricingService:
-    def __init__(self, db: Session):
+    def __init__(self, db: AsyncSession):
         self.db = db
         self.price_history = {}
         self.demand_metrics = {}
     
-    def calculate_demand_multiplier(
+    async def calculate_demand_multiplier(
         self,
         platform: str,
         region: str = "global",
@@ -33,20 +38,24 @@ class DynamicPricingService:
         start_time = datetime.utcnow() - timedelta(hours=time_window_hours)
         
         # Count active sessions
-        active_sessions = self.db.query(VirtualCard).filter(
-            and_(
-                VirtualCard.status == "active",
-                VirtualCard.created_at >= start_time
+        active_sessions = await self.db.scalar(
+            select(func.count()).select_from(VirtualCard).where(
+                and_(
+                    VirtualCard.status == "active",
+                    VirtualCard.created_at >= start_time
+                )
             )
-        ).count()
+        )
         
         # Count total requests
-        total_requests = self.db.query(UsageLog).filter(
-            and_(
-                UsageLog.platform == platform,
-                UsageLog.created_at >= start_time
+        total_requests = await self.db.scalar(
+            select(func.count()).select_from(UsageLog).where(
+                and_(
+                    UsageLog.platform == platform,
+                    UsageLog.created_at >= start_time
+                )
             )
-        ).count()
+        )
         
         # Calculate demand score
         demand_score = self._calculate_demand_score(active_sessions, total_requests)
@@ -61,53 +70,71 @@ class DynamicPricingService:
         
         return multiplier
     
-    def update_card_pricing(self, card_id: str) -> float:
+    async def update_card_pricing(self, card_id: str) -> float:
         """Update pricing for a specific card"""
         
-        card = self.db.query(VirtualCard).filter(VirtualCard.id == card_id).first()
+        card = await VirtualCardRepository(self.db).get(card_id)
         if not card:
             return 0.0
         
         # Get platform and calculate demand
-        platform = card.platform_account.platform
-        demand_multiplier = self.calculate_demand_multiplier(platform)
+        platform_account = await card.awaitable_attrs.platform_account
+        platform = platform_account.platform
+        demand_multiplier = await self.calculate_demand_multiplier(platform)
         
-        # Calculate new price
-        new_price = card.base_price * demand_multiplier
+        listed = await listing_field(card)
+        new_price = self._apply_demand_pricing(card, demand_multiplier)
         
-        # Apply price bounds (min 0.5x, max 3x base price)
-        new_price = max(card.base_price * 0.5, min(new_price, card.base_price * 3.0))
-        
-        # Update card
-        card.current_price = new_price
-        card.demand_multiplier = demand_multiplier
-        
-        self.db.commit()
+        await ListingRepository(self.db).sync(card)
+        await self.db.commit()
+        await bump_versions(PRICES)
+        await listing_counts.apply(listed, await listing_field(card))
         
         logger.info("Card pricing updated", card_id=card_id, new_price=new_price)
         
         return new_price
     
-    def update_all_card_pricing(self) -> Dict[str, int]:
+    async def update_all_card_pricing(self) -> Dict[str, int]:
         """Update pricing for all active cards"""
         
-        active_cards = self.db.query(VirtualCard).filter(
-            VirtualCard.status == "active"
-        ).all()
+        result = await self.db.execute(
+            select(VirtualCard).options(
+                joinedload(VirtualCard.platform_account),
+                joinedload(VirtualCard.seller)
+            ).where(VirtualCard.status == "active")
+        )
+        active_cards = result.scalars().all()
         
         updated_count = 0
         platform_stats = {}
         
+        # Demand only depends on the platform, so compute it once per platform
+        # and reprice the already-loaded cards in a single commit
+        multipliers: Dict[str, float] = {}
+        bucket_moves = []
+        
         for card in active_cards:
             platform = card.platform_account.platform
             old_price = card.current_price
             
-            new_price = self.update_card_pricing(str(card.id))
+            if platform not in multipliers:
+                multipliers[platform] = await self.calculate_demand_multiplier(platform)
+            
+            listed = await listing_field(card)
+            new_price = self._apply_demand_pricing(card, multipliers[platform])
+            bucket_moves.append((listed, await listing_field(card)))
             
             if new_price != old_price:
                 updated_count += 1
                 platform_stats[platform] = platform_stats.get(platform, 0) + 1
         
+        # Sold cards are not in the read model and repricing does not list them
+        await ListingRepository(self.db).sync(*[card for card in active_cards if card.is_listed()])
+        await self.db.commit()
+        if updated_count:
+            await bump_versions(PRICES)
+            await listing_counts.apply_many(bucket_moves)
+        
         logger.info("All card pricing updated", 
                    total_cards=len(active_cards), 
                    updated_count=updated_count,
@@ -115,19 +142,22 @@ class DynamicPricingService:
         
         return platform_stats
     
-    def get_pricing_trends(self, platform: str, days: int = 7) -> Dict[str, Any]:
+    async def get_pricing_trends(self, platform: str, days: int = 7) -> Dict[str, Any]:
         """Get pricing trends for a platform"""
         
         end_time = datetime.utcnow()
         start_time = end_time - timedelta(days=days)
         
         # Get price history
-        price_data = self.db.query(VirtualCard).filter(
-            and_(
-                VirtualCard.platform_account.has(platform=platform),
-                VirtualCard.created_at >= start_time
+        result = await self.db.execute(
+            select(VirtualCard).where(
+                and_(
+                    VirtualCard.platform_account.has(platform=platform),
+                    VirtualCard.created_at >= start_time
+                )
             )
-        ).all()
+        )
+        price_data = result.scalars().all()
         
         # Calculate trends
         prices = [card.current_price for card in price_data]
@@ -147,7 +177,7 @@ class DynamicPricingService:
         price_trend = self._calculate_trend(prices)
         
         # Calculate demand level
-        recent_usage = self._get_recent_usage(platform, hours=24)
+        recent_usage = await self._get_recent_usage(platform, hours=24)
         demand_level = self._classify_demand_level(recent_usage)
         
         # Recommend multiplier
@@ -207,6 +237,21 @@ class DynamicPricingService:
             "correlation": round(correlation, 3)
         }
     
+    def _apply_demand_pricing(self, card: VirtualCard, demand_multiplier: float) -> float:
+        """Reprice a card from its base price and the demand multiplier"""
+        
+        # Calculate new price
+        new_price = card.base_price * demand_multiplier
+        
+        # Apply price bounds (min 0.5x, max 3x base price)
+        new_price = max(card.base_price * 0.5, min(new_price, card.base_price * 3.0))
+        
+        # Update card
+        card.current_price = new_price
+        card.demand_multiplier = demand_multiplier
+        
+        return new_price
+    
     def _calculate_demand_score(self, active_sessions: int, total_requests: int) -> float:
         """Calculate demand score from metrics"""
         
@@ -246,17 +291,19 @@ class DynamicPricingService:
         else:
             return "stable"
     
-    def _get_recent_usage(self, platform: str, hours: int) -> int:
+    async def _get_recent_usage(self, platform: str, hours: int) -> int:
         """Get recent usage count"""
         
         start_time = datetime.utcnow() - timedelta(hours=hours)
         
-        return self.db.query(UsageLog).filter(
-            and_(
-                UsageLog.platform == platform,
-                UsageLog.created_at >= start_time
+        return await self.db.scalar(
+            select(func.count()).select_from(UsageLog).where(
+                and_(
+                    UsageLog.platform == platform,
+                    UsageLog.created_at >= start_time
+                )
             )
-        ).count()
+        )
     
     def _classify_demand_level(self, usage_count: int) -> str:
         """Classify demand level"""
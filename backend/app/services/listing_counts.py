@@ -0,0 +1,168 @@
+"""
+Maintained counts of marketplace listings by platform and price bucket
+"""
+
+import asyncio
+import math
+from typing import Any, Dict, Iterable, Optional, Tuple
+from sqlalchemy import func, select
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal, get_redis
+from app.models.listing import Listing
+from app.models.virtual_card import VirtualCard
+from app.services.monitoring import LISTING_COUNT_DRIFT
+import structlog
+
+logger = structlog.get_logger()
+
+COUNTS_KEY = "listing_counts"
+REBUILD_LOCK_KEY = "listing_counts:rebuild_lock"
+
+def price_bucket(price: float) -> int:
+    return math.floor(price / settings.LISTING_COUNT_PRICE_BUCKET)
+
+def counter_field(platform: Any, price: float) -> str:
+    return f"{getattr(platform, 'value', platform)}:{price_bucket(price)}"
+
+async def listing_field(card: VirtualCard) -> Optional[str]:
+    """Counter a card is counted under, or None when it is not listed
+
+    Call before and after a mutation and pass both to ListingCounts.apply.
+    """
+    if not card.is_listed():
+        return None
+    platform_account = await card.awaitable_attrs.platform_account
+    return counter_field(platform_account.platform, card.current_price)
+
+class ListingCounts:
+    """Listed-card counters in one Redis hash, field "<platform>:<price bucket>"
+
+    Writers move a card between counters after committing; the totals for
+    any platform/price filter are then a sum over a few hundred fields at
+    most, independent of card volume. Counters can drift if a process dies
+    between commit and update or two writers race on one card, so one
+    worker at a time rebuilds them from the database periodically.
+    """
+
+    def __init__(self, rebuild_interval: float):
+        self.rebuild_interval = rebuild_interval
+        self._task: Optional[asyncio.Task] = None
+
+    async def apply(self, before: Optional[str], after: Optional[str]):
+        """Record that a card moved from counter `before` to `after`"""
+        await self.apply_many([(before, after)])
+
+    async def apply_many(self, changes: Iterable[Tuple[Optional[str], Optional[str]]]):
+        deltas: Dict[str, int] = {}
+        for before, after in changes:
+            if before == after:
+                continue
+            if before is not None:
+                deltas[before] = deltas.get(before, 0) - 1
+            if after is not None:
+                deltas[after] = deltas.get(after, 0) + 1
+        deltas = {field: delta for field, delta in deltas.items() if delta}
+        if not deltas:
+            return
+
+        try:
+            pipe = get_redis().pipeline(transaction=False)
+            for field, delta in deltas.items():
+                pipe.hincrby(COUNTS_KEY, field, delta)
+            await pipe.execute()
+        except Exception as e:
+            # The next rebuild corrects the counters
+            logger.warning("Failed to update listing counts", error=str(e))
+
+    async def count(
+        self,
+        platform: Optional[Any] = None,
+        min_price: Optional[float] = None,
+        max_price: Optional[float] = None
+    ) -> Tuple[int, bool]:
+        """(count, exact) of listings matching the filters
+
+        Price bounds that fall inside a bucket include the whole bucket,
+        so the count is then an upper bound, off by at most the listings
+        in the two edge buckets.
+        """
+        counts = await get_redis().hgetall(COUNTS_KEY)
+        platform = getattr(platform, "value", platform)
+        low = price_bucket(min_price) if min_price is not None else None
+        high = price_bucket(max_price) if max_price is not None else None
+
+        total = 0
+        exact = True
+        for field, value in counts.items():
+            field = field.decode() if isinstance(field, bytes) else field
+            field_platform, bucket = field.rsplit(":", 1)
+            bucket = int(bucket)
+            value = int(value)
+            if value <= 0:
+                continue
+            if platform is not None and field_platform != platform:
+                continue
+            if (low is not None and bucket < low) or (high is not None and bucket > high):
+                continue
+
+            # max_price is inclusive, so its bucket always extends past it
+            if high is not None and bucket == high:
+                exact = False
+            if low is not None and bucket == low and min_price > bucket * settings.LISTING_COUNT_PRICE_BUCKET:
+                exact = False
+            total += value
+
+        return total, exact
+
+    async def rebuild(self) -> int:
+        """Recount from the listings read model; returns how far the counters had drifted"""
+        bucket = func.floor(Listing.current_price / settings.LISTING_COUNT_PRICE_BUCKET).label("bucket")
+        async with AsyncSessionLocal() as db:
+            result = await db.execute(
+                select(Listing.platform, bucket, func.count()).group_by(Listing.platform, bucket)
+            )
+            counts = {f"{platform.value}:{int(b)}": n for platform, b, n in result.all()}
+
+        redis = get_redis()
+        previous = {
+            (k.decode() if isinstance(k, bytes) else k): int(v)
+            for k, v in (await redis.hgetall(COUNTS_KEY)).items()
+        }
+        drift = sum(abs(counts.get(f, 0) - previous.get(f, 0)) for f in set(counts) | set(previous))
+
+        # Replace the hash in one MULTI so readers never see it half built
+        pipe = redis.pipeline(transaction=True)
+        pipe.delete(COUNTS_KEY)
+        if counts:
+            pipe.hset(COUNTS_KEY, mapping=counts)
+        await pipe.execute()
+
+        LISTING_COUNT_DRIFT.set(drift)
+        logger.info("Listing counts rebuilt", fields=len(counts), drift=drift)
+        return drift
+
+    async def _run(self):
+        while True:
+            try:
+                # Only one worker rebuilds per interval
+                if await get_redis().set(REBUILD_LOCK_KEY, 1, nx=True, ex=max(1, int(self.rebuild_interval))):
+                    await self.rebuild()
+            except Exception as e:
+                logger.warning("Listing count rebuild failed", error=str(e))
+            await asyncio.sleep(self.rebuild_interval)
+
+    async def start(self):
+        """Rebuild now and then periodically"""
+        if self.rebuild_interval > 0:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+listing_counts = ListingCounts(rebuild_interval=settings.LISTING_COUNTS_REBUILD_SECONDS)
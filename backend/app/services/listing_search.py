@@ -0,0 +1,341 @@
+"""
+In-memory listing snapshot for faceted marketplace search
+"""
+
+import asyncio
+import bisect
+import calendar
+import heapq
+import time
+import uuid
+from collections import Counter
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Set, Tuple
+from sqlalchemy import delete, func, select
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal, get_redis
+from app.core.http_cache import CARDS, PRICES, get_versions
+from app.models.listing import Listing, ListingChange
+from app.models.platform_account import PlatformType
+import structlog
+
+logger = structlog.get_logger()
+
+PRUNE_LOCK_KEY = "listing_snapshot:prune_lock"
+
+# Lower bucket edges; the last bucket is open-ended
+PRICE_EDGES = (0.0, 1.0, 2.0, 5.0, 10.0, 20.0, 50.0)
+BALANCE_EDGES = (0.0, 10.0, 25.0, 50.0, 100.0, 250.0)
+EXPIRY_EDGES_HOURS = (0.0, 1.0, 6.0, 24.0, 168.0)
+SELLER_FACET_SIZE = 20
+
+FACETS = ("platform", "price", "balance", "seller", "expiry")
+
+# Changes newer than this may still have an earlier sequence number
+# pending commit, so they are re-read on the next refresh
+CHANGE_SETTLE_SECONDS = 5.0
+
+# Card ids fetched per query when applying changes
+FETCH_BATCH_SIZE = 1000
+
+def _timestamp(value: datetime) -> float:
+    # Naive UTC datetimes, as stored
+    return calendar.timegm(value.utctimetuple()) + value.microsecond / 1e6
+
+def _bucket(edges: Tuple[float, ...], value: float) -> int:
+    return max(0, bisect.bisect_right(edges, value) - 1)
+
+@dataclass(slots=True)
+class ListingEntry:
+    """A listing row plus the precomputed facet positions"""
+    card_id: uuid.UUID
+    platform: PlatformType
+    seller_username: str
+    available_balance: float
+    price_per_hour: float
+    current_price: float
+    demand_multiplier: Optional[float]
+    created_at: datetime
+    expires_at: datetime
+    utilization_percentage: float
+    price_bucket: int = 0
+    balance_bucket: int = 0
+    expires_ts: float = 0.0
+
+    def __post_init__(self):
+        self.price_bucket = _bucket(PRICE_EDGES, self.current_price)
+        self.balance_bucket = _bucket(BALANCE_EDGES, self.available_balance)
+        self.expires_ts = _timestamp(self.expires_at)
+
+@dataclass
+class ListingFilters:
+    platforms: Set[PlatformType] = field(default_factory=set)
+    sellers: Set[str] = field(default_factory=set)
+    min_price: Optional[float] = None
+    max_price: Optional[float] = None
+    min_balance: Optional[float] = None
+    max_balance: Optional[float] = None
+    min_hours_left: Optional[float] = None
+    max_hours_left: Optional[float] = None
+
+@dataclass
+class SearchResult:
+    listings: List[ListingEntry]
+    total_count: int
+    # Facet name -> {bucket: count}; each facet ignores its own filter
+    facets: Dict[str, Counter]
+    has_more: bool
+
+def _bucket_ranges(edges: Tuple[float, ...]) -> List[Tuple[float, Optional[float]]]:
+    return [(low, edges[i + 1] if i + 1 < len(edges) else None) for i, low in enumerate(edges)]
+
+PRICE_RANGES = _bucket_ranges(PRICE_EDGES)
+BALANCE_RANGES = _bucket_ranges(BALANCE_EDGES)
+EXPIRY_RANGES = _bucket_ranges(EXPIRY_EDGES_HOURS)
+
+class ListingSnapshot:
+    """Per-process copy of the marketplace_listings read model
+
+    Refreshed on demand when the CARDS or PRICES version moves: only the
+    cards logged in marketplace_listing_changes since the last refresh
+    are refetched. The whole table is reloaded at start, after a rebuild
+    and every reload interval, which also picks up any change whose log
+    row committed out of sequence order. The change log is pruned by a
+    background task, whether or not anything searches.
+    """
+
+    def __init__(self, reload_interval: float, retention: float):
+        self.reload_interval = reload_interval
+        self.retention = retention
+        self._entries: Dict[uuid.UUID, ListingEntry] = {}
+        # Every change up to here is applied; later ones may be re-read
+        self._settled_seq: Optional[int] = None
+        self._applied: Set[int] = set()
+        self._loaded_at: Optional[float] = None
+        self._refreshed_at = 0.0
+        self._versions = None
+        self._lock = asyncio.Lock()
+        self._task: Optional[asyncio.Task] = None
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @property
+    def loaded(self) -> bool:
+        return self._settled_seq is not None
+
+    async def refresh(self):
+        """Bring the snapshot up to date if listings may have changed"""
+        try:
+            versions = tuple(await get_versions((CARDS, PRICES)))
+        except Exception as e:
+            logger.warning("Failed to read cache versions", error=str(e))
+            versions = None
+
+        now = time.monotonic()
+        due_reload = self._loaded_at is None or now - self._loaded_at >= self.reload_interval
+        if not due_reload and versions is not None and versions == self._versions:
+            return
+        # Without versions, refresh at most once a second
+        if not due_reload and versions is None and now - self._refreshed_at < 1.0:
+            return
+
+        async with self._lock:
+            if self._loaded_at is None or time.monotonic() - self._loaded_at >= self.reload_interval:
+                await self._reload()
+            elif versions is None or versions != self._versions:
+                await self._apply_changes()
+            self._versions = versions
+            self._refreshed_at = time.monotonic()
+
+    async def _reload(self):
+        async with AsyncSessionLocal() as db:
+            # High-water mark first; re-applying later changes is harmless
+            last_seq = await db.scalar(select(func.coalesce(func.max(ListingChange.seq), 0)))
+            result = await db.execute(select(*self._columns()))
+            entries = {row.card_id: ListingEntry(*row) for row in result.all()}
+
+        self._entries = entries
+        self._settled_seq = last_seq
+        self._applied = set()
+        self._loaded_at = time.monotonic()
+        logger.info("Listing snapshot loaded", listings=len(entries))
+
+    async def _apply_changes(self):
+        async with AsyncSessionLocal() as db:
+            changes = (await db.execute(
+                select(ListingChange.seq, ListingChange.card_id, ListingChange.created_at)
+                .where(ListingChange.seq > self._settled_seq)
+                .order_by(ListingChange.seq)
+            )).all()
+            new = [change for change in changes if change.seq not in self._applied]
+            if any(change.card_id is None for change in new):
+                rebuilt = True
+            else:
+                rebuilt = False
+                card_ids = list({change.card_id for change in new})
+                rows = []
+                for start in range(0, len(card_ids), FETCH_BATCH_SIZE):
+                    batch = card_ids[start:start + FETCH_BATCH_SIZE]
+                    rows.extend((await db.execute(
+                        select(*self._columns()).where(Listing.card_id.in_(batch))
+                    )).all())
+
+        if rebuilt:
+            await self._reload()
+            return
+
+        for card_id in card_ids:
+            self._entries.pop(card_id, None)
+        for row in rows:
+            self._entries[row.card_id] = ListingEntry(*row)
+
+        self._applied.update(change.seq for change in new)
+        cutoff = datetime.utcnow() - timedelta(seconds=CHANGE_SETTLE_SECONDS)
+        settled = [change.seq for change in changes if change.created_at < cutoff]
+        if settled:
+            self._settled_seq = max(settled)
+            self._applied = {seq for seq in self._applied if seq > self._settled_seq}
+
+    async def prune(self) -> int:
+        """Drop change log rows every reader has long since applied, returning how many"""
+        async with AsyncSessionLocal() as db:
+            result = await db.execute(delete(ListingChange).where(
+                ListingChange.created_at < datetime.utcnow() - timedelta(seconds=self.retention)
+            ))
+            await db.commit()
+        return result.rowcount
+
+    async def _run(self):
+        while True:
+            try:
+                # Only one worker prunes per interval
+                if await get_redis().set(PRUNE_LOCK_KEY, 1, nx=True, ex=max(1, int(self.reload_interval))):
+                    await self.prune()
+            except Exception as e:
+                logger.warning("Failed to prune listing changes", error=str(e))
+            await asyncio.sleep(self.reload_interval)
+
+    async def start(self):
+        """Prune the change log now and then periodically"""
+        if self.reload_interval > 0:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    @staticmethod
+    def _columns():
+        return (
+            Listing.card_id,
+            Listing.platform,
+            Listing.seller_username,
+            Listing.available_balance,
+            Listing.price_per_hour,
+            Listing.current_price,
+            Listing.demand_multiplier,
+            Listing.created_at,
+            Listing.expires_at,
+            Listing.utilization_percentage,
+        )
+
+    def search(
+        self,
+        filters: ListingFilters,
+        sort_key: str,
+        descending: bool,
+        after: Optional[Tuple[Any, uuid.UUID]],
+        limit: int
+    ) -> SearchResult:
+        """One page of matching listings and every facet, in one pass
+
+        A listing that fails exactly one facet's filter still counts
+        towards that facet, so each histogram shows what choosing another
+        bucket of it would return with the other filters unchanged.
+        """
+        now = _timestamp(datetime.utcnow())
+        expiry_low = now + filters.min_hours_left * 3600 if filters.min_hours_left is not None else None
+        expiry_high = now + filters.max_hours_left * 3600 if filters.max_hours_left is not None else None
+
+        facets = {name: Counter() for name in FACETS}
+        platform_counts, price_counts, balance_counts = facets["platform"], facets["price"], facets["balance"]
+        seller_counts, expiry_counts = facets["seller"], facets["expiry"]
+        matches = []
+
+        for entry in self._entries.values():
+            if entry.expires_ts < now:
+                continue
+
+            failed = None
+            misses = 0
+            if filters.platforms and entry.platform not in filters.platforms:
+                failed, misses = "platform", misses + 1
+            price = entry.current_price
+            if (filters.min_price is not None and price < filters.min_price) or \
+               (filters.max_price is not None and price > filters.max_price):
+                failed, misses = "price", misses + 1
+            balance = entry.available_balance
+            if (filters.min_balance is not None and balance < filters.min_balance) or \
+               (filters.max_balance is not None and balance > filters.max_balance):
+                failed, misses = "balance", misses + 1
+            if misses > 1:
+                continue
+            if filters.sellers and entry.seller_username not in filters.sellers:
+                failed, misses = "seller", misses + 1
+            expires = entry.expires_ts
+            if (expiry_low is not None and expires < expiry_low) or \
+               (expiry_high is not None and expires > expiry_high):
+                failed, misses = "expiry", misses + 1
+            if misses > 1:
+                continue
+
+            expiry_bucket = _bucket(EXPIRY_EDGES_HOURS, (expires - now) / 3600)
+            if misses == 0:
+                matches.append(entry)
+                platform_counts[entry.platform] += 1
+                price_counts[entry.price_bucket] += 1
+                balance_counts[entry.balance_bucket] += 1
+                seller_counts[entry.seller_username] += 1
+                expiry_counts[expiry_bucket] += 1
+            elif failed == "platform":
+                platform_counts[entry.platform] += 1
+            elif failed == "price":
+                price_counts[entry.price_bucket] += 1
+            elif failed == "balance":
+                balance_counts[entry.balance_bucket] += 1
+            elif failed == "seller":
+                seller_counts[entry.seller_username] += 1
+            else:
+                expiry_counts[expiry_bucket] += 1
+
+        # Page by (sort value, card id) like the keyset listings endpoint
+        def key(entry: ListingEntry):
+            return (getattr(entry, sort_key), entry.card_id)
+
+        candidates = matches
+        if after is not None:
+            candidates = [
+                entry for entry in matches
+                if (key(entry) < after if descending else key(entry) > after)
+            ]
+        select_page = heapq.nlargest if descending else heapq.nsmallest
+        page = select_page(limit + 1, candidates, key=key)
+
+        return SearchResult(
+            listings=page[:limit],
+            total_count=len(matches),
+            facets=facets,
+            has_more=len(page) > limit
+        )
+
+listing_snapshot = ListingSnapshot(
+    reload_interval=settings.LISTING_SNAPSHOT_RELOAD_SECONDS,
+    retention=settings.LISTING_CHANGES_RETENTION_SECONDS
+)
@@ -0,0 +1,490 @@
+"""
+Marketplace Service - Card purchases as conditional atomic updates
+"""
+
+import uuid
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+from sqlalchemy import select, tuple_, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.http_cache import CARDS, bump_versions
+from app.models.platform_account import PlatformAccount, PlatformType
+from app.models.listing import Listing
+from app.models.user import User
+from app.models.virtual_card import VirtualCard, CardStatus
+from app.repositories.base import coerce_id
+from app.repositories.listing import ListingRepository
+from app.services.checkout_holds import checkout_holds
+from app.services.listing_counts import counter_field, listing_counts
+import structlog
+
+logger = structlog.get_logger()
+
+class PurchaseFailed(Exception):
+    """A purchase that was refused; reason is one of the constants below"""
+
+    NOT_FOUND = "not_found"
+    SOLD = "sold"
+    UNAVAILABLE = "unavailable"
+    INSUFFICIENT_BALANCE = "insufficient_balance"
+    # Batch lines only
+    RESERVED = "reserved"
+    DUPLICATE = "duplicate"
+    ABORTED = "aborted"
+
+    def __init__(self, reason: str, card_id: Any = None):
+        super().__init__(reason)
+        self.reason = reason
+        self.card_id = card_id
+
+@dataclass
+class PurchaseResult:
+    card_id: uuid.UUID
+    seller_id: uuid.UUID
+    total_cost: float
+    remaining_balance: float
+    card_number: str
+    cvv: str
+    expiry_date: datetime
+    platform: PlatformType
+
+PURCHASED = "purchased"
+
+@dataclass
+class BatchLine:
+    """One card of a batch purchase and what happened to it"""
+    card_id: Any
+    duration_hours: int
+    status: Optional[str] = None
+    purchase: Optional[PurchaseResult] = None
+
+@dataclass
+class BatchResult:
+    lines: List[BatchLine]
+    total_cost: float = 0.0
+    remaining_balance: Optional[float] = None
+    # Cards an order asked for but could not get
+    unfilled: int = 0
+
+    @property
+    def success(self) -> bool:
+        return self.unfilled == 0 and all(line.status == PURCHASED for line in self.lines)
+
+# Candidate listings read per card still wanted by an order, per round
+ORDER_OVERSAMPLE = 2
+ORDER_ROUNDS = 3
+
+def _purchasable(now: datetime) -> Tuple:
+    """Conditions a card must meet to be claimed"""
+    return (
+        VirtualCard.buyer_id.is_(None),
+        VirtualCard.status == CardStatus.ACTIVE,
+        VirtualCard.expires_at >= now,
+        VirtualCard.current_balance > 0,
+    )
+
+CLAIM_RETURNING = (
+    VirtualCard.id,
+    VirtualCard.seller_id,
+    VirtualCard.platform_account_id,
+    VirtualCard.current_price,
+    VirtualCard.card_number,
+    VirtualCard.cvv,
+    VirtualCard.expiry_date,
+)
+
+class MarketplaceService:
+    def __init__(self, db: AsyncSession):
+        self.db = db
+        self.listings = ListingRepository(db)
+
+    async def purchase(
+        self,
+        buyer_id: Any,
+        card_id: Any,
+        duration_hours: int,
+        records: Iterable[Any] = (),
+        conditions: Iterable[Any] = ()
+    ) -> PurchaseResult:
+        """Buy a card for `duration_hours` at its current price
+
+        Every check is a predicate on the UPDATE that applies it, so the
+        card is claimed and the buyer debited without reading first and
+        without SELECT ... FOR UPDATE. Concurrent buyers of one card queue
+        only on that card's row and every loser gets zero rows back once
+        the winner commits. Raises PurchaseFailed, having rolled back.
+
+        `records` are added to the same transaction, so they commit if and
+        only if the purchase does. `conditions` are extra predicates on the
+        claim; a card that fails them is refused as UNAVAILABLE.
+        """
+        try:
+            result = await self._purchase(buyer_id, card_id, duration_hours, conditions)
+            self.db.add_all(records)
+            await self.db.commit()
+        except BaseException:
+            await self.db.rollback()
+            raise
+
+        await bump_versions(CARDS)
+        await listing_counts.apply(result[1], None)
+
+        purchase = result[0]
+        logger.info("Credits purchased",
+                   card_id=str(purchase.card_id),
+                   buyer_id=str(buyer_id),
+                   amount=purchase.total_cost)
+        return purchase
+
+    async def _purchase(self, buyer_id: Any, card_id: Any, duration_hours: int, conditions: Iterable[Any] = ()):
+        """Statements of one purchase in the open transaction; returns (result, counter field)"""
+        card_pk = coerce_id(card_id)
+        buyer_pk = coerce_id(buyer_id)
+        if card_pk is None:
+            raise PurchaseFailed(PurchaseFailed.NOT_FOUND, card_id)
+
+        # Claim: only one transaction can move buyer_id off NULL
+        claimed = (await self.db.execute(
+            update(VirtualCard).where(
+                VirtualCard.id == card_pk,
+                *_purchasable(datetime.utcnow()),
+                *conditions
+            ).values(buyer_id=buyer_pk).returning(
+                *CLAIM_RETURNING
+            ).execution_options(synchronize_session=False)
+        )).first()
+        if claimed is None:
+            raise PurchaseFailed(await self._claim_failure_reason(card_pk), card_id)
+
+        total_cost = claimed.current_price * duration_hours
+
+        # Lock the two user rows in id order so opposite purchases between
+        # the same pair of users cannot deadlock
+        remaining_balance = None
+        for user_id in sorted({buyer_pk, claimed.seller_id}):
+            if user_id == buyer_pk:
+                remaining_balance = await self._debit(buyer_pk, total_cost)
+                if remaining_balance is None:
+                    raise PurchaseFailed(PurchaseFailed.INSUFFICIENT_BALANCE, card_id)
+            if user_id == claimed.seller_id:
+                await self._credit(claimed.seller_id, total_cost)
+
+        removed = await self.listings.remove(card_pk)
+        if removed:
+            platform = removed[0].platform
+            field = counter_field(platform, removed[0].current_price)
+        else:
+            # Read model out of step; the counters' rebuild catches up
+            platform = await self.db.scalar(
+                select(PlatformAccount.platform).where(PlatformAccount.id == claimed.platform_account_id)
+            )
+            field = None
+
+        return PurchaseResult(
+            card_id=card_pk,
+            seller_id=claimed.seller_id,
+            total_cost=total_cost,
+            remaining_balance=remaining_balance,
+            card_number=claimed.card_number,
+            cvv=claimed.cvv,
+            expiry_date=claimed.expiry_date,
+            platform=platform
+        ), field
+
+    async def purchase_batch(
+        self,
+        buyer_id: Any,
+        lines: Sequence[Tuple[Any, int]],
+        all_or_nothing: bool = True
+    ) -> BatchResult:
+        """Buy many (card_id, duration_hours) lines in one transaction
+
+        With all_or_nothing, any refused line rolls the whole batch back and
+        the others come back ABORTED. Otherwise lines are kept in order
+        while the balance covers them and the rest are refused.
+        """
+        buyer_pk = coerce_id(buyer_id)
+        result = BatchResult(lines=[BatchLine(card_id, hours) for card_id, hours in lines])
+
+        wanted: Dict[uuid.UUID, BatchLine] = {}
+        for line in result.lines:
+            card_pk = coerce_id(line.card_id)
+            if card_pk is None:
+                line.status = PurchaseFailed.NOT_FOUND
+            elif card_pk in wanted:
+                line.status = PurchaseFailed.DUPLICATE
+            else:
+                wanted[card_pk] = line
+
+        for card_pk in await self._held_by_others(wanted, buyer_pk):
+            wanted.pop(card_pk).status = PurchaseFailed.RESERVED
+
+        async def claim():
+            if all_or_nothing and len(wanted) < len(result.lines):
+                return []
+            rows = {row.id: row for row in await self._claim(list(wanted), buyer_pk, order_by=(VirtualCard.id,))}
+            missing = [card_pk for card_pk in wanted if card_pk not in rows]
+            for card_pk, reason in (await self._claim_failure_reasons(missing)).items():
+                wanted[card_pk].status = reason
+            # Request order decides which lines the balance covers
+            return [(line, rows[card_pk]) for card_pk, line in wanted.items() if card_pk in rows]
+
+        return await self._settle(buyer_pk, result, claim, all_or_nothing)
+
+    async def purchase_order(
+        self,
+        buyer_id: Any,
+        platform: PlatformType,
+        quantity: int,
+        duration_hours: int,
+        max_price: float,
+        all_or_nothing: bool = True
+    ) -> BatchResult:
+        """Buy the `quantity` cheapest cards of a platform priced at most max_price
+
+        Candidates come from the listings read model in price order and are
+        claimed with SKIP LOCKED, so concurrent orders split the supply
+        instead of queueing on the same rows.
+        """
+        buyer_pk = coerce_id(buyer_id)
+        result = BatchResult(lines=[])
+
+        async def claim():
+            claimed = []
+            after = None
+            for _ in range(ORDER_ROUNDS):
+                needed = quantity - len(claimed)
+                if needed <= 0:
+                    break
+                query = select(Listing.card_id, Listing.current_price).where(
+                    Listing.platform == platform,
+                    Listing.current_price <= max_price
+                )
+                if after is not None:
+                    query = query.where(tuple_(Listing.current_price, Listing.card_id) > after)
+                candidates = (await self.db.execute(
+                    query.order_by(Listing.current_price, Listing.card_id).limit(needed * ORDER_OVERSAMPLE)
+                )).all()
+                if not candidates:
+                    break
+                after = (candidates[-1].current_price, candidates[-1].card_id)
+
+                held = await self._held_by_others((row.card_id for row in candidates), buyer_pk)
+                rows = await self._claim(
+                    [row.card_id for row in candidates if row.card_id not in held],
+                    buyer_pk,
+                    VirtualCard.current_price <= max_price,
+                    order_by=(VirtualCard.current_price, VirtualCard.id),
+                    limit=needed
+                )
+                for row in rows:
+                    line = BatchLine(row.id, duration_hours)
+                    result.lines.append(line)
+                    claimed.append((line, row))
+
+            result.unfilled = quantity - len(claimed)
+            return [] if all_or_nothing and result.unfilled else claimed
+
+        return await self._settle(buyer_pk, result, claim, all_or_nothing)
+
+    async def _settle(self, buyer_pk: uuid.UUID, result: BatchResult, claim, all_or_nothing: bool) -> BatchResult:
+        """Run `claim`, then charge for what it claimed, in one transaction"""
+        try:
+            claimed = await claim()
+            fields = await self._charge(buyer_pk, result, claimed, all_or_nothing) if claimed else []
+            if all_or_nothing and not result.success:
+                await self.db.rollback()
+                for line in result.lines:
+                    if line.status in (None, PURCHASED):
+                        line.status, line.purchase = PurchaseFailed.ABORTED, None
+                result.total_cost = 0.0
+                return result
+            await self.db.commit()
+        except BaseException:
+            await self.db.rollback()
+            raise
+
+        if fields:
+            await bump_versions(CARDS)
+            await listing_counts.apply_many((field, None) for field in fields)
+
+        logger.info("Batch purchase settled",
+                   buyer_id=str(buyer_pk),
+                   purchased=sum(1 for line in result.lines if line.status == PURCHASED),
+                   refused=sum(1 for line in result.lines if line.status != PURCHASED),
+                   unfilled=result.unfilled,
+                   amount=result.total_cost)
+        return result
+
+    async def _charge(
+        self,
+        buyer_pk: uuid.UUID,
+        result: BatchResult,
+        claimed: List[Tuple[BatchLine, Any]],
+        all_or_nothing: bool
+    ) -> List[str]:
+        """Move money for claimed lines and delist them; returns counter fields
+
+        Lines the buyer cannot afford are released back to the market.
+        """
+        # Lock buyer and sellers in id order, like single purchases do
+        user_ids = sorted({buyer_pk} | {row.seller_id for _, row in claimed})
+        users = {
+            row.id: {"id": row.id, "balance": row.balance,
+                     "total_spent": row.total_spent, "total_earned": row.total_earned}
+            for row in (await self.db.execute(
+                select(User.id, User.balance, User.total_spent, User.total_earned)
+                .where(User.id.in_(user_ids)).order_by(User.id).with_for_update()
+            )).all()
+        }
+
+        buyer = users[buyer_pk]
+        available = buyer["balance"]
+        bought, released = [], []
+        for line, row in claimed:
+            cost = row.current_price * line.duration_hours
+            if cost > available:
+                line.status = PurchaseFailed.INSUFFICIENT_BALANCE
+                released.append(row.id)
+                continue
+            available -= cost
+            result.total_cost += cost
+            bought.append((line, row, cost))
+
+        if all_or_nothing and released:
+            return []
+        if released:
+            await self.db.execute(
+                update(VirtualCard).where(VirtualCard.id.in_(released)).values(
+                    buyer_id=None
+                ).execution_options(synchronize_session=False)
+            )
+        if not bought:
+            result.remaining_balance = buyer["balance"]
+            return []
+
+        for _, row, cost in bought:
+            buyer["balance"] -= cost
+            buyer["total_spent"] += cost
+            seller = users[row.seller_id]
+            seller["balance"] += cost
+            seller["total_earned"] += cost
+        # Absolute values are safe here: every row is locked
+        await self.db.execute(update(User), [users[user_id] for user_id in user_ids])
+        result.remaining_balance = buyer["balance"]
+
+        removed = {row.card_id: row for row in await self.listings.remove(*(row.id for _, row, _ in bought))}
+        platforms = {row.card_id: row.platform for row in removed.values()}
+        unlisted = [row for _, row, _ in bought if row.id not in removed]
+        if unlisted:
+            # Read model out of step; the counters' rebuild catches up
+            accounts = dict((await self.db.execute(
+                select(PlatformAccount.id, PlatformAccount.platform).where(
+                    PlatformAccount.id.in_({row.platform_account_id for row in unlisted})
+                )
+            )).all())
+            for row in unlisted:
+                platforms[row.id] = accounts.get(row.platform_account_id)
+
+        for line, row, cost in bought:
+            line.status = PURCHASED
+            line.purchase = PurchaseResult(
+                card_id=row.id,
+                seller_id=row.seller_id,
+                total_cost=cost,
+                remaining_balance=buyer["balance"],
+                card_number=row.card_number,
+                cvv=row.cvv,
+                expiry_date=row.expiry_date,
+                platform=platforms[row.id]
+            )
+        return [counter_field(row.platform, row.current_price) for row in removed.values()]
+
+    async def _claim(
+        self,
+        card_pks: List[uuid.UUID],
+        buyer_pk: uuid.UUID,
+        *conditions: Any,
+        order_by: Tuple,
+        limit: Optional[int] = None
+    ) -> List[Any]:
+        """Claim purchasable cards among card_pks in one UPDATE
+
+        Rows are locked in `order_by` order and ones another transaction
+        holds are skipped rather than waited on, so overlapping batches
+        neither deadlock nor serialise; a skipped card reports unavailable.
+        """
+        if not card_pks:
+            return []
+        picked = select(VirtualCard.id).where(
+            VirtualCard.id.in_(card_pks),
+            *_purchasable(datetime.utcnow()),
+            *conditions
+        ).order_by(*order_by).limit(limit).with_for_update(skip_locked=True)
+        result = await self.db.execute(
+            update(VirtualCard).where(VirtualCard.id.in_(picked.scalar_subquery())).values(
+                buyer_id=buyer_pk
+            ).returning(*CLAIM_RETURNING).execution_options(synchronize_session=False)
+        )
+        # RETURNING order is unspecified; restore the claim order
+        return sorted(result.all(), key=lambda row: [getattr(row, column.key) for column in order_by])
+
+    async def _held_by_others(self, card_pks: Iterable[uuid.UUID], buyer_pk: uuid.UUID) -> set:
+        """Cards in someone else's checkout hold; none when Redis is down"""
+        try:
+            holds = await checkout_holds.holds(card_pks)
+        except Exception as e:
+            logger.warning("Failed to read checkout holds", error=str(e))
+            return set()
+        return {
+            uuid.UUID(card_id) for card_id, hold in holds.items()
+            if hold.buyer_id != str(buyer_pk)
+        }
+
+    async def _claim_failure_reasons(self, card_pks: List[uuid.UUID]) -> Dict[uuid.UUID, str]:
+        """_claim_failure_reason for many cards in one query"""
+        if not card_pks:
+            return {}
+        buyers = dict((await self.db.execute(
+            select(VirtualCard.id, VirtualCard.buyer_id).where(VirtualCard.id.in_(card_pks))
+        )).all())
+        return {
+            card_pk: (
+                PurchaseFailed.NOT_FOUND if card_pk not in buyers
+                else PurchaseFailed.SOLD if buyers[card_pk] is not None
+                else PurchaseFailed.UNAVAILABLE
+            )
+            for card_pk in card_pks
+        }
+
+    async def _debit(self, user_id: uuid.UUID, amount: float) -> Optional[float]:
+        """Take amount from a balance that covers it; None when it does not"""
+        return await self.db.scalar(
+            update(User).where(
+                User.id == user_id,
+                User.balance >= amount
+            ).values(
+                balance=User.balance - amount,
+                total_spent=User.total_spent + amount
+            ).returning(User.balance).execution_options(synchronize_session=False)
+        )
+
+    async def _credit(self, user_id: uuid.UUID, amount: float):
+        await self.db.execute(
+            update(User).where(User.id == user_id).values(
+                balance=User.balance + amount,
+                total_earned=User.total_earned + amount
+            ).execution_options(synchronize_session=False)
+        )
+
+    async def _claim_failure_reason(self, card_pk: uuid.UUID) -> str:
+        """Why the claim matched no row; only read on the failure path"""
+        row = (await self.db.execute(
+            select(VirtualCard.buyer_id).where(VirtualCard.id == card_pk)
+        )).first()
+        if row is None:
+            return PurchaseFailed.NOT_FOUND
+        if row.buyer_id is not None:
+            return PurchaseFailed.SOLD
+        return PurchaseFailed.UNAVAILABLE
@@ -15,6 +15,61 @@ ACTIVE_SESSIONS = Gauge('subsplit_active_sessions', 'Active sessions')
 VIRTUAL_CARDS_ACTIVE = Gauge('subsplit_virtual_cards_active', 'Active virtual cards')
 CREDIT_POOLS_ACTIVE = Gauge('subsplit_credit_pools_active', 'Active credit pools')
 
+# Database connection pool metrics
+DB_POOL_CHECKOUT_WAIT = Histogram(
+    'subsplit_db_pool_checkout_wait_seconds',
+    'Time spent waiting to check a connection out of the pool',
+    buckets=(0.0005, 0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+)
+DB_POOL_SIZE = Gauge('subsplit_db_pool_size', 'Configured pool size')
+DB_POOL_CHECKED_OUT = Gauge('subsplit_db_pool_checked_out', 'Connections currently checked out')
+DB_POOL_OVERFLOW = Gauge('subsplit_db_pool_overflow', 'Overflow connections currently open')
+DB_POOL_OVERFLOW_CREATED = Counter('subsplit_db_pool_overflow_created_total', 'Overflow connections opened')
+DB_POOL_TIMEOUTS = Counter('subsplit_db_pool_timeouts_total', 'Checkouts that timed out waiting for a connection')
+DB_REPLICA_LAG = Gauge('subsplit_db_replica_lag_seconds', 'Replication lag per read replica', ['replica'])
+DB_READ_ROUTED = Counter('subsplit_db_reads_routed_total', 'Read-only sessions by target', ['target'])
+
+# Redis connection pool metrics
+REDIS_POOL_MAX = Gauge('subsplit_redis_pool_max_connections', 'Configured Redis pool size')
+REDIS_POOL_CREATED = Gauge('subsplit_redis_pool_created_connections', 'Redis connections opened by the pool')
+REDIS_POOL_IN_USE = Gauge('subsplit_redis_pool_in_use', 'Redis connections currently checked out')
+REDIS_POOL_WAIT = Histogram(
+    'subsplit_redis_pool_wait_seconds',
+    'Time spent waiting for a Redis connection',
+    buckets=(0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0)
+)
+REDIS_POOL_TIMEOUTS = Counter('subsplit_redis_pool_timeouts_total', 'Redis checkouts that timed out')
+
+# Password hashing metrics
+PASSWORD_HASH_QUEUE_DEPTH = Gauge('subsplit_password_hash_queue_depth', 'Password hashes waiting for a worker thread')
+PASSWORD_HASH_DURATION = Histogram(
+    'subsplit_password_hash_seconds',
+    'Password hash/verify time including queueing',
+    buckets=(0.05, 0.1, 0.2, 0.3, 0.5, 1.0, 2.0, 5.0, 10.0)
+)
+PASSWORD_HASH_REJECTED = Counter('subsplit_password_hash_rejected_total', 'Password checks rejected because the queue was full')
+
+# Logging pipeline metrics
+LOG_RECORDS_DROPPED = Counter('subsplit_log_records_dropped_total', 'Log records dropped because the queue was full')
+
+# Rate limiter metrics
+RATE_LIMIT_LOCAL_HITS = Counter('subsplit_rate_limit_local_hits_total', 'Requests admitted from a local token lease')
+RATE_LIMIT_REDIS_CALLS = Counter('subsplit_rate_limit_redis_calls_total', 'Rate limiter Redis round trips', ['op'])
+
+# Write-behind counter buffer metrics
+WRITE_BEHIND_PENDING = Gauge('subsplit_write_behind_pending', 'Buffered counter updates not yet flushed')
+WRITE_BEHIND_FLUSH_DURATION = Histogram(
+    'subsplit_write_behind_flush_seconds',
+    'Time spent flushing buffered counter updates'
+)
+
+# Marketplace listing counter metrics
+LISTING_COUNT_DRIFT = Gauge('subsplit_listing_count_drift', 'Listings the maintained counters were off by at the last rebuild')
+
+# Order book metrics
+ORDER_BOOK_OPEN_ORDERS = Gauge('subsplit_order_book_open_orders', 'Buy orders resting in the matching worker\'s book')
+ORDER_BOOK_FILLS = Counter('subsplit_order_book_fills_total', 'Settlement attempts by outcome', ['outcome'])
+
 async def setup_monitoring():
     """Setup monitoring and metrics collection"""
     try:
@@ -0,0 +1,378 @@
+"""
+Price-time priority order book for the marketplace
+
+Buy orders are journaled to order_events by whichever worker accepts
+them. One worker at a time, holding a Redis lease, keeps the open orders
+and the cheapest listings of each platform in memory, pairs them and
+settles each pair through MarketplaceService.purchase, which appends the
+order's FILLED event in the purchase's own transaction. A new leader
+rebuilds its book from the journal.
+"""
+
+import asyncio
+import bisect
+import time
+import uuid
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+import redis.asyncio as aioredis
+from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal, get_redis
+from app.core.http_cache import CARDS, PRICES, get_versions
+from app.core.replicas import mark_primary_read
+from app.models.listing import Listing
+from app.models.order_event import OrderEvent, OrderEventKind
+from app.models.platform_account import PlatformType
+from app.models.virtual_card import VirtualCard
+from app.repositories.order_journal import OrderJournal
+from app.services.checkout_holds import checkout_holds
+from app.services.marketplace_service import MarketplaceService, PurchaseFailed
+from app.services.monitoring import ORDER_BOOK_FILLS, ORDER_BOOK_OPEN_ORDERS
+import structlog
+
+logger = structlog.get_logger()
+
+LEADER_KEY = "order_book:leader"
+
+# Take the lease, or extend it if this worker already holds it
+LEASE_LUA = """
+if redis.call('SET', KEYS[1], ARGV[1], 'NX', 'PX', ARGV[2]) then
+    return 1
+end
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    redis.call('PEXPIRE', KEYS[1], ARGV[2])
+    return 1
+end
+return 0
+"""
+
+RELEASE_LUA = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+# Listings loaded per resting bid, up to a cap per platform
+ASK_DEPTH_PER_BID = 4
+MAX_ASK_DEPTH = 1000
+
+@dataclass
+class BuyOrder:
+    order_id: uuid.UUID
+    buyer_id: uuid.UUID
+    platform: PlatformType
+    max_price: float
+    duration_hours: int
+    min_balance: float
+    # Journal position; earlier orders win ties on price
+    seq: int
+
+    @classmethod
+    def from_event(cls, event: OrderEvent) -> "BuyOrder":
+        return cls(
+            order_id=event.order_id,
+            buyer_id=event.buyer_id,
+            platform=event.platform,
+            max_price=event.max_price,
+            duration_hours=event.duration_hours,
+            min_balance=event.min_balance or 0.0,
+            seq=event.seq
+        )
+
+    @property
+    def priority(self) -> Tuple:
+        return (-self.max_price, self.seq)
+
+@dataclass(frozen=True)
+class Ask:
+    card_id: uuid.UUID
+    price: float
+    balance: float
+    listed_at: datetime
+
+    @property
+    def priority(self) -> Tuple:
+        return (self.price, self.listed_at, self.card_id)
+
+class OrderBook:
+    """Bids and asks of one platform, each kept sorted best first"""
+
+    def __init__(self):
+        self._bids: List[Tuple[Tuple, uuid.UUID]] = []
+        self._orders: Dict[uuid.UUID, BuyOrder] = {}
+        self._asks: List[Tuple[Tuple, Ask]] = []
+        # Highest price and row limit the loaded asks were read with
+        self.ask_ceiling: Optional[float] = None
+        self.ask_depth = 0
+
+    def __len__(self) -> int:
+        return len(self._orders)
+
+    @property
+    def best_bid(self) -> Optional[BuyOrder]:
+        return self._orders[self._bids[0][1]] if self._bids else None
+
+    def add(self, order: BuyOrder):
+        if order.order_id in self._orders:
+            return
+        self._orders[order.order_id] = order
+        bisect.insort(self._bids, (order.priority, order.order_id))
+
+    def remove(self, order_id: uuid.UUID) -> Optional[BuyOrder]:
+        order = self._orders.pop(order_id, None)
+        if order is not None:
+            entry = (order.priority, order_id)
+            del self._bids[bisect.bisect_left(self._bids, entry)]
+        return order
+
+    def set_asks(self, asks: List[Ask], ceiling: float, depth: int):
+        self._asks = sorted((ask.priority, ask) for ask in asks)
+        self.ask_ceiling = ceiling
+        self.ask_depth = depth
+
+    def remove_ask(self, card_id: uuid.UUID):
+        self._asks = [entry for entry in self._asks if entry[1].card_id != card_id]
+
+    def match(self) -> List[Tuple[BuyOrder, Ask]]:
+        """Pair each bid, best first, with the best ask it accepts
+
+        An ask is used at most once per round; bids left without one wait
+        for the next round.
+        """
+        taken = set()
+        pairs = []
+        for _, order_id in self._bids:
+            order = self._orders[order_id]
+            for _, ask in self._asks:
+                if ask.price > order.max_price:
+                    break
+                if ask.card_id in taken or ask.balance < order.min_balance:
+                    continue
+                taken.add(ask.card_id)
+                pairs.append((order, ask))
+                break
+        return pairs
+
+class OrderBookEngine:
+    """Matching loop run by whichever worker holds the leader lease
+
+    Between full resyncs the leader tails the journal by sequence number.
+    A PLACED event whose sequence was allocated before, but committed
+    after, the last one read is only picked up by the next resync.
+    """
+
+    def __init__(self, poll_interval: float, resync_interval: float, lease_seconds: float):
+        self.poll_interval = poll_interval
+        self.resync_interval = resync_interval
+        self.lease_seconds = lease_seconds
+        self.books: Dict[PlatformType, OrderBook] = {}
+        self._token = uuid.uuid4().hex
+        self._last_seq = 0
+        self._last_resync: Optional[float] = None
+        self._versions = None
+        self._client: Optional[aioredis.Redis] = None
+        self._lease = None
+        self._release = None
+        self._task: Optional[asyncio.Task] = None
+
+    def _bind(self):
+        # The client is recreated by the app lifespan; rebind when it changes
+        client = get_redis()
+        if client is not self._client:
+            self._client = client
+            self._lease = client.register_script(LEASE_LUA)
+            self._release = client.register_script(RELEASE_LUA)
+
+    async def _hold_lease(self) -> bool:
+        self._bind()
+        return bool(await self._lease(keys=[LEADER_KEY], args=[self._token, int(self.lease_seconds * 1000)]))
+
+    def _reset(self):
+        self.books = {}
+        self._last_seq = 0
+        self._last_resync = None
+        self._versions = None
+        ORDER_BOOK_OPEN_ORDERS.set(0)
+
+    def _book(self, platform: PlatformType) -> OrderBook:
+        book = self.books.get(platform)
+        if book is None:
+            book = self.books[platform] = OrderBook()
+        return book
+
+    def _apply(self, event: OrderEvent):
+        """Fold one journal event into the books; replaying one is harmless"""
+        self._last_seq = max(self._last_seq, event.seq)
+        if event.kind == OrderEventKind.PLACED:
+            self._book(event.platform).add(BuyOrder.from_event(event))
+        else:
+            for book in self.books.values():
+                if book.remove(event.order_id):
+                    break
+
+    async def step(self):
+        """One round: catch up on the journal, refresh asks, match and settle"""
+        async with AsyncSessionLocal() as db:
+            journal = OrderJournal(db)
+            now = time.monotonic()
+            if self._last_resync is None or now - self._last_resync >= self.resync_interval:
+                # Read the high-water mark first; replaying past it is idempotent
+                last_seq = await journal.last_seq()
+                open_orders = await journal.open_orders()
+                self.books = {}
+                for event in open_orders:
+                    self._apply(event)
+                self._last_seq = max(self._last_seq, last_seq)
+                self._last_resync = now
+            else:
+                for event in await journal.since(self._last_seq):
+                    self._apply(event)
+
+            await self._refresh_asks(db)
+
+        ORDER_BOOK_OPEN_ORDERS.set(sum(len(book) for book in self.books.values()))
+
+        for platform, book in self.books.items():
+            for order, ask in book.match():
+                await self._settle(book, order, ask)
+
+    async def _refresh_asks(self, db):
+        """Reload listings under each platform's best bid when they may have changed"""
+        try:
+            versions = await get_versions((CARDS, PRICES))
+        except Exception as e:
+            logger.warning("Failed to read cache versions", error=str(e))
+            versions = None
+        changed = versions is None or versions != self._versions
+        self._versions = versions
+
+        for platform, book in self.books.items():
+            best = book.best_bid
+            if best is None:
+                book.set_asks([], 0.0, 0)
+                continue
+            depth = min(MAX_ASK_DEPTH, len(book) * ASK_DEPTH_PER_BID)
+            if (
+                not changed
+                and book.ask_ceiling is not None
+                and best.max_price <= book.ask_ceiling
+                and depth <= book.ask_depth
+            ):
+                continue
+
+            rows = (await db.execute(
+                select(
+                    Listing.card_id,
+                    Listing.current_price,
+                    Listing.available_balance,
+                    Listing.created_at
+                ).where(
+                    Listing.platform == platform,
+                    Listing.current_price <= best.max_price
+                ).order_by(Listing.current_price, Listing.card_id).limit(depth)
+            )).all()
+            book.set_asks([Ask(*row) for row in rows], best.max_price, depth)
+
+    async def _settle(self, book: OrderBook, order: BuyOrder, ask: Ask):
+        """Buy the ask for the order; the book is updated whatever happens"""
+        try:
+            acquired, _ = await checkout_holds.reserve(ask.card_id, order.buyer_id, exclusive=False)
+        except Exception as e:
+            logger.warning("Failed to take checkout hold", error=str(e))
+            acquired = True
+        if not acquired:
+            # Someone is checking it out; the next refresh brings it back if not
+            book.remove_ask(ask.card_id)
+            ORDER_BOOK_FILLS.labels(outcome="held").inc()
+            return
+
+        try:
+            async with AsyncSessionLocal() as db:
+                journal = OrderJournal(db)
+                try:
+                    purchase = await MarketplaceService(db).purchase(
+                        order.buyer_id,
+                        ask.card_id,
+                        order.duration_hours,
+                        records=[journal.close(order.order_id, order.buyer_id, OrderEventKind.FILLED, card_id=ask.card_id)],
+                        # The ask may have been repriced or spent since the book read it
+                        conditions=(
+                            VirtualCard.current_price <= order.max_price,
+                            VirtualCard.current_balance >= order.min_balance,
+                        )
+                    )
+                except PurchaseFailed as e:
+                    if e.reason != PurchaseFailed.INSUFFICIENT_BALANCE:
+                        book.remove_ask(ask.card_id)
+                        ORDER_BOOK_FILLS.labels(outcome=e.reason).inc()
+                        return
+                    # The buyer cannot pay; the order is closed rather than retried
+                    book.remove(order.order_id)
+                    journal.close(order.order_id, order.buyer_id, OrderEventKind.FAILED, reason=e.reason)
+                    try:
+                        await db.commit()
+                    except IntegrityError:
+                        await db.rollback()
+                    ORDER_BOOK_FILLS.labels(outcome=e.reason).inc()
+                    return
+                except IntegrityError:
+                    # Cancelled since it was read; the purchase rolled back
+                    book.remove(order.order_id)
+                    ORDER_BOOK_FILLS.labels(outcome="cancelled").inc()
+                    return
+
+            # Like a /purchase, so neither side reads the fill from a lagging replica
+            await mark_primary_read(str(order.buyer_id))
+            await mark_primary_read(str(purchase.seller_id))
+
+            book.remove(order.order_id)
+            book.remove_ask(ask.card_id)
+            ORDER_BOOK_FILLS.labels(outcome="filled").inc()
+            logger.info("Buy order filled", order_id=str(order.order_id), card_id=str(ask.card_id))
+        finally:
+            try:
+                await checkout_holds.release(ask.card_id, order.buyer_id)
+            except Exception as e:
+                logger.warning("Failed to release checkout hold", error=str(e))
+
+    async def _run(self):
+        while True:
+            try:
+                if await self._hold_lease():
+                    await self.step()
+                elif self._last_resync is not None:
+                    self._reset()
+            except Exception as e:
+                logger.warning("Order book step failed", error=str(e))
+                # Start over from the journal in case the book is out of step
+                self._reset()
+            await asyncio.sleep(self.poll_interval)
+
+    async def start(self):
+        if settings.ORDER_BOOK_ENABLED:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        # Let another worker take over without waiting out the lease
+        try:
+            if self._release is not None:
+                await self._release(keys=[LEADER_KEY], args=[self._token])
+        except Exception as e:
+            logger.warning("Failed to release order book lease", error=str(e))
+
+order_book = OrderBookEngine(
+    poll_interval=settings.ORDER_BOOK_POLL_MS / 1000,
+    resync_interval=settings.ORDER_BOOK_RESYNC_SECONDS,
+    lease_seconds=settings.ORDER_BOOK_LEASE_SECONDS
+)
@@ -7,17 +7,19 @@ import json
 from datetime import datetime, timedelta
 from typing import Dict, Any, Optional, List
 from playwright.async_api import async_playwright, Browser, BrowserContext, Page
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from app.models.platform_account import PlatformAccount, PlatformType
 from app.models.session import Session as SessionModel, SessionStatus
 from app.models.virtual_card import VirtualCard
 from app.core.config import settings
+from app.repositories.base import Repository
+from app.services.write_behind import write_behind
 import structlog
 
 logger = structlog.get_logger()
 
 class PlatformIntegrationService:
-    def __init__(self, db: Session):
+    def __init__(self, db: AsyncSession):
         self.db = db
         self.browser_pool = []
         self.max_browsers = 5
@@ -25,7 +27,7 @@ class PlatformIntegrationService:
     async def create_session(self, virtual_card: VirtualCard, user_id: str) -> Dict[str, Any]:
         """Create isolated session for platform access"""
         
-        platform_account = virtual_card.platform_account
+        platform_account = await virtual_card.awaitable_attrs.platform_account
         platform = platform_account.platform
         
         # Get browser from pool
@@ -69,8 +71,8 @@ class PlatformIntegrationService:
         )
         
         self.db.add(session)
-        self.db.commit()
-        self.db.refresh(session)
+        await self.db.commit()
+        await self.db.refresh(session)
         
         logger.info("Session created", session_id=str(session.id), platform=platform)
         
@@ -89,7 +91,7 @@ class PlatformIntegrationService:
     async def execute_request(self, session_id: str, request_data: Dict[str, Any]) -> Dict[str, Any]:
         """Execute request on platform"""
         
-        session = self.db.query(SessionModel).filter(SessionModel.id == session_id).first()
+        session = await self._get_session(session_id)
         
         if not session or not session.is_active():
             raise Exception("Session not active")
@@ -101,15 +103,17 @@ class PlatformIntegrationService:
         page = self._get_page_by_id(context, browser_data["page_id"])
         
         # Execute request based on platform
-        platform = session.platform_account.platform
+        platform_account = await session.awaitable_attrs.platform_account
+        platform = platform_account.platform
         response = await self._execute_platform_request(page, platform, request_data)
         
-        # Update session
-        session.request_count += 1
-        session.last_request_at = datetime.utcnow()
-        session.total_usage += response.get("cost", 0)
-        
-        self.db.commit()
+        # Usage counters are buffered and written in batches
+        write_behind.increment(
+            SessionModel, session.id,
+            request_count=1,
+            total_usage=response.get("cost", 0)
+        )
+        write_behind.touch(SessionModel, session.id, last_request_at=datetime.utcnow())
         
         logger.info("Request executed", session_id=session_id, platform=platform)
         
@@ -118,7 +122,7 @@ class PlatformIntegrationService:
     async def terminate_session(self, session_id: str) -> bool:
         """Terminate session and cleanup resources"""
         
-        session = self.db.query(SessionModel).filter(SessionModel.id == session_id).first()
+        session = await self._get_session(session_id)
         
         if not session:
             return False
@@ -134,12 +138,16 @@ class PlatformIntegrationService:
         session.status = SessionStatus.TERMINATED
         session.terminated_at = datetime.utcnow()
         
-        self.db.commit()
+        await self.db.commit()
         
         logger.info("Session terminated", session_id=session_id)
         
         return True
     
+    async def _get_session(self, session_id: str) -> Optional[SessionModel]:
+        """Load a platform session by id"""
+        return await Repository(self.db, SessionModel).get(session_id)
+    
     async def _get_browser(self) -> Browser:
         """Get browser from pool or create new one"""
         if len(self.browser_pool) < self.max_browsers:
@@ -6,20 +6,26 @@ import secrets
 import string
 from datetime import datetime, timedelta
 from typing import Optional, Dict, Any
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from app.models.virtual_card import VirtualCard, CardStatus
 from app.models.platform_account import PlatformAccount
 from app.models.user import User
 from app.core.config import settings
+from app.core.http_cache import CARDS, PRICES, bump_versions
+from app.repositories.listing import ListingRepository
+from app.repositories.virtual_card import VirtualCardRepository
+from app.services.listing_counts import listing_counts, listing_field
 import structlog
 
 logger = structlog.get_logger()
 
 class VirtualCardService:
-    def __init__(self, db: Session):
+    def __init__(self, db: AsyncSession):
         self.db = db
+        self.cards = VirtualCardRepository(db)
+        self.listings = ListingRepository(db)
     
-    def generate_virtual_card(
+    async def generate_virtual_card(
         self,
         seller_id: str,
         platform_account_id: str,
@@ -33,7 +39,7 @@ class VirtualCardService:
             expiry_hours = settings.CARD_EXPIRY_HOURS
         
         # Generate unique card number
-        card_number = self._generate_card_number()
+        card_number = await self._generate_card_number()
         cvv = self._generate_cvv()
         expiry_date = datetime.utcnow() + timedelta(hours=expiry_hours)
         
@@ -55,19 +61,20 @@ class VirtualCardService:
         )
         
         self.db.add(virtual_card)
-        self.db.commit()
-        self.db.refresh(virtual_card)
+        await self.db.flush()
+        await self.listings.sync(virtual_card)
+        await self.db.commit()
+        await self.db.refresh(virtual_card)
+        await bump_versions(CARDS)
+        await listing_counts.apply(None, await listing_field(virtual_card))
         
         logger.info("Virtual card generated", card_id=str(virtual_card.id), seller_id=seller_id)
         
         return virtual_card
     
-    def validate_card(self, card_number: str, cvv: str) -> Dict[str, Any]:
+    async def validate_card(self, card_number: str, cvv: str) -> Dict[str, Any]:
         """Validate virtual card"""
-        card = self.db.query(VirtualCard).filter(
-            VirtualCard.card_number == card_number,
-            VirtualCard.cvv == cvv
-        ).first()
+        card = await self.cards.get_by_credentials(card_number, cvv)
         
         if not card:
             return {"valid": False, "error": "Card not found"}
@@ -76,25 +83,35 @@ class VirtualCardService:
             return {"valid": False, "error": f"Card status: {card.status}"}
         
         if card.is_expired():
+            listed = await listing_field(card)
             card.status = CardStatus.EXPIRED
-            self.db.commit()
+            await self.listings.sync(card)
+            await self.db.commit()
+            await bump_versions(CARDS)
+            await listing_counts.apply(listed, None)
             return {"valid": False, "error": "Card expired"}
         
         if card.is_depleted():
+            listed = await listing_field(card)
             card.status = CardStatus.DEPLETED
-            self.db.commit()
+            await self.listings.sync(card)
+            await self.db.commit()
+            await bump_versions(CARDS)
+            await listing_counts.apply(listed, None)
             return {"valid": False, "error": "Insufficient balance"}
         
+        platform_account = await card.awaitable_attrs.platform_account
+        
         return {
             "valid": True,
             "balance": card.current_balance,
             "card_id": str(card.id),
-            "platform": card.platform_account.platform
+            "platform": platform_account.platform
         }
     
-    def charge_card(self, card_id: str, amount: float) -> bool:
+    async def charge_card(self, card_id: str, amount: float) -> bool:
         """Charge amount from virtual card"""
-        card = self.db.query(VirtualCard).filter(VirtualCard.id == card_id).first()
+        card = await self.get_card_details(card_id)
         
         if not card or not card.can_be_used():
             return False
@@ -102,6 +119,8 @@ class VirtualCardService:
         if card.current_balance < amount:
             return False
         
+        listed = await listing_field(card)
+        
         # Deduct amount
         card.current_balance -= amount
         card.total_charged += amount
@@ -112,47 +131,63 @@ class VirtualCardService:
         if card.current_balance <= 0:
             card.status = CardStatus.DEPLETED
         
-        self.db.commit()
+        # Charges mostly hit sold cards, which have no listing to update
+        on_marketplace = bool(listed) or card.is_listed()
+        if on_marketplace:
+            await self.listings.sync(card)
+        await self.db.commit()
+        if on_marketplace:
+            await bump_versions(CARDS)
+            await listing_counts.apply(listed, await listing_field(card))
         
         logger.info("Card charged", card_id=card_id, amount=amount, remaining_balance=card.current_balance)
         
         return True
     
-    def update_dynamic_pricing(self, card_id: str, demand_multiplier: float):
+    async def update_dynamic_pricing(self, card_id: str, demand_multiplier: float):
         """Update card pricing based on demand"""
-        card = self.db.query(VirtualCard).filter(VirtualCard.id == card_id).first()
+        card = await self.get_card_details(card_id)
         
         if not card:
             return
         
+        listed = await listing_field(card)
+        
         # Calculate new price
         new_price = card.base_price * demand_multiplier
         card.current_price = new_price
         card.demand_multiplier = demand_multiplier
         
-        self.db.commit()
+        await self.listings.sync(card)
+        await self.db.commit()
+        await bump_versions(PRICES)
+        await listing_counts.apply(listed, await listing_field(card))
         
         logger.info("Dynamic pricing updated", card_id=card_id, new_price=new_price, multiplier=demand_multiplier)
     
-    def get_card_details(self, card_id: str) -> Optional[VirtualCard]:
+    async def get_card_details(self, card_id: str) -> Optional[VirtualCard]:
         """Get virtual card details"""
-        return self.db.query(VirtualCard).filter(VirtualCard.id == card_id).first()
+        return await self.cards.get(card_id)
     
-    def deactivate_card(self, card_id: str) -> bool:
+    async def deactivate_card(self, card_id: str) -> bool:
         """Deactivate virtual card"""
-        card = self.db.query(VirtualCard).filter(VirtualCard.id == card_id).first()
+        card = await self.get_card_details(card_id)
         
         if not card:
             return False
         
+        listed = await listing_field(card)
         card.status = CardStatus.CANCELLED
-        self.db.commit()
+        await self.listings.sync(card)
+        await self.db.commit()
+        await bump_versions(CARDS)
+        await listing_counts.apply(listed, None)
         
         logger.info("Card deactivated", card_id=card_id)
         
         return True
     
-    def _generate_card_number(self) -> str:
+    async def _generate_card_number(self) -> str:
         """Generate unique virtual card number"""
         while True:
             # Generate Visa format card number
@@ -161,11 +196,7 @@ class VirtualCardService:
             )
             
             # Check if already exists
-            existing = self.db.query(VirtualCard).filter(
-                VirtualCard.card_number == card_number
-            ).first()
-            
-            if not existing:
+            if not await self.cards.card_number_exists(card_number):
                 return card_number
     
     def _generate_cvv(self) -> str:
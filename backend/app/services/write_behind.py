@@ -0,0 +1,180 @@
+"""
+Write-behind buffer for high-frequency counter updates
+"""
+
+import asyncio
+import time
+import uuid
+from collections import defaultdict
+from datetime import datetime
+from typing import Any, Dict, Optional, Type
+from sqlalchemy import bindparam, func, update
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal
+from app.services.monitoring import WRITE_BEHIND_FLUSH_DURATION, WRITE_BEHIND_PENDING
+import structlog
+
+logger = structlog.get_logger()
+
+class WriteBehindBuffer:
+    """Accumulates counter increments and latest-timestamp updates in memory
+    and writes them out as one batched UPDATE per table.
+
+    Buffered values are at most one flush interval old on other workers;
+    on this worker, read paths can fold pending values in with value().
+    """
+
+    def __init__(self, flush_interval_ms: int, max_pending: int):
+        self.flush_interval = flush_interval_ms / 1000
+        self.max_pending = max_pending
+
+        # model -> row id -> column -> pending delta / latest timestamp
+        self._increments: Dict[Type, Dict[str, Dict[str, float]]] = defaultdict(lambda: defaultdict(dict))
+        self._latest: Dict[Type, Dict[str, Dict[str, datetime]]] = defaultdict(lambda: defaultdict(dict))
+        self._pending_events = 0
+
+        self._flush_lock = asyncio.Lock()
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self._stopping = False
+
+    def increment(self, model: Type, row_id: Any, **deltas: float):
+        """Add to numeric columns of a row"""
+        columns = self._increments[model][str(row_id)]
+        for column, delta in deltas.items():
+            columns[column] = columns.get(column, 0) + delta
+        self._record_event()
+
+    def touch(self, model: Type, row_id: Any, **timestamps: datetime):
+        """Move timestamp columns of a row forward"""
+        columns = self._latest[model][str(row_id)]
+        for column, value in timestamps.items():
+            current = columns.get(column)
+            if current is None or value > current:
+                columns[column] = value
+        self._record_event()
+
+    def value(self, obj: Any, column: str) -> Any:
+        """Column value of a loaded row with this worker's pending writes applied"""
+        stored = getattr(obj, column)
+        row_id = str(obj.id)
+        model = type(obj)
+
+        delta = self._increments.get(model, {}).get(row_id, {}).get(column)
+        if delta is not None:
+            return (stored or 0) + delta
+
+        latest = self._latest.get(model, {}).get(row_id, {}).get(column)
+        if latest is not None and (stored is None or latest > stored):
+            return latest
+
+        return stored
+
+    def _record_event(self):
+        self._pending_events += 1
+        WRITE_BEHIND_PENDING.set(self._pending_events)
+        if self._pending_events >= self.max_pending and self._wakeup is not None:
+            self._wakeup.set()
+
+    async def flush(self) -> int:
+        """Write all pending values, returning the number of rows updated"""
+        async with self._flush_lock:
+            if not self._pending_events:
+                return 0
+
+            increments, self._increments = self._increments, defaultdict(lambda: defaultdict(dict))
+            latest, self._latest = self._latest, defaultdict(lambda: defaultdict(dict))
+            self._pending_events = 0
+            WRITE_BEHIND_PENDING.set(0)
+
+            start = time.perf_counter()
+            rows_written = 0
+            try:
+                async with AsyncSessionLocal() as db:
+                    for model in set(increments) | set(latest):
+                        rows = self._build_rows(model, increments.get(model, {}), latest.get(model, {}))
+                        if rows:
+                            await db.execute(self._build_update(model, rows[0]), rows)
+                            rows_written += len(rows)
+                    await db.commit()
+            except Exception as e:
+                logger.error("Write-behind flush failed, requeueing", error=str(e))
+                self._requeue(increments, latest)
+                raise
+            finally:
+                WRITE_BEHIND_FLUSH_DURATION.observe(time.perf_counter() - start)
+
+            return rows_written
+
+    def _build_rows(self, model: Type, increments: Dict, latest: Dict):
+        """executemany parameter sets; every row carries every column"""
+        inc_columns = sorted({column for columns in increments.values() for column in columns})
+        ts_columns = sorted({column for columns in latest.values() for column in columns})
+
+        rows = []
+        for row_id in set(increments) | set(latest):
+            row = {"_id": uuid.UUID(row_id)}
+            for column in inc_columns:
+                row[f"_inc_{column}"] = increments.get(row_id, {}).get(column, 0)
+            for column in ts_columns:
+                row[f"_ts_{column}"] = latest.get(row_id, {}).get(column)
+            rows.append(row)
+        return rows
+
+    def _build_update(self, model: Type, sample_row: Dict[str, Any]):
+        table = model.__table__
+        values = {}
+        for key in sample_row:
+            if key.startswith("_inc_"):
+                column = table.c[key[len("_inc_"):]]
+                values[column.name] = func.coalesce(column, 0) + bindparam(key, type_=column.type)
+            elif key.startswith("_ts_"):
+                column = table.c[key[len("_ts_"):]]
+                # GREATEST ignores NULLs, so rows with nothing to touch keep their value
+                values[column.name] = func.greatest(column, bindparam(key, type_=column.type))
+        return update(table).where(table.c.id == bindparam("_id")).values(values)
+
+    def _requeue(self, increments: Dict, latest: Dict):
+        for model, rows in increments.items():
+            for row_id, columns in rows.items():
+                self.increment(model, row_id, **columns)
+        for model, rows in latest.items():
+            for row_id, columns in rows.items():
+                self.touch(model, row_id, **columns)
+
+    async def _run(self):
+        while not self._stopping:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            try:
+                await self.flush()
+            except Exception:
+                # Already logged and requeued; retry on the next tick
+                pass
+
+    async def start(self):
+        """Start the periodic flusher"""
+        self._stopping = False
+        self._wakeup = asyncio.Event()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Stop the flusher and write out everything still pending
+
+        The flusher is asked to exit rather than cancelled: a flush
+        cancelled after swapping out the buffers would lose them.
+        """
+        if self._task:
+            self._stopping = True
+            self._wakeup.set()
+            await self._task
+            self._task = None
+        await self.flush()
+
+write_behind = WriteBehindBuffer(
+    flush_interval_ms=settings.WRITE_BEHIND_FLUSH_INTERVAL_MS,
+    max_pending=settings.WRITE_BEHIND_MAX_PENDING
+)
@@ -0,0 +1,329 @@
+"""
+Query-plan regression harness
+
+Runs the service and endpoint queries against a seeded local Postgres,
+captures every SELECT they emit, EXPLAINs each one and fails if any plan
+falls back to a sequential scan on a hot table. Writes are rolled back.
+
+    alembic upgrade head
+    python -m benchmarks.explain_plans --seed
+"""
+
+import argparse
+import asyncio
+import sys
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from sqlalchemy import event, select, text
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+
+from app.core.config import settings
+from app.core.database import get_async_database_url
+from app.models.credit_pool import CreditPool
+from app.models.platform_account import PlatformType
+from app.models.user import User
+from app.models.virtual_card import VirtualCard, CardStatus
+
+# Tables large enough in production that a seq scan is a regression
+HOT_TABLES = {
+    "virtual_cards",
+    "marketplace_listings",
+    "usage_logs",
+    "credit_pools",
+    "sessions",
+    "pool_sessions",
+    "credit_pool_contributions",
+}
+
+SEED_MARKER = "seed-plan-"
+
+SEED_SQL = [
+    # Users, one platform account each
+    """
+    INSERT INTO users (id, email, username, password_hash, is_active, is_verified, is_premium,
+                       balance, total_earned, total_spent, failed_login_attempts, created_at, updated_at)
+    SELECT gen_random_uuid(), 'seed-plan-' || g || '@example.com', 'seed-plan-' || g, 'x',
+           true, true, false, 1000, 0, 0, 0, now(), now()
+    FROM generate_series(1, :users) g
+    """,
+    """
+    INSERT INTO platform_accounts (id, user_id, platform, email, status, is_premium,
+                                   available_credits, total_credits, credits_used, allow_pooling,
+                                   min_pool_amount, max_pool_amount, created_at, updated_at)
+    SELECT gen_random_uuid(), u.id,
+           (ARRAY['CHATGPT', 'CLAUDE', 'GEMINI'])[1 + (row_number() OVER () % 3)]::platformtype,
+           u.email, 'ACTIVE', false, 1000, 1000, 0, true, 1, 100, now(), now()
+    FROM users u
+    WHERE u.email LIKE 'seed-plan-%'
+    """,
+    # Cards: 10% available, the rest sold or expired, created over 180 days
+    """
+    WITH pa AS (
+        SELECT id, user_id, row_number() OVER () AS rn FROM platform_accounts
+    ), n AS (SELECT count(*) AS c FROM pa)
+    INSERT INTO virtual_cards (id, card_number, cvv, expiry_date, seller_id, buyer_id,
+                               platform_account_id, initial_balance, current_balance, price_per_hour,
+                               total_charged, status, usage_count, base_price, current_price,
+                               demand_multiplier, created_at, activated_at, expires_at)
+    SELECT gen_random_uuid(), '9' || lpad(g::text, 15, '0'), '123', now() + interval '1 day',
+           seller.user_id,
+           CASE WHEN g % 10 = 0 THEN NULL ELSE buyer.user_id END,
+           seller.id, 100, 50 + (g % 50), 1 + (g % 20),
+           0,
+           (CASE WHEN g % 10 <= 6 THEN 'ACTIVE' ELSE 'EXPIRED' END)::cardstatus,
+           0, 1 + (g % 20), 1 + (g % 20) * 1.1, 1.1,
+           now() - (g % 180) * interval '1 day', now(), now() + interval '1 day'
+    FROM generate_series(1, :cards) g
+    CROSS JOIN n
+    JOIN pa seller ON seller.rn = 1 + (g % n.c)
+    JOIN pa buyer ON buyer.rn = 1 + ((g * 7) % n.c)
+    """,
+    # Listings read model for the seeded cards
+    """
+    INSERT INTO marketplace_listings (card_id, platform, seller_id, seller_username, available_balance,
+                                      price_per_hour, current_price, demand_multiplier,
+                                      utilization_percentage, created_at, expires_at)
+    SELECT vc.id, pa.platform, u.id, u.username, vc.current_balance, vc.price_per_hour,
+           vc.current_price, vc.demand_multiplier, 0, vc.created_at, vc.expires_at
+    FROM virtual_cards vc
+    JOIN platform_accounts pa ON pa.id = vc.platform_account_id
+    JOIN users u ON u.id = vc.seller_id
+    WHERE vc.status = 'ACTIVE' AND vc.buyer_id IS NULL
+    ON CONFLICT (card_id) DO NOTHING
+    """,
+    """
+    WITH vc AS (
+        SELECT id, buyer_id, platform_account_id, row_number() OVER () AS rn
+        FROM virtual_cards WHERE buyer_id IS NOT NULL
+    ), n AS (SELECT count(*) AS c FROM vc)
+    INSERT INTO sessions (id, buyer_id, virtual_card_id, platform_account_id, session_token,
+                          total_usage, request_count, status, started_at, expires_at, created_at, updated_at)
+    SELECT gen_random_uuid(), vc.buyer_id, vc.id, vc.platform_account_id, 'seed-plan-' || g,
+           0, 0, 'ACTIVE', now(), now() + interval '1 hour', now(), now()
+    FROM generate_series(1, :sessions) g
+    CROSS JOIN n
+    JOIN vc ON vc.rn = 1 + (g % n.c)
+    """,
+    """
+    WITH s AS (
+        SELECT id, buyer_id, virtual_card_id, row_number() OVER () AS rn FROM sessions
+    ), n AS (SELECT count(*) AS c FROM s)
+    INSERT INTO usage_logs (id, session_id, virtual_card_id, user_id, request_type, platform,
+                            base_cost, actual_cost, cost_multiplier, success, created_at)
+    SELECT gen_random_uuid(), s.id, s.virtual_card_id, s.buyer_id, 'chat',
+           (ARRAY['chatgpt', 'claude', 'gemini'])[1 + (g % 3)],
+           0.01, 0.01, 1.0, 'true', now() - (g % 180) * interval '1 day'
+    FROM generate_series(1, :usage_logs) g
+    CROSS JOIN n
+    JOIN s ON s.rn = 1 + (g % n.c)
+    """,
+    # Pools: 20% public, with contributions and sessions
+    """
+    WITH u AS (
+        SELECT id, row_number() OVER () AS rn FROM users WHERE email LIKE 'seed-plan-%'
+    ), n AS (SELECT count(*) AS c FROM u)
+    INSERT INTO credit_pools (id, owner_id, platform, pool_name, min_contribution, max_contribution,
+                              auto_refill_threshold, auto_refill_amount, status, is_public,
+                              allow_external_contributors, total_contributed, total_used,
+                              current_balance, available_balance, total_sessions, active_sessions,
+                              created_at, updated_at)
+    SELECT gen_random_uuid(), u.id, (ARRAY['chatgpt', 'claude', 'gemini'])[1 + (g % 3)],
+           'seed-plan-' || g, 1, 100, 5, 10,
+           (CASE WHEN g % 7 = 0 THEN 'INACTIVE' ELSE 'ACTIVE' END)::poolstatus,
+           g % 5 = 0, false, 100, 10, 90, 90, 0, 0, now(), now()
+    FROM generate_series(1, :pools) g
+    CROSS JOIN n
+    JOIN u ON u.rn = 1 + (g % n.c)
+    """,
+    """
+    WITH p AS (SELECT id, owner_id, row_number() OVER () AS rn FROM credit_pools),
+         pa AS (SELECT id, user_id FROM platform_accounts),
+         n AS (SELECT count(*) AS c FROM p)
+    INSERT INTO credit_pool_contributions (id, credit_pool_id, platform_account_id, contributor_id,
+                                           amount, contribution_type, status, created_at)
+    SELECT gen_random_uuid(), p.id, pa.id, p.owner_id, 10, 'manual', 'active', now()
+    FROM generate_series(1, :contributions) g
+    CROSS JOIN n
+    JOIN p ON p.rn = 1 + (g % n.c)
+    JOIN pa ON pa.user_id = p.owner_id
+    """,
+    """
+    WITH p AS (SELECT id, owner_id, row_number() OVER () AS rn FROM credit_pools),
+         n AS (SELECT count(*) AS c FROM p)
+    INSERT INTO pool_sessions (id, credit_pool_id, user_id, session_token, allocated_amount,
+                               used_amount, status, created_at, expires_at)
+    SELECT gen_random_uuid(), p.id, p.owner_id, 'seed-plan-pool-' || g, 10, 0,
+           CASE WHEN g % 4 = 0 THEN 'active' ELSE 'completed' END, now(), now() + interval '1 hour'
+    FROM generate_series(1, :pool_sessions) g
+    CROSS JOIN n
+    JOIN p ON p.rn = 1 + (g % n.c)
+    """,
+]
+
+SEED_SIZES = {
+    "users": 2000,
+    "cards": 50000,
+    "sessions": 20000,
+    "usage_logs": 100000,
+    "pools": 5000,
+    "contributions": 20000,
+    "pool_sessions": 20000,
+}
+
+
+async def seed(engine, scale: float):
+    """Insert a deterministic data set unless one is already present"""
+    sizes = {name: max(1, int(count * scale)) for name, count in SEED_SIZES.items()}
+    async with engine.begin() as conn:
+        existing = await conn.scalar(
+            text("SELECT count(*) FROM users WHERE email LIKE :marker"),
+            {"marker": f"{SEED_MARKER}%"}
+        )
+        if existing:
+            print(f"seed data already present ({existing} users), skipping")
+        else:
+            for statement in SEED_SQL:
+                params = {name: value for name, value in sizes.items() if f":{name}" in statement}
+                await conn.execute(text(statement), params)
+            print(f"seeded {sizes}")
+
+    async with engine.connect() as conn:
+        conn = await conn.execution_options(isolation_level="AUTOCOMMIT")
+        await conn.execute(text("ANALYZE"))
+
+
+def find_seq_scans(plan: Dict[str, Any]) -> List[str]:
+    """Hot relations read by a Seq Scan anywhere in the plan tree"""
+    found = []
+    if plan.get("Node Type") == "Seq Scan" and plan.get("Relation Name") in HOT_TABLES:
+        found.append(plan["Relation Name"])
+    for child in plan.get("Plans", []):
+        found.extend(find_seq_scans(child))
+    return found
+
+
+async def build_scenarios(db: AsyncSession) -> List[Tuple[str, Callable[[], Awaitable[Any]]]]:
+    """Service and endpoint calls whose queries are checked"""
+    from app.api.v1.endpoints import credit_pools, marketplace
+    from app.services.credit_pool_service import CreditPoolService
+    from app.services.dynamic_pricing_service import DynamicPricingService
+    from app.services.virtual_card_service import VirtualCardService
+
+    user = (await db.execute(
+        select(User).where(User.email.like(f"{SEED_MARKER}%")).limit(1)
+    )).scalars().first()
+    card = (await db.execute(
+        select(VirtualCard).where(
+            VirtualCard.status == CardStatus.ACTIVE,
+            VirtualCard.buyer_id.is_(None)
+        ).limit(1)
+    )).scalars().first()
+    pool = (await db.execute(select(CreditPool).limit(1))).scalars().first()
+    if not (user and card and pool):
+        raise RuntimeError("No seed data found, run with --seed")
+
+    card_service = VirtualCardService(db)
+    pool_service = CreditPoolService(db)
+    pricing_service = DynamicPricingService(db)
+
+    def listings(sort, platform=None, min_price=None, max_price=None, cursor=None):
+        return lambda: marketplace.get_marketplace_listings(
+            platform=platform, min_price=min_price, max_price=max_price, min_balance=None,
+            sort=sort, cursor=cursor, limit=50, db=db)
+
+    first_page = await listings(marketplace.ListingSort.PRICE)()
+    second_page_cursor = first_page["next_cursor"]
+
+    return [
+        ("VirtualCardService.get_card_details", lambda: card_service.get_card_details(str(card.id))),
+        ("VirtualCardService.validate_card", lambda: card_service.validate_card(card.card_number, card.cvv)),
+        ("CreditPoolService.get_pool_stats", lambda: pool_service.get_pool_stats(str(pool.id))),
+        ("CreditPoolService.get_public_pools", lambda: pool_service.get_public_pools()),
+        ("CreditPoolService.get_public_pools(platform)", lambda: pool_service.get_public_pools("claude")),
+        ("DynamicPricingService.calculate_demand_multiplier",
+         lambda: pricing_service.calculate_demand_multiplier("claude")),
+        ("DynamicPricingService.get_pricing_trends", lambda: pricing_service.get_pricing_trends("claude")),
+        *[
+            (f"marketplace.get_marketplace_listings(sort={sort.value})", listings(sort))
+            for sort in marketplace.ListingSort
+        ],
+        ("marketplace.get_marketplace_listings(price range)", listings(
+            marketplace.ListingSort.PRICE, min_price=2.0, max_price=5.0)),
+        ("marketplace.get_marketplace_listings(platform)", listings(
+            marketplace.ListingSort.PRICE, platform=PlatformType.CLAUDE)),
+        ("marketplace.get_marketplace_listings(page 2)", listings(
+            marketplace.ListingSort.PRICE, cursor=second_page_cursor)),
+        ("marketplace.get_my_purchases", lambda: marketplace.get_my_purchases(current_user=user, db=db)),
+        ("marketplace.get_my_sales", lambda: marketplace.get_my_sales(current_user=user, db=db)),
+        ("credit_pools.get_my_pools", lambda: credit_pools.get_my_pools(current_user=user, db=db)),
+    ]
+
+
+async def check_plans(engine, only: Optional[str] = None) -> int:
+    """EXPLAIN every captured SELECT, returning the number of regressions"""
+    captured: List[Tuple[str, Any]] = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith("SELECT"):
+            captured.append((statement, parameters))
+
+    failures = 0
+    async with engine.connect() as conn:
+        outer = await conn.begin()
+        db = AsyncSession(bind=conn, join_transaction_mode="create_savepoint", expire_on_commit=False)
+        try:
+            scenarios = await build_scenarios(db)
+            for name, call in scenarios:
+                if only and only not in name:
+                    continue
+
+                captured.clear()
+                event.listen(engine.sync_engine, "before_cursor_execute", capture)
+                try:
+                    await call()
+                finally:
+                    event.remove(engine.sync_engine, "before_cursor_execute", capture)
+
+                for statement, parameters in list(captured):
+                    result = await conn.exec_driver_sql(f"EXPLAIN (FORMAT JSON) {statement}", parameters)
+                    plan = result.scalar()[0]["Plan"]
+                    scans = find_seq_scans(plan)
+                    first_line = " ".join(statement.split())[:100]
+                    if scans:
+                        failures += 1
+                        print(f"FAIL {name}: seq scan on {', '.join(sorted(set(scans)))}\n     {first_line}")
+                    else:
+                        print(f"ok   {name}: {plan['Node Type']} (cost {plan['Total Cost']:.0f})")
+        finally:
+            await db.close()
+            await outer.rollback()
+
+    return failures
+
+
+async def main_async(args) -> int:
+    url = get_async_database_url(args.database_url or settings.DATABASE_URL)
+    engine = create_async_engine(url)
+    try:
+        if args.seed:
+            await seed(engine, args.scale)
+        failures = await check_plans(engine, args.only)
+    finally:
+        await engine.dispose()
+
+    print(f"\n{failures} plan regression(s)")
+    return 1 if failures else 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="EXPLAIN service queries and flag seq scans")
+    parser.add_argument("--database-url", default=None, help="Defaults to DATABASE_URL")
+    parser.add_argument("--seed", action="store_true", help="Seed and ANALYZE before checking")
+    parser.add_argument("--scale", type=float, default=1.0, help="Multiplier for seed row counts")
+    parser.add_argument("--only", default=None, help="Only run scenarios whose name contains this")
+    args = parser.parse_args()
+    sys.exit(asyncio.run(main_async(args)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""
+Faceted listing search microbenchmark
+
+Loads a synthetic snapshot and times one search: a results page plus all
+five facet histograms from a single pass, with no filters and with a
+filter on every facet. In-memory only; the snapshot refresh is not
+included.
+
+    python -m benchmarks.listing_search --listings 100000
+"""
+
+import argparse
+import random
+import time
+import uuid
+from datetime import datetime, timedelta
+from typing import Callable
+
+from app.models.platform_account import PlatformType
+from app.services.listing_search import ListingEntry, ListingFilters, ListingSnapshot
+
+
+def time_call(fn: Callable[[], object], iterations: int) -> float:
+    """Mean milliseconds per call"""
+    start = time.perf_counter()
+    for _ in range(iterations):
+        fn()
+    return (time.perf_counter() - start) / iterations * 1000
+
+
+def build_snapshot(listings: int, sellers: int, seed: int) -> ListingSnapshot:
+    rng = random.Random(seed)
+    now = datetime.utcnow()
+    platforms = list(PlatformType)
+    snapshot = ListingSnapshot(reload_interval=300, retention=3600)
+    for _ in range(listings):
+        price = round(rng.uniform(0.5, 60), 2)
+        entry = ListingEntry(
+            card_id=uuid.uuid4(),
+            platform=rng.choice(platforms),
+            seller_username=f"seller-{rng.randrange(sellers)}",
+            available_balance=rng.uniform(1, 300),
+            price_per_hour=price,
+            current_price=price,
+            demand_multiplier=1.0,
+            created_at=now - timedelta(seconds=rng.randrange(86400 * 30)),
+            expires_at=now + timedelta(seconds=rng.randrange(60, 86400 * 14)),
+            utilization_percentage=rng.uniform(0, 100)
+        )
+        snapshot._entries[entry.card_id] = entry
+    return snapshot
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Single-pass faceted search over a listing snapshot")
+    parser.add_argument("--listings", type=int, default=100000)
+    parser.add_argument("--sellers", type=int, default=2000)
+    parser.add_argument("--iterations", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    snapshot = build_snapshot(args.listings, args.sellers, args.seed)
+    scenarios = {
+        "no filters": ListingFilters(),
+        "every facet filtered": ListingFilters(
+            platforms={PlatformType.CLAUDE, PlatformType.CHATGPT},
+            sellers={f"seller-{i}" for i in range(200)},
+            min_price=2.0,
+            max_price=20.0,
+            min_balance=25.0,
+            max_hours_left=24 * 7
+        ),
+    }
+
+    print(f"{args.listings} listings")
+    for name, filters in scenarios.items():
+        result = snapshot.search(filters, "current_price", False, None, 50)
+        ms = time_call(lambda: snapshot.search(filters, "current_price", False, None, 50), args.iterations)
+        print(f"  {name:22} {ms:8.1f} ms  ({result.total_count} matches)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+"""
+Concurrent load test for the Subsplit API
+
+Fires a fixed number of requests at one or more endpoints with bounded
+concurrency and reports latency percentiles. Run it against a build before
+and after a change and compare the p99 column.
+
+    python -m benchmarks.load_test --base-url http://localhost:8000 \\
+        --path /api/v1/marketplace/listings --path /api/v1/marketplace/platforms \\
+        --requests 2000 --concurrency 100
+"""
+
+import argparse
+import asyncio
+import time
+from typing import Dict, List, Optional
+
+import httpx
+
+
+def percentile(samples: List[float], pct: float) -> float:
+    """Nearest-rank percentile of an unsorted sample list"""
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    index = max(0, min(len(ordered) - 1, int(round(pct / 100 * len(ordered))) - 1))
+    return ordered[index]
+
+
+async def run_load(
+    base_url: str,
+    paths: List[str],
+    total_requests: int,
+    concurrency: int,
+    token: Optional[str] = None
+) -> Dict[str, Dict[str, float]]:
+    """Issue requests round-robin across paths and collect latencies"""
+
+    headers = {"Authorization": f"Bearer {token}"} if token else {}
+    latencies: Dict[str, List[float]] = {path: [] for path in paths}
+    errors: Dict[str, int] = {path: 0 for path in paths}
+    semaphore = asyncio.Semaphore(concurrency)
+
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, headers=headers, limits=limits, timeout=30.0) as client:
+
+        async def fire(path: str):
+            async with semaphore:
+                start = time.perf_counter()
+                try:
+                    response = await client.get(path)
+                    if response.status_code >= 500:
+                        errors[path] += 1
+                except httpx.HTTPError:
+                    errors[path] += 1
+                latencies[path].append(time.perf_counter() - start)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(fire(paths[i % len(paths)]) for i in range(total_requests)))
+        elapsed = time.perf_counter() - started
+
+    report = {}
+    for path, samples in latencies.items():
+        report[path] = {
+            "count": len(samples),
+            "errors": errors[path],
+            "p50_ms": percentile(samples, 50) * 1000,
+            "p95_ms": percentile(samples, 95) * 1000,
+            "p99_ms": percentile(samples, 99) * 1000,
+            "max_ms": max(samples) * 1000 if samples else 0.0,
+        }
+    report["__total__"] = {"elapsed_s": elapsed, "rps": total_requests / elapsed if elapsed else 0.0}
+    return report
+
+
+def print_report(report: Dict[str, Dict[str, float]], label: str = ""):
+    """Print a percentile table"""
+    if label:
+        print(f"== {label} ==")
+    print(f"{'path':<48} {'count':>6} {'err':>5} {'p50':>9} {'p95':>9} {'p99':>9} {'max':>9}")
+    for path, stats in report.items():
+        if path == "__total__":
+            continue
+        print(
+            f"{path:<48} {stats['count']:>6} {stats['errors']:>5} "
+            f"{stats['p50_ms']:>8.1f}ms {stats['p95_ms']:>8.1f}ms "
+            f"{stats['p99_ms']:>8.1f}ms {stats['max_ms']:>8.1f}ms"
+        )
+    total = report["__total__"]
+    print(f"elapsed {total['elapsed_s']:.2f}s, {total['rps']:.0f} req/s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Subsplit API load test")
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--path", action="append", dest="paths", help="Endpoint path, repeatable")
+    parser.add_argument("--requests", type=int, default=1000)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--token", default=None, help="Bearer token for authenticated endpoints")
+    parser.add_argument("--label", default="")
+    args = parser.parse_args()
+
+    paths = args.paths or ["/api/v1/marketplace/listings", "/api/v1/marketplace/platforms"]
+    report = asyncio.run(run_load(args.base_url, paths, args.requests, args.concurrency, args.token))
+    print_report(report, args.label)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+"""
+Marketplace latency during a login storm
+
+Measures marketplace read latency twice against a running API: once on
+its own, then while a burst of concurrent logins hammers bcrypt. With
+password work off the event loop the two tables should match closely;
+with bcrypt on the loop, p99 in the second run climbs by the hash time
+multiplied by the login concurrency.
+
+Start the API with RATE_LIMIT_ENABLED=false so the limiter does not
+turn the storm away before it reaches bcrypt.
+
+    python -m benchmarks.login_storm --base-url http://localhost:8000 \\
+        --email storm@example.com --password storm-password --register
+"""
+
+import argparse
+import asyncio
+import time
+from typing import Dict, List
+
+import httpx
+
+from benchmarks.load_test import percentile, print_report, run_load
+
+
+async def login_storm(base_url: str, email: str, password: str, stop: asyncio.Event, concurrency: int) -> Dict[str, float]:
+    """Keep `concurrency` logins in flight until told to stop"""
+    latencies: List[float] = []
+    statuses: Dict[int, int] = {}
+
+    async with httpx.AsyncClient(base_url=base_url, timeout=60.0) as client:
+
+        async def worker():
+            while not stop.is_set():
+                start = time.perf_counter()
+                try:
+                    response = await client.post("/api/v1/auth/login", json={"email": email, "password": password})
+                    statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+                except httpx.HTTPError:
+                    statuses[0] = statuses.get(0, 0) + 1
+                latencies.append(time.perf_counter() - start)
+
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+
+    return {
+        "count": len(latencies),
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p99_ms": percentile(latencies, 99) * 1000,
+        **{f"status_{code}": count for code, count in sorted(statuses.items())},
+    }
+
+
+async def main_async(args):
+    if args.register:
+        async with httpx.AsyncClient(base_url=args.base_url) as client:
+            await client.post("/api/v1/auth/register", json={
+                "email": args.email,
+                "username": args.email.split("@")[0],
+                "password": args.password,
+            })
+
+    paths = args.paths or ["/api/v1/marketplace/listings", "/api/v1/marketplace/platforms"]
+
+    baseline = await run_load(args.base_url, paths, args.requests, args.concurrency)
+    print_report(baseline, "marketplace, idle")
+
+    stop = asyncio.Event()
+    storm = asyncio.create_task(login_storm(args.base_url, args.email, args.password, stop, args.login_concurrency))
+    # Let the storm saturate the hash pool before measuring
+    await asyncio.sleep(1.0)
+    during = await run_load(args.base_url, paths, args.requests, args.concurrency)
+    stop.set()
+    logins = await storm
+
+    print()
+    print_report(during, f"marketplace, {args.login_concurrency} concurrent logins")
+    print(f"\nlogins: {logins}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Marketplace latency during a login storm")
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--path", action="append", dest="paths", help="Read path to measure, repeatable")
+    parser.add_argument("--email", required=True)
+    parser.add_argument("--password", required=True)
+    parser.add_argument("--register", action="store_true", help="Register the login user first")
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--login-concurrency", type=int, default=50)
+    args = parser.parse_args()
+    asyncio.run(main_async(args))
+
+
+if __name__ == "__main__":
+    main()
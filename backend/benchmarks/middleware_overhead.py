@@ -0,0 +1,137 @@
+"""
+Per-request middleware overhead benchmark
+
+Drives ASGI apps in-process (no sockets) and reports the mean cost each
+middleware stack adds on top of a bare endpoint, for a plain JSON
+response and a 100-chunk streaming response:
+
+- basehttp: two pass-through BaseHTTPMiddleware layers, the framework
+  cost the old LoggingMiddleware/RateLimitMiddleware paid before doing
+  any work
+- asgi: two pass-through pure ASGI layers
+- app: the application's LoggingMiddleware and RateLimitMiddleware, with
+  an always-allow limiter so Redis latency is not part of the number
+
+    python -m benchmarks.middleware_overhead --requests 20000
+"""
+
+import argparse
+import asyncio
+import time
+from typing import Callable, Dict
+
+import structlog
+from starlette.applications import Starlette
+from starlette.middleware import Middleware
+from starlette.middleware.base import BaseHTTPMiddleware
+from starlette.responses import JSONResponse, StreamingResponse
+from starlette.routing import Route
+
+from app.core.middleware import LoggingMiddleware, RateLimitMiddleware
+from app.core.rate_limit import RateLimitResult
+
+SCOPE_TEMPLATE = {
+    "type": "http",
+    "asgi": {"version": "3.0"},
+    "http_version": "1.1",
+    "scheme": "http",
+    "method": "GET",
+    "root_path": "",
+    "query_string": b"",
+    "headers": [(b"host", b"bench")],
+    "client": ("127.0.0.1", 50000),
+    "server": ("bench", 80),
+}
+
+
+class PassThroughBaseHTTP(BaseHTTPMiddleware):
+    async def dispatch(self, request, call_next):
+        return await call_next(request)
+
+
+class PassThroughASGI:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        await self.app(scope, receive, send)
+
+
+class AllowAllLimiter:
+    async def acquire(self, key, limit, cost=1):
+        return RateLimitResult(allowed=True, limit=limit.capacity, remaining=limit.capacity, refill_rate=1.0)
+
+
+async def ping(request):
+    return JSONResponse({"status": "ok"})
+
+
+async def stream(request):
+    async def chunks():
+        for _ in range(100):
+            yield b"data: chunk\n\n"
+    return StreamingResponse(chunks(), media_type="text/event-stream")
+
+
+def build_app(middleware) -> Starlette:
+    return Starlette(
+        routes=[Route("/ping", ping), Route("/stream", stream)],
+        middleware=middleware
+    )
+
+
+STACKS: Dict[str, Callable[[], Starlette]] = {
+    "bare": lambda: build_app([]),
+    "basehttp": lambda: build_app([Middleware(PassThroughBaseHTTP), Middleware(PassThroughBaseHTTP)]),
+    "asgi": lambda: build_app([Middleware(PassThroughASGI), Middleware(PassThroughASGI)]),
+    "app": lambda: build_app([
+        Middleware(LoggingMiddleware),
+        Middleware(RateLimitMiddleware, limiter=AllowAllLimiter()),
+    ]),
+}
+
+
+async def call(app, path: str):
+    scope = dict(SCOPE_TEMPLATE, path=path, raw_path=path.encode())
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        pass
+
+    await app(scope, receive, send)
+
+
+async def measure(app, path: str, requests: int) -> float:
+    """Mean microseconds per request"""
+    for _ in range(min(1000, requests)):
+        await call(app, path)
+
+    start = time.perf_counter()
+    for _ in range(requests):
+        await call(app, path)
+    return (time.perf_counter() - start) / requests * 1e6
+
+
+async def main_async(args):
+    # Keep log rendering out of the measurement
+    structlog.configure(logger_factory=structlog.ReturnLoggerFactory())
+
+    for path in ("/ping", "/stream"):
+        results = {name: await measure(factory(), path, args.requests) for name, factory in STACKS.items()}
+        bare = results["bare"]
+        print(f"\n{path} ({args.requests} requests)")
+        for name, micros in results.items():
+            print(f"  {name:<10} {micros:>8.1f} us/request  (+{micros - bare:.1f} us)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure middleware overhead per request")
+    parser.add_argument("--requests", type=int, default=20000)
+    args = parser.parse_args()
+    asyncio.run(main_async(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""
+Order book matching microbenchmark
+
+Fills one platform's book with resting buy orders and listings at random
+prices and times a full matching round, plus inserting and cancelling an
+order, all in memory. Settlement is not included: each pair still costs
+one purchase transaction.
+
+    python -m benchmarks.order_book --bids 1000 --asks 4000
+"""
+
+import argparse
+import random
+import time
+import uuid
+from datetime import datetime, timedelta
+from typing import Callable
+
+from app.models.platform_account import PlatformType
+from app.services.order_book import Ask, BuyOrder, OrderBook
+
+
+def time_call(fn: Callable[[], object], iterations: int) -> float:
+    """Mean microseconds per call"""
+    start = time.perf_counter()
+    for _ in range(iterations):
+        fn()
+    return (time.perf_counter() - start) / iterations * 1e6
+
+
+def build_book(bids: int, asks: int, seed: int) -> OrderBook:
+    rng = random.Random(seed)
+    book = OrderBook()
+    for seq in range(bids):
+        book.add(BuyOrder(
+            order_id=uuid.uuid4(),
+            buyer_id=uuid.uuid4(),
+            platform=PlatformType.CLAUDE,
+            max_price=round(rng.uniform(1, 20), 2),
+            duration_hours=1,
+            min_balance=rng.choice([0.0, 0.0, 25.0, 50.0]),
+            seq=seq
+        ))
+    now = datetime.utcnow()
+    book.set_asks([
+        Ask(
+            card_id=uuid.uuid4(),
+            price=round(rng.uniform(1, 25), 2),
+            balance=rng.uniform(1, 100),
+            listed_at=now - timedelta(seconds=rng.randrange(86400))
+        )
+        for _ in range(asks)
+    ], 25.0, asks)
+    return book
+
+
+def main():
+    parser = argparse.ArgumentParser(description="In-memory order book matching cost")
+    parser.add_argument("--bids", type=int, default=1000)
+    parser.add_argument("--asks", type=int, default=4000)
+    parser.add_argument("--iterations", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    book = build_book(args.bids, args.asks, args.seed)
+    pairs = book.match()
+    match_us = time_call(book.match, args.iterations)
+
+    order = BuyOrder(uuid.uuid4(), uuid.uuid4(), PlatformType.CLAUDE, 10.0, 1, 0.0, args.bids)
+
+    def add_and_cancel():
+        book.add(order)
+        book.remove(order.order_id)
+
+    churn_us = time_call(add_and_cancel, args.iterations * 50)
+
+    print(f"{args.bids} bids, {args.asks} asks, {len(pairs)} pairs per round")
+    print(f"  match round    {match_us:10.1f} us")
+    print(f"  add + cancel   {churn_us:10.1f} us")
+
+
+if __name__ == "__main__":
+    main()
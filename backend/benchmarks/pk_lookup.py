@@ -0,0 +1,124 @@
+"""
+Primary key lookup microbenchmark
+
+Compares the per-call cost of the lookups services used to build inline
+(select().where(Model.id == x) executed every time) with the repository
+layer: a lambda statement, and Session.get() both when the row is already
+in the identity map and when it has to be loaded.
+
+    python -m benchmarks.pk_lookup --iterations 5000
+"""
+
+import argparse
+import asyncio
+import time
+from typing import Awaitable, Callable, Dict
+
+from sqlalchemy import lambda_stmt, select
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+
+from app.core.config import settings
+from app.core.database import get_async_database_url
+from app.models.user import User
+from app.repositories.user import UserRepository
+
+# Imported so every mapper referenced by User's relationships is configured
+from app.models import credit_pool, platform_account, session, transaction, usage_log, virtual_card  # noqa: F401
+
+
+def time_sync(fn: Callable[[], object], iterations: int) -> float:
+    """Mean microseconds per call"""
+    start = time.perf_counter()
+    for _ in range(iterations):
+        fn()
+    return (time.perf_counter() - start) / iterations * 1e6
+
+
+async def time_async(fn: Callable[[], Awaitable[object]], iterations: int) -> float:
+    """Mean microseconds per call"""
+    start = time.perf_counter()
+    for _ in range(iterations):
+        await fn()
+    return (time.perf_counter() - start) / iterations * 1e6
+
+
+def construction(user_id, iterations: int) -> Dict[str, float]:
+    """Statement build plus cache key generation, no database involved"""
+    def inline():
+        select(User).where(User.id == user_id)._generate_cache_key()
+
+    def cached():
+        lambda_stmt(lambda: select(User).where(User.id == user_id))._generate_cache_key()
+
+    return {
+        "select() build + cache key": time_sync(inline, iterations),
+        "lambda_stmt build + cache key": time_sync(cached, iterations),
+    }
+
+
+async def round_trips(db: AsyncSession, user_id, iterations: int) -> Dict[str, float]:
+    """Full lookups against the database"""
+    repository = UserRepository(db)
+
+    async def inline():
+        result = await db.execute(select(User).where(User.id == user_id))
+        return result.scalars().first()
+
+    async def cached():
+        stmt = lambda_stmt(lambda: select(User).where(User.id == user_id))
+        result = await db.execute(stmt)
+        return result.scalars().first()
+
+    async def get_miss():
+        db.expunge_all()
+        return await repository.get(user_id)
+
+    async def get_hit():
+        return await repository.get(user_id)
+
+    results = {}
+    for label, fn in (
+        ("select() execute", inline),
+        ("lambda_stmt execute", cached),
+        ("Session.get (identity miss)", get_miss),
+    ):
+        await fn()  # warm the compiled cache
+        results[label] = await time_async(fn, iterations)
+
+    await repository.get(user_id)
+    results["Session.get (identity hit)"] = await time_async(get_hit, iterations)
+    return results
+
+
+def print_report(title: str, results: Dict[str, float]):
+    baseline = next(iter(results.values()))
+    print(f"\n{title}")
+    for label, micros in results.items():
+        print(f"  {label:<32} {micros:>9.1f} us  ({baseline / micros:.1f}x)")
+
+
+async def main_async(args):
+    url = get_async_database_url(args.database_url or settings.DATABASE_URL)
+    engine = create_async_engine(url)
+    try:
+        async with AsyncSession(engine, expire_on_commit=False) as db:
+            user_id = await db.scalar(select(User.id).limit(1))
+            if user_id is None:
+                raise SystemExit("No users found, run benchmarks.explain_plans --seed first")
+
+            print_report("Statement construction", construction(user_id, args.iterations))
+            print_report("Lookup round trip", await round_trips(db, user_id, args.iterations))
+    finally:
+        await engine.dispose()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare inline selects with repository PK lookups")
+    parser.add_argument("--database-url", default=None, help="Defaults to DATABASE_URL")
+    parser.add_argument("--iterations", type=int, default=5000)
+    args = parser.parse_args()
+    asyncio.run(main_async(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,253 @@
+"""
+Concurrent buyers racing for a few hot cards
+
+Seeds one seller with a handful of listed cards and hundreds of funded
+buyers, then lets every buyer try to purchase a random hot card at once,
+each in its own session. Afterwards it checks that no card was sold
+twice, that money was neither created nor lost and that no balance went
+negative, and prints throughput and latency.
+
+--mode held takes the card's Redis checkout hold first, as the purchase
+endpoint does, so losers are refused without a database transaction
+(needs REDIS_URL). --mode naive replays the old read-check-write
+purchase for comparison; expect it to report double sells and lost
+balance updates.
+
+    alembic upgrade head
+    python -m benchmarks.purchase_race --buyers 500 --cards 5
+"""
+
+import argparse
+import asyncio
+import random
+import sys
+import time
+import uuid
+from typing import Dict, List
+
+from sqlalchemy import select, text
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+
+from app.core.config import settings
+from app.core.database import close_redis, get_async_database_url, init_redis
+from app.models.user import User
+from app.models.virtual_card import VirtualCard
+from app.services.checkout_holds import checkout_holds
+from app.services.marketplace_service import MarketplaceService, PurchaseFailed
+from benchmarks.load_test import percentile
+
+SEED_MARKER = "bench-purchase-"
+
+SEED_SQL = [
+    """
+    INSERT INTO users (id, email, username, password_hash, is_active, is_verified, is_premium,
+                       balance, total_earned, total_spent, failed_login_attempts, created_at, updated_at)
+    SELECT gen_random_uuid(), 'bench-purchase-' || g || '@example.com', 'bench-purchase-' || g, 'x',
+           true, true, false, CASE WHEN g = 0 THEN 0 ELSE :balance END, 0, 0, 0, now(), now()
+    FROM generate_series(0, :buyers) g
+    """,
+    """
+    INSERT INTO platform_accounts (id, user_id, platform, email, status, is_premium,
+                                   available_credits, total_credits, credits_used, allow_pooling,
+                                   min_pool_amount, max_pool_amount, created_at, updated_at)
+    SELECT gen_random_uuid(), u.id, 'CLAUDE', u.email, 'ACTIVE', false, 1000, 1000, 0, true,
+           1, 100, now(), now()
+    FROM users u
+    WHERE u.email = 'bench-purchase-0@example.com'
+    """,
+    """
+    INSERT INTO virtual_cards (id, card_number, cvv, expiry_date, seller_id, platform_account_id,
+                               initial_balance, current_balance, price_per_hour, total_charged,
+                               status, usage_count, base_price, current_price, demand_multiplier,
+                               created_at, activated_at, expires_at)
+    SELECT gen_random_uuid(), '8' || lpad(g::text, 15, '0'), '123', now() + interval '1 day',
+           pa.user_id, pa.id, 100, 100, :price, 0, 'ACTIVE', 0, :price, :price, 1.0,
+           now(), now(), now() + interval '1 day'
+    FROM generate_series(1, :cards) g
+    CROSS JOIN platform_accounts pa
+    WHERE pa.email = 'bench-purchase-0@example.com'
+    """,
+    """
+    INSERT INTO marketplace_listings (card_id, platform, seller_id, seller_username, available_balance,
+                                      price_per_hour, current_price, demand_multiplier,
+                                      utilization_percentage, created_at, expires_at)
+    SELECT vc.id, 'CLAUDE', vc.seller_id, 'bench-purchase-0', vc.current_balance, vc.price_per_hour,
+           vc.current_price, vc.demand_multiplier, 0, vc.created_at, vc.expires_at
+    FROM virtual_cards vc
+    WHERE vc.card_number LIKE '8%' AND vc.seller_id IN (
+        SELECT id FROM users WHERE email = 'bench-purchase-0@example.com'
+    )
+    """,
+]
+
+CLEANUP_SQL = [
+    "DELETE FROM virtual_cards WHERE seller_id IN (SELECT id FROM users WHERE email LIKE 'bench-purchase-%')",
+    "DELETE FROM platform_accounts WHERE user_id IN (SELECT id FROM users WHERE email LIKE 'bench-purchase-%')",
+    "DELETE FROM users WHERE email LIKE 'bench-purchase-%'",
+]
+
+
+async def naive_purchase(db: AsyncSession, buyer_id: uuid.UUID, card_id: uuid.UUID, hours: int):
+    """The purchase as it used to be: read, check in Python, write back"""
+    card = await db.get(VirtualCard, card_id)
+    if card.buyer_id is not None:
+        raise PurchaseFailed(PurchaseFailed.SOLD, card_id)
+    buyer = await db.get(User, buyer_id)
+    total_cost = card.current_price * hours
+    if buyer.balance < total_cost:
+        raise PurchaseFailed(PurchaseFailed.INSUFFICIENT_BALANCE, card_id)
+
+    card.buyer_id = buyer.id
+    buyer.balance -= total_cost
+    buyer.total_spent += total_cost
+    seller = await db.get(User, card.seller_id)
+    seller.balance += total_cost
+    seller.total_earned += total_cost
+    await db.execute(text("DELETE FROM marketplace_listings WHERE card_id = :id"), {"id": card_id})
+    await db.commit()
+
+
+async def held_purchase(db: AsyncSession, buyer_id: uuid.UUID, card_id: uuid.UUID, hours: int):
+    """The purchase endpoint's path: checkout hold, then the atomic purchase"""
+    acquired, _ = await checkout_holds.reserve(card_id, buyer_id, exclusive=False)
+    if not acquired:
+        raise PurchaseFailed("held", card_id)
+    try:
+        await MarketplaceService(db).purchase(buyer_id, card_id, hours)
+    finally:
+        await checkout_holds.release(card_id, buyer_id)
+
+
+async def race(engine, mode: str, buyers: List[uuid.UUID], cards: List[uuid.UUID], hours: int):
+    outcomes: Dict[str, int] = {}
+    latencies: List[float] = []
+    winners: Dict[uuid.UUID, int] = {}
+    start_line = asyncio.Event()
+
+    async def buyer(buyer_id: uuid.UUID):
+        card_id = random.choice(cards)
+        await start_line.wait()
+        start = time.perf_counter()
+        async with AsyncSession(bind=engine, expire_on_commit=False, autoflush=False) as db:
+            try:
+                if mode == "naive":
+                    await naive_purchase(db, buyer_id, card_id, hours)
+                elif mode == "held":
+                    await held_purchase(db, buyer_id, card_id, hours)
+                else:
+                    await MarketplaceService(db).purchase(buyer_id, card_id, hours)
+                outcome = "purchased"
+                winners[card_id] = winners.get(card_id, 0) + 1
+            except PurchaseFailed as e:
+                outcome = e.reason
+            except Exception as e:
+                outcome = type(e).__name__
+        latencies.append(time.perf_counter() - start)
+        outcomes[outcome] = outcomes.get(outcome, 0) + 1
+
+    tasks = [asyncio.create_task(buyer(buyer_id)) for buyer_id in buyers]
+    await asyncio.sleep(0)
+    started = time.perf_counter()
+    start_line.set()
+    await asyncio.gather(*tasks)
+    elapsed = time.perf_counter() - started
+    return outcomes, latencies, winners, elapsed
+
+
+async def check_invariants(engine, expected_total: float, reported_wins: Dict[uuid.UUID, int]) -> List[str]:
+    problems = []
+    async with engine.connect() as conn:
+        sold = (await conn.execute(text(
+            """
+            SELECT count(*) FROM virtual_cards vc JOIN users s ON s.id = vc.seller_id
+            WHERE s.email LIKE 'bench-purchase-%' AND vc.buyer_id IS NOT NULL
+            """
+        ))).scalar()
+        total, negatives, spent, earned = (await conn.execute(text(
+            """
+            SELECT coalesce(sum(balance), 0), count(*) FILTER (WHERE balance < 0),
+                   coalesce(sum(total_spent), 0), coalesce(sum(total_earned), 0)
+            FROM users WHERE email LIKE 'bench-purchase-%'
+            """
+        ))).one()
+
+    double_sold = sum(1 for wins in reported_wins.values() if wins > 1)
+    if double_sold or sum(reported_wins.values()) != sold:
+        problems.append(f"{sum(reported_wins.values())} purchases reported for {sold} sold cards "
+                        f"({double_sold} cards sold more than once)")
+    if abs(total - expected_total) > 1e-6:
+        problems.append(f"balances sum to {total:.2f}, expected {expected_total:.2f}")
+    if abs(spent - earned) > 1e-6:
+        problems.append(f"buyers spent {spent:.2f} but the seller earned {earned:.2f}")
+    if negatives:
+        problems.append(f"{negatives} negative balance(s)")
+    return problems
+
+
+async def main_async(args) -> int:
+    url = get_async_database_url(args.database_url or settings.DATABASE_URL)
+    engine = create_async_engine(url, pool_size=args.pool_size, max_overflow=0)
+    if args.mode == "held":
+        await init_redis()
+    try:
+        async with engine.begin() as conn:
+            for statement in CLEANUP_SQL:
+                await conn.execute(text(statement))
+            for statement in SEED_SQL:
+                params = {
+                    name: value for name, value in {
+                        "buyers": args.buyers, "cards": args.cards,
+                        "balance": args.balance, "price": args.price,
+                    }.items() if f":{name}" in statement
+                }
+                await conn.execute(text(statement), params)
+
+        async with AsyncSession(bind=engine) as db:
+            buyers = list((await db.execute(
+                select(User.id).where(User.email.like(f"{SEED_MARKER}%"), User.balance > 0)
+            )).scalars())
+            cards = list((await db.execute(
+                select(VirtualCard.id).join(User, User.id == VirtualCard.seller_id)
+                .where(User.email.like(f"{SEED_MARKER}%"))
+            )).scalars())
+
+        outcomes, latencies, winners, elapsed = await race(engine, args.mode, buyers, cards, args.hours)
+        problems = await check_invariants(engine, args.buyers * args.balance, winners)
+    finally:
+        if not args.keep:
+            async with engine.begin() as conn:
+                for statement in CLEANUP_SQL:
+                    await conn.execute(text(statement))
+        await engine.dispose()
+        if args.mode == "held":
+            await close_redis()
+
+    print(f"{args.mode}: {len(buyers)} buyers, {len(cards)} cards, pool {args.pool_size}")
+    print(f"  elapsed      {elapsed * 1000:.0f} ms ({len(latencies) / elapsed:.0f} attempts/s)")
+    print(f"  latency p50  {percentile(latencies, 50) * 1000:.1f} ms")
+    print(f"  latency p99  {percentile(latencies, 99) * 1000:.1f} ms")
+    print(f"  outcomes     {dict(sorted(outcomes.items()))}")
+    for problem in problems:
+        print(f"  FAIL {problem}")
+    if not problems:
+        print("  ok   every card sold at most once, balances conserved, none negative")
+    return 1 if problems else 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Concurrent purchases of a few hot cards")
+    parser.add_argument("--database-url", default=None, help="Defaults to DATABASE_URL")
+    parser.add_argument("--mode", choices=["atomic", "held", "naive"], default="atomic")
+    parser.add_argument("--buyers", type=int, default=500)
+    parser.add_argument("--cards", type=int, default=5)
+    parser.add_argument("--balance", type=float, default=10.0)
+    parser.add_argument("--price", type=float, default=2.0)
+    parser.add_argument("--hours", type=int, default=1)
+    parser.add_argument("--pool-size", type=int, default=50)
+    parser.add_argument("--keep", action="store_true", help="Leave the seeded rows in place")
+    args = parser.parse_args()
+    sys.exit(asyncio.run(main_async(args)))
+
+
+if __name__ == "__main__":
+    main()
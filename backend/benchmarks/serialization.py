@@ -0,0 +1,132 @@
+"""
+Response serialization benchmark
+
+Encodes the same synthetic marketplace listings page three ways and
+reports wall time and output size per run:
+
+- legacy: the old endpoint path, a dict per row with isoformat() and
+  str() conversions, then jsonable_encoder and json.dumps as FastAPI's
+  default JSONResponse does
+- typed: rows validated through MarketplaceListingsResponse and rendered
+  with ORJSONResponse, as the endpoint does now
+- stream: stream_json_array over row mappings in fixed partitions, as
+  /my-purchases and /my-sales do; also reports time to the first chunk
+
+Runs in-process with no database.
+
+    python -m benchmarks.serialization --rows 10000
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import time
+import uuid
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, List
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import ORJSONResponse
+
+from app.api.v1.endpoints.marketplace import MarketplaceListingsResponse, STREAM_PARTITION_SIZE
+from app.core.responses import stream_json_array
+from app.models.platform_account import PlatformType
+
+
+def make_rows(count: int) -> List[Dict[str, Any]]:
+    now = datetime.utcnow()
+    platforms = list(PlatformType)
+    rows = []
+    for _ in range(count):
+        rows.append({
+            "card_id": uuid.uuid4(),
+            "platform": random.choice(platforms),
+            "seller_username": f"seller{random.randint(1, 1000)}",
+            "available_balance": round(random.uniform(10, 500), 2),
+            "price_per_hour": round(random.uniform(0.5, 20), 2),
+            "current_price": round(random.uniform(0.5, 20), 2),
+            "demand_multiplier": round(random.uniform(0.8, 2.0), 2),
+            "created_at": now - timedelta(hours=random.randint(1, 72)),
+            "expires_at": now + timedelta(hours=random.randint(1, 72)),
+            "utilization_percentage": round(random.uniform(0, 100), 2),
+        })
+    return rows
+
+
+def legacy(rows: List[Dict[str, Any]]) -> bytes:
+    listings = []
+    for row in rows:
+        listings.append({
+            **row,
+            "card_id": str(row["card_id"]),
+            "created_at": row["created_at"].isoformat(),
+            "expires_at": row["expires_at"].isoformat(),
+        })
+    content = {"listings": listings, "total_count": len(listings), "total_count_exact": True,
+               "limit": len(listings), "sort": "price", "next_cursor": None}
+    return json.dumps(
+        jsonable_encoder(content), ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":")
+    ).encode("utf-8")
+
+
+def typed(rows: List[Dict[str, Any]]) -> bytes:
+    content = {"listings": rows, "total_count": len(rows), "total_count_exact": True,
+               "limit": len(rows), "sort": "price", "next_cursor": None}
+    # FastAPI validates the return value against response_model and dumps it in json mode
+    validated = MarketplaceListingsResponse.model_validate(content)
+    return ORJSONResponse(validated.model_dump(mode="json")).body
+
+
+async def stream(rows: List[Dict[str, Any]]) -> Dict[str, float]:
+    async def partitions():
+        for i in range(0, len(rows), STREAM_PARTITION_SIZE):
+            yield rows[i:i + STREAM_PARTITION_SIZE]
+
+    response = stream_json_array({}, "listings", partitions())
+    start = time.perf_counter()
+    first = None
+    size = 0
+    async for chunk in response.body_iterator:
+        if first is None:
+            first = time.perf_counter() - start
+        size += len(chunk)
+    return {"seconds": time.perf_counter() - start, "first_chunk": first or 0.0, "bytes": size}
+
+
+def measure(fn: Callable[[List[Dict[str, Any]]], bytes], rows, runs: int) -> Dict[str, float]:
+    fn(rows)
+    start = time.perf_counter()
+    for _ in range(runs):
+        body = fn(rows)
+    return {"seconds": (time.perf_counter() - start) / runs, "bytes": len(body)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare response serialization paths")
+    parser.add_argument("--rows", type=int, default=10000)
+    parser.add_argument("--runs", type=int, default=10)
+    args = parser.parse_args()
+
+    rows = make_rows(args.rows)
+    results = {
+        "legacy": measure(legacy, rows, args.runs),
+        "typed": measure(typed, rows, args.runs),
+    }
+    streamed = [asyncio.run(stream(rows)) for _ in range(args.runs)]
+    results["stream"] = {
+        "seconds": sum(r["seconds"] for r in streamed) / args.runs,
+        "first_chunk": sum(r["first_chunk"] for r in streamed) / args.runs,
+        "bytes": streamed[-1]["bytes"],
+    }
+
+    print(f"{args.rows} rows, mean of {args.runs} runs")
+    for name, result in results.items():
+        line = f"  {name:<8} {result['seconds'] * 1000:>8.1f} ms  {result['bytes'] / 1024:>8.0f} KiB"
+        if "first_chunk" in result:
+            line += f"  first chunk {result['first_chunk'] * 1000:.2f} ms"
+        print(line)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""
+Shared test fixtures
+
+Like the benchmarks, these tests run against live services: Redis at
+REDIS_URL and PostgreSQL at TEST_DATABASE_URL, a throwaway database whose
+tables are dropped and recreated. Tests whose service is not configured
+or reachable are skipped.
+"""
+
+import asyncio
+import os
+
+TEST_DATABASE_URL = os.environ.get("TEST_DATABASE_URL")
+if TEST_DATABASE_URL:
+    os.environ["DATABASE_URL"] = TEST_DATABASE_URL
+    os.environ["DATABASE_REPLICA_URLS"] = "[]"
+os.environ.setdefault("ALLOWED_HOSTS", '["*"]')
+os.environ.setdefault("RATE_LIMIT_ENABLED", "false")
+
+import pytest
+import redis
+from sqlalchemy import text
+from app.core.config import settings
+from app.core.database import Base, close_redis, engine
+
+@pytest.fixture
+def run():
+    """Run a coroutine to completion, then close the shared pools
+
+    Pooled connections are bound to the event loop that opened them, so
+    each test starts from empty pools on a fresh loop.
+    """
+    def _run(coroutine):
+        async def main():
+            try:
+                return await coroutine
+            finally:
+                await close_redis()
+                await engine.dispose()
+        return asyncio.run(main())
+    return _run
+
+@pytest.fixture(scope="session")
+def redis_server():
+    client = redis.Redis.from_url(settings.REDIS_URL, socket_connect_timeout=1)
+    try:
+        client.ping()
+    except redis.RedisError as e:
+        pytest.skip(f"Redis is not reachable: {e}")
+    finally:
+        client.close()
+
+@pytest.fixture(scope="session")
+def schema():
+    """Fresh tables for every model, created once per run"""
+    if not TEST_DATABASE_URL:
+        pytest.skip("TEST_DATABASE_URL is not set")
+    # Registers every model and router
+    import app.main  # noqa: F401
+
+    async def create():
+        try:
+            async with engine.begin() as conn:
+                await conn.run_sync(Base.metadata.drop_all)
+                await conn.run_sync(Base.metadata.create_all)
+        finally:
+            await engine.dispose()
+
+    try:
+        asyncio.run(create())
+    except OSError as e:
+        pytest.skip(f"Database is not reachable: {e}")
+
+@pytest.fixture
+def database(schema):
+    """Empty tables for one test"""
+    yield
+
+    async def truncate():
+        tables = ", ".join(table.name for table in Base.metadata.sorted_tables)
+        try:
+            async with engine.begin() as conn:
+                await conn.execute(text(f"TRUNCATE {tables} RESTART IDENTITY CASCADE"))
+        finally:
+            await engine.dispose()
+
+    asyncio.run(truncate())
@@ -0,0 +1,73 @@
+"""
+Rows for tests, written through the models and the listings read model
+"""
+
+import itertools
+from datetime import datetime, timedelta
+from typing import Dict
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.security import create_access_token
+from app.models.platform_account import AccountStatus, PlatformAccount, PlatformType
+from app.models.user import User
+from app.models.virtual_card import CardStatus, VirtualCard
+from app.repositories.listing import ListingRepository
+
+_sequence = itertools.count(1)
+
+async def create_user(db: AsyncSession, balance: float = 0.0, **values) -> User:
+    n = next(_sequence)
+    user = User(
+        email=f"user{n}@example.com",
+        username=f"user{n}",
+        password_hash="x",
+        balance=balance,
+        **values
+    )
+    db.add(user)
+    await db.flush()
+    return user
+
+async def create_account(db: AsyncSession, user: User, platform: PlatformType = PlatformType.CLAUDE) -> PlatformAccount:
+    account = PlatformAccount(
+        user_id=user.id,
+        platform=platform,
+        email=user.email,
+        status=AccountStatus.ACTIVE
+    )
+    db.add(account)
+    await db.flush()
+    return account
+
+async def create_card(
+    db: AsyncSession,
+    account: PlatformAccount,
+    price: float = 1.0,
+    balance: float = 100.0,
+    **values
+) -> VirtualCard:
+    """A card on the marketplace, listed in the same transaction"""
+    n = next(_sequence)
+    now = datetime.utcnow()
+    card = VirtualCard(
+        card_number=f"4{n:015d}",
+        cvv="123",
+        expiry_date=now + timedelta(days=30),
+        seller_id=account.user_id,
+        platform_account_id=account.id,
+        initial_balance=balance,
+        current_balance=balance,
+        price_per_hour=price,
+        base_price=price,
+        current_price=price,
+        status=CardStatus.ACTIVE,
+        created_at=now,
+        expires_at=now + timedelta(days=1),
+        **values
+    )
+    db.add(card)
+    await db.flush()
+    await ListingRepository(db).sync(card)
+    return card
+
+def auth_headers(user: User) -> Dict[str, str]:
+    return {"Authorization": f"Bearer {create_access_token({'sub': str(user.id)})}"}
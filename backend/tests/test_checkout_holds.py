@@ -0,0 +1,89 @@
+"""
+Checkout holds: one explicit reservation per buyer, purchases alongside it
+"""
+
+import uuid
+import httpx
+from app.core.database import AsyncSessionLocal, init_redis
+from app.main import app
+from app.services.checkout_holds import checkout_holds
+from tests.factories import auth_headers, create_account, create_card, create_user
+
+async def holders(*card_ids):
+    holds = await checkout_holds.holds(card_ids)
+    return [holds[str(card_id)].buyer_id if str(card_id) in holds else None for card_id in card_ids]
+
+def test_a_new_reservation_replaces_the_previous_one(run, redis_server):
+    async def scenario():
+        await init_redis()
+        buyer, first, second = str(uuid.uuid4()), uuid.uuid4(), uuid.uuid4()
+        try:
+            assert (await checkout_holds.reserve(first, buyer))[0]
+            assert (await checkout_holds.reserve(second, buyer))[0]
+            assert await holders(first, second) == [None, buyer]
+        finally:
+            await checkout_holds.release(second, buyer)
+
+    run(scenario())
+
+def test_purchase_holds_leave_the_reservation_alone(run, redis_server):
+    async def scenario():
+        await init_redis()
+        buyer, reserved, bought, later = str(uuid.uuid4()), uuid.uuid4(), uuid.uuid4(), uuid.uuid4()
+        try:
+            assert (await checkout_holds.reserve(reserved, buyer))[0]
+
+            assert (await checkout_holds.reserve(bought, buyer, exclusive=False))[0]
+            assert await holders(reserved, bought) == [buyer, buyer]
+            assert await checkout_holds.release(bought, buyer)
+            assert await holders(reserved, bought) == [buyer, None]
+
+            # Still the buyer's one reservation
+            assert (await checkout_holds.reserve(later, buyer))[0]
+            assert await holders(reserved, later) == [None, buyer]
+        finally:
+            await checkout_holds.release(later, buyer)
+
+    run(scenario())
+
+def test_purchase_of_the_reserved_card_releases_it(run, redis_server):
+    async def scenario():
+        await init_redis()
+        buyer, card = str(uuid.uuid4()), uuid.uuid4()
+
+        assert (await checkout_holds.reserve(card, buyer))[0]
+        assert (await checkout_holds.reserve(card, buyer, exclusive=False))[0]
+        assert await checkout_holds.release(card, buyer)
+        assert await holders(card) == [None]
+
+    run(scenario())
+
+def test_purchase_endpoint_keeps_another_reservation(run, database, redis_server):
+    async def scenario():
+        await init_redis()
+        async with AsyncSessionLocal() as db:
+            seller = await create_user(db)
+            buyer = await create_user(db, balance=100.0)
+            account = await create_account(db, seller)
+            reserved, bought = await create_card(db, account), await create_card(db, account)
+            await db.commit()
+
+        try:
+            async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as http:
+                response = await http.post(
+                    "/api/v1/marketplace/reserve", json={"card_id": str(reserved.id)}, headers=auth_headers(buyer)
+                )
+                assert response.status_code == 200, response.text
+
+                response = await http.post(
+                    "/api/v1/marketplace/purchase",
+                    json={"card_id": str(bought.id), "amount": 1.0, "duration_hours": 1},
+                    headers=auth_headers(buyer)
+                )
+                assert response.status_code == 200, response.text
+
+            assert await holders(reserved.id, bought.id) == [str(buyer.id), None]
+        finally:
+            await checkout_holds.release(reserved.id, buyer.id)
+
+    run(scenario())
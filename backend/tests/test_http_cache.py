@@ -0,0 +1,40 @@
+"""
+Conditional GET on the public read endpoints
+"""
+
+import time
+import httpx
+import pytest
+from app.api.v1.endpoints.pricing import PRICING_ETAG_BUCKET_SECONDS
+from app.core.database import init_redis
+from app.main import app
+
+def client() -> httpx.AsyncClient:
+    return httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test")
+
+@pytest.mark.parametrize("path", [
+    "/api/v1/pricing/trends/claude",
+    "/api/v1/pricing/market-overview",
+])
+def test_pricing_etag_moves_with_the_time_window(run, database, redis_server, monkeypatch, path):
+    # Usage logs and the rolling windows bump no version; only the clock
+    # can tell a revalidation that demand or trends may have changed
+    now = time.time()
+    monkeypatch.setattr(time, "time", lambda: now)
+
+    async def scenario():
+        await init_redis()
+        async with client() as http:
+            response = await http.get(path)
+            assert response.status_code == 200, response.text
+            etag = response.headers["ETag"]
+
+            response = await http.get(path, headers={"If-None-Match": etag})
+            assert response.status_code == 304
+
+            monkeypatch.setattr(time, "time", lambda: now + PRICING_ETAG_BUCKET_SECONDS)
+            response = await http.get(path, headers={"If-None-Match": etag})
+            assert response.status_code == 200
+            assert response.headers["ETag"] != etag
+
+    run(scenario())
@@ -0,0 +1,77 @@
+"""
+Maintained listing counts and the listings total
+"""
+
+import httpx
+import pytest
+from app.core.database import AsyncSessionLocal, get_redis, init_redis
+from app.main import app
+from app.models.platform_account import PlatformType
+from app.services.listing_counts import COUNTS_KEY, listing_counts, price_bucket
+from tests.factories import create_account, create_card, create_user
+
+# With the default bucket width of 1.0
+COUNTS = {"chatgpt:0": 2, "chatgpt:1": 3, "chatgpt:2": 4, "claude:1": 5, "gemini:3": 0}
+
+def test_price_bucket_edges_belong_to_the_upper_bucket():
+    assert price_bucket(0.0) == 0
+    assert price_bucket(0.99) == 0
+    assert price_bucket(1.0) == 1
+    assert price_bucket(2.5) == 2
+
+@pytest.mark.parametrize("filters, expected", [
+    ({}, (14, True)),
+    ({"platform": PlatformType.CHATGPT}, (9, True)),
+    ({"platform": "claude"}, (5, True)),
+    # A lower bound on a bucket edge takes exactly the buckets above it
+    ({"min_price": 1.0}, (12, True)),
+    ({"min_price": 1.5}, (12, False)),
+    # max_price is inclusive, so its bucket always reaches past it...
+    ({"max_price": 2.0}, (14, False)),
+    ({"max_price": 1.99}, (10, False)),
+    # ...unless that bucket is empty
+    ({"max_price": 3.5}, (14, True)),
+    ({"platform": PlatformType.CHATGPT, "min_price": 1.0, "max_price": 1.5}, (3, False)),
+])
+def test_count_sums_buckets_and_flags_partial_ones(run, redis_server, filters, expected):
+    async def scenario():
+        await init_redis()
+        redis = get_redis()
+        await redis.delete(COUNTS_KEY)
+        await redis.hset(COUNTS_KEY, mapping=COUNTS)
+        try:
+            return await listing_counts.count(**filters)
+        finally:
+            await redis.delete(COUNTS_KEY)
+
+    assert run(scenario()) == expected
+
+def test_listings_total_matches_the_page_for_any_platform_case(run, database, redis_server):
+    async def scenario():
+        await init_redis()
+        async with AsyncSessionLocal() as db:
+            seller = await create_user(db)
+            for platform, count in ((PlatformType.CHATGPT, 3), (PlatformType.CLAUDE, 2)):
+                account = await create_account(db, seller, platform=platform)
+                for _ in range(count):
+                    await create_card(db, account, price=1.5)
+            await db.commit()
+        await listing_counts.rebuild()
+
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as http:
+            for platform in ("chatgpt", "ChatGPT"):
+                body = (await http.get("/api/v1/marketplace/listings", params={"platform": platform})).json()
+                assert len(body["listings"]) == body["total_count"] == 3
+                assert body["total_count_exact"]
+
+            # The balance filter has no counter, so the total is an upper bound
+            body = (await http.get("/api/v1/marketplace/listings", params={"min_balance": 500})).json()
+            assert body["listings"] == []
+            assert (body["total_count"], body["total_count_exact"]) == (5, False)
+
+            response = await http.get("/api/v1/marketplace/listings", params={"platform": "nope"})
+            assert response.status_code == 422
+
+        await get_redis().delete(COUNTS_KEY)
+
+    run(scenario())
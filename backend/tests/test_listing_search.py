@@ -0,0 +1,202 @@
+"""
+Listing snapshot search, incremental refresh and change log pruning
+"""
+
+import asyncio
+import uuid
+from datetime import datetime, timedelta
+from sqlalchemy import delete, func, insert, select
+from app.core.database import AsyncSessionLocal, get_redis, init_redis
+from app.models.listing import Listing, ListingChange
+from app.models.platform_account import PlatformType
+from app.services.listing_search import (
+    CHANGE_SETTLE_SECONDS, PRUNE_LOCK_KEY, ListingEntry, ListingFilters, ListingSnapshot
+)
+from tests.factories import create_account, create_card, create_user
+
+def snapshot(*entries: ListingEntry) -> ListingSnapshot:
+    listings = ListingSnapshot(reload_interval=300, retention=3600)
+    listings._entries = {entry.card_id: entry for entry in entries}
+    return listings
+
+def entry(
+    platform=PlatformType.CLAUDE,
+    seller="alice",
+    price=1.5,
+    balance=30.0,
+    hours_left=12.0,
+    card_id=None
+) -> ListingEntry:
+    now = datetime.utcnow()
+    return ListingEntry(
+        card_id or uuid.uuid4(), platform, seller, balance, price, price, None,
+        now, now + timedelta(hours=hours_left), 0.0
+    )
+
+def search(listings: ListingSnapshot, filters=None, sort_key="current_price", descending=False, after=None, limit=50):
+    return listings.search(filters or ListingFilters(), sort_key, descending, after, limit)
+
+def test_search_counts_each_facet_without_its_own_filter():
+    cheap = entry(price=0.5)
+    match = entry(price=3.0)
+    other_platform = entry(platform=PlatformType.CHATGPT, price=3.0)
+    other_seller = entry(seller="bob", price=3.0)
+    # Fails the platform and price filters, so it counts nowhere
+    two_misses = entry(platform=PlatformType.GEMINI, price=0.5)
+    listings = snapshot(cheap, match, other_platform, other_seller, two_misses)
+
+    result = search(listings, ListingFilters(
+        platforms={PlatformType.CLAUDE}, sellers={"alice"}, min_price=2.0
+    ))
+
+    assert [listing.card_id for listing in result.listings] == [match.card_id]
+    assert result.total_count == 1
+    assert result.facets["platform"] == {PlatformType.CLAUDE: 1, PlatformType.CHATGPT: 1}
+    # 0.5 is in the [0, 1) bucket, 3.0 in [2, 5)
+    assert result.facets["price"] == {0: 1, 2: 1}
+    assert result.facets["seller"] == {"alice": 1, "bob": 1}
+    assert result.facets["balance"] == {match.balance_bucket: 1}
+    assert sum(result.facets["expiry"].values()) == 1
+
+def test_search_filters_balance_and_hours_left_and_skips_expired():
+    short = entry(hours_left=0.5)
+    long = entry(hours_left=48.0)
+    poor = entry(balance=5.0, hours_left=48.0)
+    expired = entry(hours_left=-1.0)
+    listings = snapshot(short, long, poor, expired)
+
+    result = search(listings, ListingFilters(min_balance=10.0, min_hours_left=1.0))
+
+    assert [listing.card_id for listing in result.listings] == [long.card_id]
+    # Buckets [0, 1h) and [24h, 168h); the expired card is in neither
+    assert result.facets["expiry"] == {0: 1, 3: 1}
+    assert result.facets["balance"] == {0: 1, long.balance_bucket: 1}
+
+def test_search_pages_by_sort_value_then_card_id():
+    ids = sorted(uuid.uuid4() for _ in range(3))
+    entries = [entry(price=2.0, card_id=ids[1]), entry(price=1.0, card_id=ids[2]), entry(price=2.0, card_id=ids[0])]
+    listings = snapshot(*entries)
+
+    first = search(listings, limit=2)
+    assert [listing.card_id for listing in first.listings] == [ids[2], ids[0]]
+    assert first.has_more
+    last = first.listings[-1]
+    rest = search(listings, after=(last.current_price, last.card_id), limit=2)
+    assert [listing.card_id for listing in rest.listings] == [ids[1]]
+    assert not rest.has_more
+    assert rest.total_count == 3
+
+    descending = search(listings, descending=True, limit=3)
+    assert [listing.card_id for listing in descending.listings] == [ids[1], ids[0], ids[2]]
+
+async def add_card(price: float = 1.0):
+    async with AsyncSessionLocal() as db:
+        seller = await create_user(db)
+        card = await create_card(db, await create_account(db, seller), price=price)
+        await db.commit()
+    return card
+
+async def log_change(card_id, age_seconds: float = 0.0, seq=None):
+    async with AsyncSessionLocal() as db:
+        values = {"card_id": card_id, "created_at": datetime.utcnow() - timedelta(seconds=age_seconds)}
+        if seq is not None:
+            values["seq"] = seq
+        await db.execute(insert(ListingChange).values(**values))
+        await db.commit()
+
+async def max_seq() -> int:
+    async with AsyncSessionLocal() as db:
+        return await db.scalar(select(func.max(ListingChange.seq)))
+
+def test_apply_changes_rereads_unsettled_changes(run, database):
+    async def scenario():
+        listings = ListingSnapshot(reload_interval=300, retention=3600)
+        await listings._reload()
+        start = listings._settled_seq
+
+        card = await add_card()
+        await listings._apply_changes()
+        assert card.id in listings._entries
+        # Too recent to settle: kept above the mark and remembered as applied
+        assert listings._settled_seq == start
+        assert listings._applied == {await max_seq()}
+
+        # An applied change is not fetched again
+        async with AsyncSessionLocal() as db:
+            await db.execute(delete(Listing).where(Listing.card_id == card.id))
+            await db.commit()
+        await listings._apply_changes()
+        assert card.id in listings._entries
+
+        # A lower sequence number committed late is still picked up
+        top = await max_seq()
+        await log_change(card.id, seq=top + 10)
+        await listings._apply_changes()
+        late = await add_card(price=2.0)
+        async with AsyncSessionLocal() as db:
+            await db.execute(delete(ListingChange).where(ListingChange.card_id == late.id))
+            await db.commit()
+        await log_change(late.id, seq=top + 5)
+        await listings._apply_changes()
+        assert late.id in listings._entries
+        assert listings._settled_seq == start
+
+    run(scenario())
+
+def test_apply_changes_settles_old_changes(run, database):
+    async def scenario():
+        listings = ListingSnapshot(reload_interval=300, retention=3600)
+        await listings._reload()
+
+        card = await add_card()
+        await log_change(card.id, age_seconds=CHANGE_SETTLE_SECONDS + 1)
+        settled = await max_seq()
+        await log_change(card.id)
+
+        await listings._apply_changes()
+        assert listings._settled_seq == settled
+        assert listings._applied == {settled + 1}
+
+    run(scenario())
+
+def test_apply_changes_reloads_after_a_rebuild(run, database):
+    async def scenario():
+        listings = ListingSnapshot(reload_interval=300, retention=3600)
+        await listings._reload()
+        listings._entries[uuid.uuid4()] = entry()
+
+        card = await add_card()
+        await log_change(None)
+        await listings._apply_changes()
+
+        assert list(listings._entries) == [card.id]
+        assert listings._settled_seq == await max_seq()
+        assert listings._applied == set()
+
+    run(scenario())
+
+def test_change_log_is_pruned_without_searches(run, database, redis_server):
+    async def scenario():
+        await init_redis()
+        await get_redis().delete(PRUNE_LOCK_KEY)
+        card = await add_card()
+        await log_change(card.id, age_seconds=7200)
+
+        listings = ListingSnapshot(reload_interval=300, retention=3600)
+        await listings.start()
+        try:
+            for _ in range(100):
+                async with AsyncSessionLocal() as db:
+                    ages = (await db.execute(select(ListingChange.created_at))).scalars().all()
+                if len(ages) == 1:
+                    break
+                await asyncio.sleep(0.05)
+        finally:
+            await listings.stop()
+            await get_redis().delete(PRUNE_LOCK_KEY)
+
+        # Only the change logged when the card was listed is recent enough to keep
+        assert len(ages) == 1
+        assert not listings.loaded
+
+    run(scenario())
@@ -0,0 +1,175 @@
+"""
+Batch purchases and buy orders through MarketplaceService
+"""
+
+import uuid
+from sqlalchemy import select
+from app.core.database import AsyncSessionLocal, init_redis
+from app.models.listing import Listing
+from app.models.platform_account import PlatformType
+from app.models.user import User
+from app.models.virtual_card import VirtualCard
+from app.services.checkout_holds import checkout_holds
+from app.services.marketplace_service import PURCHASED, MarketplaceService, PurchaseFailed
+from tests.factories import create_account, create_card, create_user
+
+async def seed(buyer_balance: float, prices):
+    """A seller listing one card per price and a funded buyer"""
+    async with AsyncSessionLocal() as db:
+        seller = await create_user(db)
+        buyer = await create_user(db, balance=buyer_balance)
+        account = await create_account(db, seller)
+        cards = [await create_card(db, account, price=price) for price in prices]
+        await db.commit()
+    return seller, buyer, cards
+
+async def purchase_batch(buyer_id, lines, all_or_nothing: bool):
+    async with AsyncSessionLocal() as db:
+        return await MarketplaceService(db).purchase_batch(buyer_id, lines, all_or_nothing=all_or_nothing)
+
+async def purchase_order(buyer_id, quantity: int, max_price: float, all_or_nothing: bool):
+    async with AsyncSessionLocal() as db:
+        return await MarketplaceService(db).purchase_order(
+            buyer_id, PlatformType.CLAUDE, quantity, 1, max_price, all_or_nothing=all_or_nothing
+        )
+
+async def owners(cards):
+    """buyer_id of each card, in order"""
+    async with AsyncSessionLocal() as db:
+        buyers = dict((await db.execute(
+            select(VirtualCard.id, VirtualCard.buyer_id).where(VirtualCard.id.in_([card.id for card in cards]))
+        )).all())
+    return [buyers[card.id] for card in cards]
+
+async def listed(cards):
+    async with AsyncSessionLocal() as db:
+        card_ids = set((await db.execute(
+            select(Listing.card_id).where(Listing.card_id.in_([card.id for card in cards]))
+        )).scalars())
+    return [card.id in card_ids for card in cards]
+
+async def balance(user) -> float:
+    async with AsyncSessionLocal() as db:
+        return (await db.get(User, user.id)).balance
+
+def statuses(result):
+    return [line.status for line in result.lines]
+
+def test_all_or_nothing_buys_every_line(run, database):
+    async def scenario():
+        seller, buyer, cards = await seed(100.0, [1.0, 2.0, 3.0])
+
+        result = await purchase_batch(buyer.id, [(card.id, 2) for card in cards], all_or_nothing=True)
+
+        assert result.success
+        assert statuses(result) == [PURCHASED] * 3
+        assert result.total_cost == 12.0
+        assert result.remaining_balance == 88.0
+        assert [line.purchase.card_id for line in result.lines] == [card.id for card in cards]
+        assert await owners(cards) == [buyer.id] * 3
+        assert await listed(cards) == [False] * 3
+        assert await balance(buyer) == 88.0
+        assert await balance(seller) == 12.0
+
+    run(scenario())
+
+def test_all_or_nothing_aborts_the_rest_when_a_line_is_refused(run, database):
+    async def scenario():
+        seller, buyer, cards = await seed(100.0, [1.0, 1.0, 1.0])
+        _, rival, _ = await seed(100.0, [])
+        await purchase_batch(rival.id, [(cards[1].id, 1)], all_or_nothing=True)
+
+        result = await purchase_batch(buyer.id, [(card.id, 1) for card in cards], all_or_nothing=True)
+
+        assert not result.success
+        assert statuses(result) == [PurchaseFailed.ABORTED, PurchaseFailed.SOLD, PurchaseFailed.ABORTED]
+        assert all(line.purchase is None for line in result.lines)
+        assert result.total_cost == 0.0
+        assert await owners(cards) == [None, rival.id, None]
+        assert await listed(cards) == [True, False, True]
+        assert await balance(buyer) == 100.0
+        assert await balance(seller) == 1.0
+
+    run(scenario())
+
+def test_all_or_nothing_aborts_when_the_balance_runs_out(run, database):
+    async def scenario():
+        seller, buyer, cards = await seed(5.0, [2.0, 2.0, 2.0])
+
+        result = await purchase_batch(buyer.id, [(card.id, 1) for card in cards], all_or_nothing=True)
+
+        assert statuses(result) == [
+            PurchaseFailed.ABORTED, PurchaseFailed.ABORTED, PurchaseFailed.INSUFFICIENT_BALANCE
+        ]
+        assert await owners(cards) == [None, None, None]
+        assert await listed(cards) == [True, True, True]
+        assert await balance(buyer) == 5.0
+        assert await balance(seller) == 0.0
+
+    run(scenario())
+
+def test_best_effort_releases_unaffordable_lines(run, database):
+    async def scenario():
+        seller, buyer, cards = await seed(5.0, [2.0, 2.0, 2.0])
+
+        result = await purchase_batch(buyer.id, [(card.id, 1) for card in cards], all_or_nothing=False)
+
+        assert not result.success
+        assert statuses(result) == [PURCHASED, PURCHASED, PurchaseFailed.INSUFFICIENT_BALANCE]
+        assert result.total_cost == 4.0
+        assert result.remaining_balance == 1.0
+        # The unaffordable card goes back on the market
+        assert await owners(cards) == [buyer.id, buyer.id, None]
+        assert await listed(cards) == [False, False, True]
+        assert await balance(buyer) == 1.0
+        assert await balance(seller) == 4.0
+
+    run(scenario())
+
+def test_duplicate_reserved_and_unknown_lines(run, database, redis_server):
+    async def scenario():
+        await init_redis()
+        _, buyer, cards = await seed(100.0, [1.0, 1.0])
+        _, rival, _ = await seed(100.0, [])
+        acquired, _ = await checkout_holds.reserve(cards[1].id, rival.id)
+        assert acquired
+
+        try:
+            lines = [(cards[0].id, 1), (cards[0].id, 1), (cards[1].id, 1), ("bogus", 1), (uuid.uuid4(), 1)]
+            refused = [PurchaseFailed.DUPLICATE, PurchaseFailed.RESERVED, PurchaseFailed.NOT_FOUND]
+
+            # Refused before any claim; an unknown but well-formed id is only
+            # found missing by the claim, which never runs
+            result = await purchase_batch(buyer.id, lines, all_or_nothing=True)
+            assert statuses(result) == [PurchaseFailed.ABORTED] + refused + [PurchaseFailed.ABORTED]
+            assert await owners(cards) == [None, None]
+
+            result = await purchase_batch(buyer.id, lines, all_or_nothing=False)
+            assert statuses(result) == [PURCHASED] + refused + [PurchaseFailed.NOT_FOUND]
+            assert result.total_cost == 1.0
+            assert await owners(cards) == [buyer.id, None]
+        finally:
+            await checkout_holds.release(cards[1].id, rival.id)
+
+    run(scenario())
+
+def test_order_buys_the_cheapest_and_counts_unfilled(run, database):
+    async def scenario():
+        _, buyer, cards = await seed(100.0, [3.0, 1.0, 2.0, 9.0])
+
+        result = await purchase_order(buyer.id, quantity=5, max_price=5.0, all_or_nothing=True)
+        assert result.unfilled == 2
+        assert statuses(result) == [PurchaseFailed.ABORTED] * 3
+        assert await owners(cards) == [None] * 4
+
+        result = await purchase_order(buyer.id, quantity=5, max_price=5.0, all_or_nothing=False)
+        assert result.unfilled == 2
+        assert statuses(result) == [PURCHASED] * 3
+        assert [line.purchase.total_cost for line in result.lines] == [1.0, 2.0, 3.0]
+        assert await owners(cards) == [buyer.id, buyer.id, buyer.id, None]
+
+        result = await purchase_order(buyer.id, quantity=1, max_price=5.0, all_or_nothing=False)
+        assert result.unfilled == 1
+        assert result.lines == []
+
+    run(scenario())
@@ -0,0 +1,118 @@
+"""
+Single-card purchases through MarketplaceService
+"""
+
+import asyncio
+import uuid
+import pytest
+from sqlalchemy import select
+from app.core.database import AsyncSessionLocal
+from app.models.listing import Listing
+from app.models.user import User
+from app.models.virtual_card import VirtualCard
+from app.services.marketplace_service import MarketplaceService, PurchaseFailed, PurchaseResult
+from tests.factories import create_account, create_card, create_user
+
+async def seed(buyer_balances, price: float, seller_id=None, buyer_ids=None):
+    """A seller with one listed card and funded buyers"""
+    async with AsyncSessionLocal() as db:
+        seller = await create_user(db, **({"id": seller_id} if seller_id else {}))
+        buyers = [
+            await create_user(db, balance=balance, **({"id": buyer_ids[i]} if buyer_ids else {}))
+            for i, balance in enumerate(buyer_balances)
+        ]
+        card = await create_card(db, await create_account(db, seller), price=price)
+        await db.commit()
+    return seller, buyers, card
+
+async def purchase(buyer_id, card_id, hours: int = 1):
+    async with AsyncSessionLocal() as db:
+        return await MarketplaceService(db).purchase(buyer_id, card_id, hours)
+
+async def load(model, pk):
+    async with AsyncSessionLocal() as db:
+        return await db.get(model, pk)
+
+async def listed(card_id) -> bool:
+    async with AsyncSessionLocal() as db:
+        return await db.scalar(select(Listing.card_id).where(Listing.card_id == card_id)) is not None
+
+def test_concurrent_buyers_leave_one_winner(run, database):
+    async def scenario():
+        seller, buyers, card = await seed([100.0] * 10, price=2.0)
+
+        outcomes = await asyncio.gather(
+            *(purchase(buyer.id, card.id, hours=3) for buyer in buyers),
+            return_exceptions=True
+        )
+
+        wins = [outcome for outcome in outcomes if isinstance(outcome, PurchaseResult)]
+        losses = [outcome for outcome in outcomes if isinstance(outcome, PurchaseFailed)]
+        assert len(wins) == 1
+        assert len(losses) == 9
+        assert {loss.reason for loss in losses} == {PurchaseFailed.SOLD}
+
+        winner = buyers[outcomes.index(wins[0])]
+        assert (await load(VirtualCard, card.id)).buyer_id == winner.id
+        for buyer in buyers:
+            expected = 94.0 if buyer is winner else 100.0
+            assert (await load(User, buyer.id)).balance == expected
+        assert (await load(User, seller.id)).balance == 6.0
+        assert not await listed(card.id)
+
+    run(scenario())
+
+@pytest.mark.parametrize("seller_first", [True, False])
+def test_insufficient_balance_rolls_back_the_claim(run, database, seller_first):
+    # The seller is credited before the buyer is debited when its id sorts first
+    low, high = uuid.UUID(int=1), uuid.UUID(int=2)
+    seller_id, buyer_id = (low, high) if seller_first else (high, low)
+
+    async def scenario():
+        seller, (buyer,), card = await seed([5.0], price=2.0, seller_id=seller_id, buyer_ids=[buyer_id])
+
+        with pytest.raises(PurchaseFailed) as refused:
+            await purchase(buyer.id, card.id, hours=3)
+        assert refused.value.reason == PurchaseFailed.INSUFFICIENT_BALANCE
+
+        assert (await load(VirtualCard, card.id)).buyer_id is None
+        assert await listed(card.id)
+        buyer = await load(User, buyer.id)
+        seller = await load(User, seller.id)
+        assert (buyer.balance, buyer.total_spent) == (5.0, 0.0)
+        assert (seller.balance, seller.total_earned) == (0.0, 0.0)
+
+    run(scenario())
+
+def test_purchase_debits_buyer_and_credits_seller_once(run, database):
+    async def scenario():
+        seller, (buyer,), card = await seed([100.0], price=2.5)
+
+        result = await purchase(buyer.id, card.id, hours=3)
+        assert result.total_cost == 7.5
+        assert result.remaining_balance == 92.5
+
+        # Buying it again is refused and moves no money
+        with pytest.raises(PurchaseFailed) as refused:
+            await purchase(buyer.id, card.id, hours=3)
+        assert refused.value.reason == PurchaseFailed.SOLD
+
+        buyer = await load(User, buyer.id)
+        seller = await load(User, seller.id)
+        assert (buyer.balance, buyer.total_spent) == (92.5, 7.5)
+        assert (seller.balance, seller.total_earned) == (7.5, 7.5)
+
+    run(scenario())
+
+def test_unknown_card_is_not_found(run, database):
+    async def scenario():
+        _, (buyer,), _ = await seed([100.0], price=1.0)
+
+        for card_id in (uuid.uuid4(), "not-a-uuid"):
+            with pytest.raises(PurchaseFailed) as refused:
+                await purchase(buyer.id, card_id)
+            assert refused.value.reason == PurchaseFailed.NOT_FOUND
+
+        assert (await load(User, buyer.id)).balance == 100.0
+
+    run(scenario())
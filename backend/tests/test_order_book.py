@@ -0,0 +1,117 @@
+"""
+Buy order matching and settlement
+"""
+
+import pytest
+from sqlalchemy import update
+from app.core.database import AsyncSessionLocal, get_redis, init_redis
+from app.core.replicas import PRIMARY_PIN_KEY, replica_router
+from app.models.order_event import OrderEventKind
+from app.models.platform_account import PlatformType
+from app.models.user import User
+from app.models.virtual_card import VirtualCard
+from app.repositories.order_journal import OrderJournal
+from app.services.checkout_holds import checkout_holds
+from app.services.order_book import Ask, BuyOrder, OrderBook, OrderBookEngine
+from tests.factories import create_account, create_card, create_user
+
+def engine() -> OrderBookEngine:
+    return OrderBookEngine(poll_interval=0.1, resync_interval=30, lease_seconds=5)
+
+async def seed(price: float, balance: float):
+    """A listed card and a funded buyer with one resting order for it"""
+    async with AsyncSessionLocal() as db:
+        seller = await create_user(db)
+        buyer = await create_user(db, balance=100.0)
+        card = await create_card(db, await create_account(db, seller), price=price, balance=balance)
+        event = OrderJournal(db).place(buyer.id, PlatformType.CLAUDE, max_price=2.0, duration_hours=2, min_balance=50.0)
+        await db.commit()
+    return buyer, card, BuyOrder.from_event(event)
+
+async def history(order: BuyOrder):
+    async with AsyncSessionLocal() as db:
+        return [event.kind for event in await OrderJournal(db).history(order.order_id)]
+
+async def load(model, pk):
+    async with AsyncSessionLocal() as db:
+        return await db.get(model, pk)
+
+def test_step_fills_a_resting_order(run, database):
+    async def scenario():
+        buyer, card, order = await seed(price=1.0, balance=100.0)
+        matcher = engine()
+
+        await matcher.step()
+
+        assert (await load(VirtualCard, card.id)).buyer_id == buyer.id
+        assert (await load(User, buyer.id)).balance == 98.0
+        assert await history(order) == [OrderEventKind.PLACED, OrderEventKind.FILLED]
+        assert len(matcher.books[PlatformType.CLAUDE]) == 0
+
+    run(scenario())
+
+def test_fill_pins_buyer_and_seller_to_the_primary(run, database, redis_server, monkeypatch):
+    # Pins are only taken when there are replicas to lag
+    monkeypatch.setattr(replica_router, "replicas", ["replica"])
+
+    async def scenario():
+        await init_redis()
+        buyer, card, order = await seed(price=1.0, balance=100.0)
+        pins = [PRIMARY_PIN_KEY.format(user_id=user_id) for user_id in (buyer.id, card.seller_id)]
+        await get_redis().delete(*pins)
+
+        try:
+            await engine().step()
+            assert (await load(VirtualCard, card.id)).buyer_id == buyer.id
+            assert await get_redis().exists(*pins) == 2
+        finally:
+            await get_redis().delete(*pins)
+
+    run(scenario())
+
+def test_fill_keeps_the_buyers_own_reservation(run, database, redis_server):
+    async def scenario():
+        await init_redis()
+        buyer, card, order = await seed(price=1.0, balance=100.0)
+        async with AsyncSessionLocal() as db:
+            reserved = await create_card(db, await create_account(db, await create_user(db)), price=9.0)
+            await db.commit()
+        assert (await checkout_holds.reserve(reserved.id, buyer.id))[0]
+
+        try:
+            await engine().step()
+            assert (await load(VirtualCard, card.id)).buyer_id == buyer.id
+            holds = await checkout_holds.holds([reserved.id, card.id])
+            assert list(holds) == [str(reserved.id)]
+            assert holds[str(reserved.id)].buyer_id == str(buyer.id)
+        finally:
+            await checkout_holds.release(reserved.id, buyer.id)
+
+    run(scenario())
+
+@pytest.mark.parametrize("change", [
+    {"current_price": 3.0},
+    {"current_balance": 10.0},
+])
+def test_settle_drops_an_ask_outside_the_order_limits(run, database, change):
+    async def scenario():
+        buyer, card, order = await seed(price=1.0, balance=100.0)
+        book = OrderBook()
+        book.add(order)
+        ask = Ask(card.id, card.current_price, card.current_balance, card.created_at)
+        book.set_asks([ask], order.max_price, 4)
+
+        # Repriced or spent after the book read it
+        async with AsyncSessionLocal() as db:
+            await db.execute(update(VirtualCard).where(VirtualCard.id == card.id).values(**change))
+            await db.commit()
+
+        await engine()._settle(book, order, ask)
+
+        assert (await load(VirtualCard, card.id)).buyer_id is None
+        assert (await load(User, buyer.id)).balance == 100.0
+        assert await history(order) == [OrderEventKind.PLACED]
+        assert len(book) == 1
+        assert book.match() == []
+
+    run(scenario())
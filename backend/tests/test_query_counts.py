@@ -0,0 +1,101 @@
+"""
+SQL statements per request for the marketplace read endpoints
+
+Each endpoint must issue a fixed number of statements however many rows
+it returns; a count that grows with the rows is an N+1 regression.
+"""
+
+import httpx
+from app.core.database import AsyncSessionLocal, count_queries, init_redis
+from app.main import app
+from app.repositories.listing import ListingRepository
+from tests.factories import auth_headers, create_account, create_card, create_user
+
+def client() -> httpx.AsyncClient:
+    return httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test")
+
+async def counted_get(http: httpx.AsyncClient, path: str, headers=None, **params):
+    with count_queries() as queries:
+        response = await http.get(path, headers=headers, params=params)
+    assert response.status_code == 200, response.text
+    return response.json(), queries.count
+
+async def add_cards(seller, count: int, buyer=None):
+    async with AsyncSessionLocal() as db:
+        account = await create_account(db, seller)
+        for _ in range(count):
+            card = await create_card(db, account)
+            if buyer is not None:
+                card.buyer_id = buyer.id
+                await ListingRepository(db).sync(card)
+        await db.commit()
+
+async def create_users(*balances: float):
+    async with AsyncSessionLocal() as db:
+        users = [await create_user(db, balance=balance) for balance in balances]
+        await db.commit()
+    return users
+
+def test_listings_query_count_is_flat(run, database, redis_server):
+    async def scenario():
+        await init_redis()
+        seller, = await create_users(0.0)
+
+        async with client() as http:
+            await add_cards(seller, 2)
+            body, small = await counted_get(http, "/api/v1/marketplace/listings")
+            assert len(body["listings"]) == 2
+
+            await add_cards(seller, 30)
+            body, large = await counted_get(http, "/api/v1/marketplace/listings")
+            assert len(body["listings"]) == 32
+
+            body, page = await counted_get(http, "/api/v1/marketplace/listings", limit=10)
+            _, next_page = await counted_get(http, "/api/v1/marketplace/listings", limit=10, cursor=body["next_cursor"])
+
+        # The page itself; total_count comes from the Redis counters
+        assert small == large == page == next_page == 1
+
+    run(scenario())
+
+def test_purchase_history_query_count_is_flat(run, database, redis_server):
+    async def scenario():
+        await init_redis()
+        seller, buyer = await create_users(0.0, 0.0)
+
+        async with client() as http:
+            await add_cards(seller, 2, buyer=buyer)
+            # The first request per user also loads its identity
+            _, first = await counted_get(http, "/api/v1/marketplace/my-purchases", auth_headers(buyer))
+            body, small = await counted_get(http, "/api/v1/marketplace/my-purchases", auth_headers(buyer))
+            assert body["total_count"] == 2
+
+            await add_cards(seller, 30, buyer=buyer)
+            body, large = await counted_get(http, "/api/v1/marketplace/my-purchases", auth_headers(buyer))
+            assert body["total_count"] == 32
+
+        assert first == 2
+        assert small == large == 1
+
+    run(scenario())
+
+def test_sales_history_query_count_is_flat(run, database, redis_server):
+    async def scenario():
+        await init_redis()
+        seller, buyer = await create_users(0.0, 0.0)
+
+        async with client() as http:
+            await add_cards(seller, 2, buyer=buyer)
+            _, first = await counted_get(http, "/api/v1/marketplace/my-sales", auth_headers(seller))
+            body, small = await counted_get(http, "/api/v1/marketplace/my-sales", auth_headers(seller))
+            assert body["total_count"] == 2
+            assert {sale["buyer_username"] for sale in body["sales"]} == {buyer.username}
+
+            await add_cards(seller, 30, buyer=buyer)
+            body, large = await counted_get(http, "/api/v1/marketplace/my-sales", auth_headers(seller))
+            assert body["total_count"] == 32
+
+        assert first == 2
+        assert small == large == 1
+
+    run(scenario())
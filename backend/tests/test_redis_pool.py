@@ -0,0 +1,39 @@
+"""
+Shared Redis connection pool
+"""
+
+from prometheus_client import REGISTRY
+from app.core.database import InstrumentedRedisPool, get_redis, init_redis
+
+def gauge(name: str) -> float:
+    return REGISTRY.get_sample_value(name)
+
+def test_pool_runs_a_command(run, redis_server):
+    async def scenario():
+        await init_redis()
+        client = get_redis()
+        assert isinstance(client.connection_pool, InstrumentedRedisPool)
+        
+        await client.set("test:redis_pool", "ok", ex=10)
+        assert await client.get("test:redis_pool") == "ok"
+        assert gauge("subsplit_redis_pool_created_connections") == 1
+        assert gauge("subsplit_redis_pool_in_use") == 0
+    
+    run(scenario())
+
+def test_pool_reports_checked_out_connections(run, redis_server):
+    async def scenario():
+        await init_redis()
+        pool = get_redis().connection_pool
+        
+        first = await pool.get_connection("PING")
+        second = await pool.get_connection("PING")
+        assert gauge("subsplit_redis_pool_in_use") == 2
+        
+        await pool.release(first)
+        assert gauge("subsplit_redis_pool_in_use") == 1
+        assert gauge("subsplit_redis_pool_created_connections") == 2
+        await pool.release(second)
+        assert gauge("subsplit_redis_pool_in_use") == 0
+    
+    run(scenario())
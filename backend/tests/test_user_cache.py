@@ -0,0 +1,69 @@
+"""
+Per-process identity cache and its pub/sub invalidation
+"""
+
+import asyncio
+import uuid
+from app.core.database import get_redis, init_redis
+from app.core.user_cache import USER_INVALIDATION_CHANNEL, UserCache, publish_user_invalidation, user_cache
+from app.models.user import User
+
+def user() -> User:
+    user_id = uuid.uuid4()
+    return User(
+        id=user_id,
+        email=f"{user_id}@example.com",
+        username=str(user_id)[:8],
+        is_active=True,
+        is_verified=False,
+        is_premium=False
+    )
+
+async def subscribed():
+    """Wait until the cache's listener has subscribed"""
+    while True:
+        (_, subscribers), = await get_redis().pubsub_numsub(USER_INVALIDATION_CHANNEL)
+        if subscribers:
+            # The listener clears the cache once it is subscribed
+            await asyncio.sleep(0.05)
+            return
+        await asyncio.sleep(0.01)
+
+def test_invalidation_from_another_worker_evicts_the_identity(run, redis_server):
+    async def scenario():
+        await init_redis()
+        cache = UserCache(ttl_seconds=30, max_entries=10)
+        await cache.start()
+        try:
+            await asyncio.wait_for(subscribed(), timeout=5)
+            cached, other = user(), user()
+            cache.put(cached)
+            cache.put(other)
+            assert cache.get(str(cached.id)).is_active
+
+            # As published by another worker
+            await get_redis().publish(USER_INVALIDATION_CHANNEL, str(cached.id))
+            for _ in range(100):
+                if cache.get(str(cached.id)) is None:
+                    break
+                await asyncio.sleep(0.01)
+
+            assert cache.get(str(cached.id)) is None
+            assert cache.get(str(other.id)) is not None
+        finally:
+            await cache.stop()
+
+    run(scenario())
+
+def test_publish_evicts_from_this_worker_at_once(run, redis_server):
+    async def scenario():
+        await init_redis()
+        cached = user()
+        user_cache.put(cached)
+        try:
+            await publish_user_invalidation(str(cached.id))
+            assert user_cache.get(str(cached.id)) is None
+        finally:
+            user_cache.clear()
+
+    run(scenario())
@@ -0,0 +1,55 @@
+"""
+Write-behind buffer flushing
+"""
+
+import asyncio
+from datetime import datetime
+from app.core.database import AsyncSessionLocal
+from app.models.user import User
+from app.services.write_behind import WriteBehindBuffer
+from tests.factories import create_user
+
+async def seed_user() -> User:
+    async with AsyncSessionLocal() as db:
+        user = await create_user(db)
+        await db.commit()
+    return user
+
+async def load(user: User) -> User:
+    async with AsyncSessionLocal() as db:
+        return await db.get(User, user.id)
+
+def test_stop_writes_out_pending_updates(run, database):
+    async def scenario():
+        user = await seed_user()
+        buffer = WriteBehindBuffer(flush_interval_ms=60_000, max_pending=1000)
+        await buffer.start()
+
+        login = datetime.utcnow()
+        buffer.increment(User, user.id, total_spent=2.5)
+        buffer.touch(User, user.id, last_login=login)
+        await buffer.stop()
+
+        stored = await load(user)
+        assert stored.total_spent == 2.5
+        assert stored.last_login == login
+
+    run(scenario())
+
+def test_stop_during_a_flush_loses_nothing(run, database):
+    async def scenario():
+        user = await seed_user()
+        # Every update wakes the flusher
+        buffer = WriteBehindBuffer(flush_interval_ms=60_000, max_pending=1)
+        await buffer.start()
+
+        buffer.increment(User, user.id, total_spent=1.0)
+        # Wait until the flusher has swapped the buffer out and is writing it
+        while buffer._pending_events:
+            await asyncio.sleep(0)
+        buffer.increment(User, user.id, total_spent=2.0)
+        await buffer.stop()
+
+        assert (await load(user)).total_spent == 3.0
+
+    run(scenario())